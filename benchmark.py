@@ -0,0 +1,1965 @@
+import argparse
+import time
+import numpy as np
+
+"""
+GESTURE FIGHTER - BENCHMARKS
+Manual micro/macro benchmarks. Run e.g.: python benchmark.py wire
+"""
+
+def synthetic_landmarks(seed=0):
+    rng = np.random.default_rng(seed)
+    arr = rng.uniform(0.0, 1.0, size=(33, 4)).astype(np.float32)
+    return [{'x': float(x), 'y': float(y), 'z': float(z), 'v': float(v)} for x, y, z, v in arr]
+
+def time_us(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+# --- Wire format ---
+def bench_wire(args):
+    from src.network.utils import serialize_landmarks, deserialize_landmarks, encode_landmarks, decode_frame
+
+    landmarks = synthetic_landmarks()
+    json_bytes = serialize_landmarks(landmarks)
+    f32_bytes = encode_landmarks(landmarks)
+    i16_bytes = encode_landmarks(landmarks, quantize=True)
+
+    rows = [
+        ("json", len(json_bytes),
+         time_us(lambda: serialize_landmarks(landmarks), args.iterations),
+         time_us(lambda: deserialize_landmarks(json_bytes), args.iterations)),
+        ("binary float32", len(f32_bytes),
+         time_us(lambda: encode_landmarks(landmarks), args.iterations),
+         time_us(lambda: decode_frame(f32_bytes), args.iterations)),
+        ("binary int16", len(i16_bytes),
+         time_us(lambda: encode_landmarks(landmarks, quantize=True), args.iterations),
+         time_us(lambda: decode_frame(i16_bytes), args.iterations)),
+    ]
+
+    print(f"{'format':<16}{'bytes/frame':>12}{'encode us':>12}{'decode us':>12}")
+    for name, size, enc, dec in rows:
+        print(f"{name:<16}{size:>12}{enc:>12.1f}{dec:>12.1f}")
+
+# --- Landmark frame type ---
+def tick_memory(tick, iterations):
+    """
+    Runs tick() under tracemalloc.
+    Returns (peak bytes allocated during a tick, bytes retained by the frame it returns).
+    """
+    import tracemalloc
+    tick()  # warm up filters/caches
+    tracemalloc.start()
+    peaks, retained = [], []
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        frame = tick()
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+        retained.append(current - base)
+        del frame
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks), sum(retained) / len(retained)
+
+class LegacySmoother:
+    """
+    The smoother as it was: one scalar OneEuroFilter per (landmark, axis),
+    dict lists in and out.
+    """
+    def __init__(self, min_cutoff=0.01, beta=0.1):
+        self.filters = {}
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+
+    def smooth(self, landmarks, timestamp):
+        from src.logic.smoothing import OneEuroFilter
+        smoothed_data = []
+        for i, lm in enumerate(landmarks.landmark):
+            smoothed_point = {}
+            for j, (key, axis_val) in enumerate((('x', lm.x), ('y', lm.y), ('z', lm.z), ('v', lm.visibility))):
+                if (i, j) not in self.filters:
+                    self.filters[(i, j)] = OneEuroFilter(timestamp, axis_val, min_cutoff=self.min_cutoff, beta=self.beta)
+                    smoothed_point[key] = axis_val
+                else:
+                    smoothed_point[key] = self.filters[(i, j)].filter(timestamp, axis_val)
+            smoothed_data.append(smoothed_point)
+        return smoothed_data
+
+def bench_frame(args):
+    import json
+    from src.network.utils import deserialize_landmarks, encode_landmarks, MockLandmarksResult, serialize_landmarks
+    from src.logic.smoothing import LandmarkSmoother
+    from src.logic.rules import ActionDetector
+
+    landmarks = synthetic_landmarks()
+    json_bytes = serialize_landmarks(landmarks)
+    binary_bytes = encode_landmarks(landmarks)
+    iterations = min(args.iterations, 200)
+
+    # Both sides run the same tick: decode -> smooth -> detect
+    def pipeline(decode, smoother):
+        detector = ActionDetector()
+        clock = [0.0]
+
+        def tick():
+            clock[0] += 1 / 30
+            frame = smoother.smooth(decode(), clock[0])
+            detector.detect(frame, clock[0])
+            return frame
+        return tick
+
+    # Before: JSON -> MockLandmarksResult -> per-scalar filters -> dict list
+    legacy_tick = pipeline(lambda: MockLandmarksResult(json.loads(json_bytes.decode('utf-8'))),
+                           LegacySmoother(min_cutoff=0.01, beta=0.5))
+    frame_tick = pipeline(lambda: deserialize_landmarks(binary_bytes), LandmarkSmoother(min_cutoff=0.01, beta=0.5))
+
+    print(f"{'decode -> smooth -> detect':<34}{'peak bytes/tick':>16}{'retained bytes':>16}{'us/tick':>9}")
+    results = {}
+    for name, tick in (("dicts + scalar filters", legacy_tick), ("PoseFrame + vector filter", frame_tick)):
+        peak, retained = tick_memory(tick, iterations)
+        results[name] = (peak, retained)
+        print(f"{name:<34}{peak:>16.0f}{retained:>16.0f}{time_us(tick, iterations):>9.1f}")
+
+    # Nothing but the returned frame (one (33, 4) float32 array) may outlive a tick,
+    # and the transient peak must stay below the object path's
+    peak, retained = results["PoseFrame + vector filter"]
+    ok = retained <= 1024 and peak < results["dicts + scalar filters"][0]
+    print(f"{'ok  ' if ok else 'FAIL'} PoseFrame tick retains {retained:.0f} bytes (bound 1024), "
+          f"peak {peak:.0f} vs {results['dicts + scalar filters'][0]:.0f} bytes")
+    if not ok:
+        raise SystemExit(1)
+
+# --- Smoothing ---
+def bench_smoothing(args):
+    from src.logic.smoothing import OneEuroFilter, VectorOneEuroFilter
+
+    rng = np.random.default_rng(1)
+    frames = rng.uniform(0.0, 1.0, size=(args.iterations, 2, 33, 4))
+    times = np.cumsum(rng.uniform(0.02, 0.05, size=args.iterations))
+    times[5] = times[4]  # duplicate timestamp
+
+    # Previous implementation: one scalar filter per (player, landmark, axis)
+    def scalar_bank():
+        filters = {}
+        out = np.empty_like(frames)
+        start = time.perf_counter()
+        for n, t in enumerate(times.tolist()):
+            for p in range(2):
+                for i, raw in enumerate(frames[n, p].tolist()):
+                    for j, val in enumerate(raw):
+                        key = (p, i, j)
+                        if key not in filters:
+                            filters[key] = OneEuroFilter(t, val, min_cutoff=0.01, beta=0.5)
+                            out[n, p, i, j] = val
+                        else:
+                            out[n, p, i, j] = filters[key].filter(t, val)
+        return out, time.perf_counter() - start
+
+    def vector_bank():
+        bank = VectorOneEuroFilter(min_cutoff=0.01, beta=0.5)
+        out = np.empty_like(frames)
+        start = time.perf_counter()
+        for n, t in enumerate(times.tolist()):
+            out[n] = bank.filter(t, frames[n])
+        return out, time.perf_counter() - start
+
+    scalar_out, scalar_s = scalar_bank()
+    vector_out, vector_s = vector_bank()
+    n = len(times)
+    print(f"{'implementation':<20}{'us/frame (2 players)':>22}")
+    print(f"{'scalar OneEuro':<20}{scalar_s / n * 1e6:>22.1f}")
+    print(f"{'VectorOneEuro':<20}{vector_s / n * 1e6:>22.1f}")
+    diff = np.max(np.abs(scalar_out - vector_out))
+    ok = diff <= 1e-9
+    print(f"{'ok  ' if ok else 'FAIL'} max abs difference {diff:.3e} (limit 1e-9)")
+    if not ok:
+        raise SystemExit(1)
+
+# --- Async server load test ---
+def percentile(values, q):
+    return float(np.percentile(values, q)) if len(values) else float('nan')
+
+async def simulated_client(host, port, rate, duration, landmarks):
+    import asyncio
+    import struct
+    from src.network.utils import encode_landmarks, make_hello
+
+    reader, writer = await asyncio.open_connection(host, port)
+    hello = make_hello()
+    writer.write(struct.pack('>I', len(hello)) + hello)
+    await reader.readexactly(struct.unpack('>I', await reader.readexactly(4))[0])
+
+    interval = 1.0 / rate
+    seq = 0
+    end = time.time() + duration
+    next_send = time.perf_counter()
+    while time.time() < end:
+        data = encode_landmarks(landmarks, seq=seq, timestamp=time.time())
+        writer.write(struct.pack('>I', len(data)) + data)
+        await writer.drain()
+        seq += 1
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+    writer.close()
+
+def bench_server(args):
+    import asyncio
+    from src.network.async_server import AsyncMultiPlayerServer
+
+    landmarks = synthetic_landmarks()
+    print(f"{'connections':>12}{'frames/sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for n, connections in enumerate((2, 16, 128)):
+        latencies = []
+        def on_frame(room_id, player_id, frame, recv_time):
+            latencies.append(recv_time - frame.timestamp)
+
+        port = args.port + n
+        server = AsyncMultiPlayerServer(host='127.0.0.1', port=port, max_rooms=connections, on_frame=on_frame)
+        server.start()
+
+        async def run_clients():
+            await asyncio.gather(*[
+                simulated_client('127.0.0.1', port, args.rate, args.duration, landmarks)
+                for _ in range(connections)
+            ])
+
+        start = time.time()
+        asyncio.run(run_clients())
+        elapsed = time.time() - start
+        server.stop()
+
+        ms = np.array(latencies) * 1000
+        print(f"{connections:>12}{len(latencies) / elapsed:>12.0f}"
+              f"{percentile(ms, 50):>10.2f}{percentile(ms, 95):>10.2f}{percentile(ms, 99):>10.2f}")
+
+# --- TCP vs UDP over a lossy link ---
+class LossyLink:
+    """
+    Delivery scheduler shared by the proxies: base delay + jitter, random loss.
+    ordered=True models TCP (a lost segment stalls everything behind it for rto),
+    ordered=False models UDP (lost datagrams vanish, jitter reorders the rest).
+    """
+    def __init__(self, send, delay, jitter, loss, rto, ordered, seed=0):
+        import heapq
+        import threading
+        self.heapq = heapq
+        self.send = send
+        self.delay, self.jitter, self.loss, self.rto = delay, jitter, loss, rto
+        self.ordered = ordered
+        self.rng = np.random.default_rng(seed)
+        self.queue = []
+        self.count = 0
+        self.last_delivery = 0.0
+        self.cond = threading.Condition()
+        self.running = True
+        threading.Thread(target=self._deliver_loop, daemon=True).start()
+
+    def push(self, data):
+        now = time.perf_counter()
+        lost = self.rng.random() < self.loss
+        due = now + self.delay + self.rng.uniform(0, self.jitter)
+        if self.ordered:
+            if lost:
+                due += self.rto
+            due = max(due, self.last_delivery)
+            self.last_delivery = due
+        elif lost:
+            return
+        with self.cond:
+            self.count += 1
+            self.heapq.heappush(self.queue, (due, self.count, data))
+            self.cond.notify()
+
+    def _deliver_loop(self):
+        while self.running:
+            with self.cond:
+                while self.running and not self.queue:
+                    self.cond.wait(0.1)
+                if not self.queue:
+                    continue
+                due, _, data = self.queue[0]
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    self.cond.wait(wait)
+                    continue
+                self.heapq.heappop(self.queue)
+            try:
+                self.send(data)
+            except OSError:
+                return
+
+    def close(self):
+        self.running = False
+
+def lossy_udp_proxy(target, link_args):
+    import socket
+    import threading
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    link = LossyLink(lambda data: out.sendto(data, target), ordered=False, **link_args)
+
+    def pump():
+        while link.running:
+            try:
+                data, _ = sock.recvfrom(2048)
+            except OSError:
+                return
+            link.push(data)
+    threading.Thread(target=pump, daemon=True).start()
+    return sock.getsockname()[1], link, sock
+
+def lossy_tcp_proxy(target, link_args):
+    import socket
+    import threading
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    links = []
+
+    def serve():
+        client, _ = listener.accept()
+        upstream = socket.create_connection(target)
+        link = LossyLink(upstream.sendall, ordered=True, **link_args)
+        links.append(link)
+
+        def back():
+            try:
+                while True:
+                    data = upstream.recv(4096)
+                    if not data:
+                        return
+                    client.sendall(data)
+            except OSError:
+                return
+        threading.Thread(target=back, daemon=True).start()
+        try:
+            while True:
+                data = client.recv(4096)
+                if not data:
+                    return
+                link.push(data)
+        except OSError:
+            return
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1], links, listener
+
+def bench_transport(args):
+    import threading
+    from src.network.server import MultiPlayerServer
+    from src.network.client import GameClient
+    from src.network.utils import TRANSPORT_TCP, TRANSPORT_UDP
+
+    link_args = dict(delay=args.delay / 1000, jitter=args.jitter / 1000, loss=args.loss, rto=0.2)
+    landmarks = synthetic_landmarks()
+
+    print(f"link: {args.delay:.0f} ms delay, {args.jitter:.0f} ms jitter, {args.loss:.0%} loss")
+    print(f"{'transport':<10}{'mean age ms':>12}{'p50':>8}{'p95':>8}{'p99':>8}{'dropped':>9}")
+    p95 = {}
+    for n, transport in enumerate((TRANSPORT_TCP, TRANSPORT_UDP)):
+        tcp_port, udp_port = args.port + 2 * n, args.port + 2 * n + 1
+        server = MultiPlayerServer(host='127.0.0.1', port=tcp_port, udp_port=udp_port)
+        server.start()
+
+        if transport == TRANSPORT_TCP:
+            proxy_port, link, proxy = lossy_tcp_proxy(('127.0.0.1', tcp_port), link_args)
+            client = GameClient('127.0.0.1', proxy_port, transport=TRANSPORT_TCP)
+            client.connect()
+        else:
+            proxy_port, link, proxy = lossy_udp_proxy(('127.0.0.1', udp_port), link_args)
+            client = GameClient('127.0.0.1', tcp_port, transport=TRANSPORT_UDP)
+            client.connect()
+            client.udp_addr = ('127.0.0.1', proxy_port)
+
+        ages = []
+        done = threading.Event()
+        def sample():
+            # What the game loop would see: age of the newest pose it can read
+            while not done.is_set():
+                frame = server.get_landmarks()[0]
+                if frame is not None:
+                    ages.append(time.time() - frame.timestamp)
+                time.sleep(0.005)
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+
+        end = time.time() + args.duration
+        while time.time() < end:
+            client.send_landmarks(landmarks, timestamp=time.time())
+            time.sleep(1.0 / args.rate)
+        done.set()
+        sampler.join()
+
+        client.close()
+        server.stop()
+        proxy.close()
+
+        ms = np.array(ages) * 1000
+        print(f"{transport:<10}{ms.mean() if len(ms) else float('nan'):>12.1f}{percentile(ms, 50):>8.1f}"
+              f"{percentile(ms, 95):>8.1f}{percentile(ms, 99):>8.1f}{server.udp_dropped:>9}")
+        p95[transport] = percentile(ms, 95) if len(ms) else float('inf')
+
+    # A lost TCP segment holds up every frame behind it; over UDP only that frame is lost
+    ok = p95[TRANSPORT_UDP] < p95[TRANSPORT_TCP]
+    print(f"{'ok  ' if ok else 'FAIL'} UDP p95 age {p95[TRANSPORT_UDP]:.1f} ms below TCP {p95[TRANSPORT_TCP]:.1f} ms")
+    if not ok:
+        raise SystemExit(1)
+
+# --- Client capture pipeline ---
+def bench_pipeline(args):
+    import os
+    import cv2
+    from src.perception.camera import FrameFolderCapture
+    from src.perception.pose import PoseEngine
+    from src.perception.pipeline import CapturePipeline, print_report
+
+    if not args.source:
+        raise SystemExit("pipeline benchmark needs --source (video file or frame directory)")
+
+    # Serial baseline: read -> infer, one after the other (what client_capture.py does)
+    engine = PoseEngine()
+    cap = FrameFolderCapture(args.source) if os.path.isdir(args.source) else cv2.VideoCapture(args.source)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        engine.process_frame(frame)
+        frames += 1
+    cap.release()
+    print(f"Serial loop: {frames / (time.perf_counter() - start):.1f} FPS ({frames} frames)")
+
+    pipeline = CapturePipeline(args.source, pose_engine=PoseEngine(), drop_policy=args.drop_policy,
+                               queue_size=args.queue_size)
+    if not pipeline.start():
+        return
+    pipeline.wait()
+    pipeline.stop()
+    print_report(pipeline.report())
+
+# --- Camera frame handoff ---
+class SyntheticCapture:
+    """
+    VideoCapture stand-in producing 640x480 BGR frames as fast as asked.
+    """
+    def __init__(self, shape=(480, 640, 3)):
+        self.shape = shape
+        self.count = 0
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
+
+    def read(self, image=None):
+        if image is None or image.shape != self.shape:
+            image = np.empty(self.shape, dtype=np.uint8)
+        image[:8] = self.count % 256
+        self.count += 1
+        return True, image
+
+def bench_camera(args):
+    import tracemalloc
+    import cv2
+    from src.perception.camera import CameraThread
+
+    def legacy_consume(cam, state):
+        # Old path: get_frame() copied under the lock, cvtColor allocated the RGB frame
+        with cam.lock:
+            frame = cam.frame.copy()
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def ring_consume(cam, state):
+        frame, state['generation'], _ = cam.get_latest(state['generation'], timeout=0.1)
+        if frame is None:
+            return None
+        if state.get('rgb') is None:
+            state['rgb'] = np.empty(frame.shape, dtype=frame.dtype)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=state['rgb'])
+
+    print(f"{'path':<22}{'frames/sec':>12}{'alloc bytes/frame':>20}")
+    for name, consume in (("copy + cvtColor", legacy_consume), ("ring view + dst", ring_consume)):
+        cam = CameraThread(0, capture=SyntheticCapture())
+        cam.start()
+        cam.get_latest(0, timeout=1.0)
+        state = {'generation': 0}
+
+        n = min(args.iterations, 500)
+        tracemalloc.start()
+        peak_total = 0
+        start = time.perf_counter()
+        for _ in range(n):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            consume(cam, state)
+            peak_total += tracemalloc.get_traced_memory()[1] - base
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        cam.stop()
+        print(f"{name:<22}{n / elapsed:>12.0f}{peak_total / n:>20.0f}")
+
+    # Slow inference and a slow UI thread behind the ring: a frame must not change
+    # while it is being inferred, queued for preview or copied for display
+    from src.perception.pipeline import CapturePipeline
+
+    class SlowEngine:
+        torn = 0
+
+        def process_frame(self, frame):
+            stamp = int(frame[0, 0, 0])
+            time.sleep(0.02)
+            self.torn += int(frame[0, 0, 0]) != stamp
+            return [stamp]
+
+        def draw_landmarks(self, frame, landmarks):
+            return frame
+
+    engine = SlowEngine()
+    pipeline = CapturePipeline(0, pose_engine=engine, preview=True)
+    pipeline.camera.cap = SyntheticCapture()
+    pipeline.start()
+    previews = mismatched = 0
+    deadline = time.perf_counter() + 2.0
+    while time.perf_counter() < deadline:
+        item = pipeline.poll_preview(timeout=0.1)
+        if item is not None:
+            image, landmarks = item
+            previews += 1
+            mismatched += int(image[0, 0, 0]) != landmarks[0]
+            time.sleep(0.03)
+    pipeline.stop()
+    camera = pipeline.camera
+    print(f"slow consumers: {engine.torn} frames changed during inference, {mismatched}/{previews} previews "
+          f"not matching their landmarks, {camera.reallocated} reads into fresh buffers, "
+          f"{len(camera.held)} buffers still held")
+    if engine.torn or mismatched or not previews:
+        raise SystemExit(1)
+
+# --- Multi-process pose inference ---
+def load_frames(source, limit):
+    import os
+    import cv2
+    from src.perception.camera import FrameFolderCapture
+
+    cap = FrameFolderCapture(source) if os.path.isdir(source) else cv2.VideoCapture(source)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def bench_workers(args):
+    from src.perception.pool import PoseWorkerPool
+
+    if not args.source:
+        raise SystemExit("workers benchmark needs --source (video file or frame directory)")
+    frames = load_frames(args.source, min(args.iterations, 600))
+    print(f"{len(frames)} frames from {args.source}")
+
+    print(f"{'workers':>8}{'poses/sec':>12}{'mean infer ms':>15}")
+    for workers in (1, 2, 4):
+        pool = PoseWorkerPool(workers, camera_ids=[0])
+        pool.start()
+        infer_ms = []
+        start = time.perf_counter()
+        i = 0
+        while i < len(frames) or not pool.idle():
+            if i < len(frames) and pool.submit(0, frames[i], time.time(), i + 1):
+                i += 1
+                continue
+            for result in pool.poll(timeout=0.002).values():
+                infer_ms.append(result.infer_ms)
+        elapsed = time.perf_counter() - start
+        pool.stop()
+        print(f"{workers:>8}{pool.completed / elapsed:>12.1f}{np.mean(infer_ms) if infer_ms else 0.0:>15.1f}")
+
+# --- ROI tracking ---
+def bench_roi(args):
+    from src.perception.pose import PoseEngine
+
+    if not args.source:
+        raise SystemExit("roi benchmark needs --source (video file or frame directory)")
+    frames = load_frames(args.source, min(args.iterations, 600))
+
+    def run(engine):
+        results, times, roi_frames = [], [], 0
+        for frame in frames:
+            start = time.perf_counter()
+            landmarks = engine.process_frame(frame)
+            times.append((time.perf_counter() - start) * 1000)
+            roi_frames += engine.last_region is not None
+            results.append(PoseEngine._to_array(landmarks) if landmarks else None)
+        return results, np.array(times), roi_frames
+
+    reference, full_ms, _ = run(PoseEngine())
+    print(f"{len(frames)} frames from {args.source}")
+    print(f"{'mode':<22}{'mean ms':>9}{'p95 ms':>9}{'mean err':>10}{'roi frames':>12}")
+    print(f"{'full frame':<22}{full_ms.mean():>9.2f}{percentile(full_ms, 95):>9.2f}{0.0:>10.4f}{'-':>12}")
+
+    for scale in (1.0, 0.5):
+        results, times, roi_frames = run(PoseEngine(roi=True, roi_scale=scale))
+
+        # Landmark error vs full-frame inference: mean xy distance over joints visible in both
+        errors = []
+        for ref, got in zip(reference, results):
+            if ref is None or got is None:
+                continue
+            visible = (ref[:, 3] > 0.5) & (got[:, 3] > 0.5)
+            if visible.any():
+                errors.append(np.linalg.norm(ref[visible, :2] - got[visible, :2], axis=1).mean())
+        err = np.mean(errors) if errors else float('nan')
+        print(f"{f'roi (scale {scale})':<22}{times.mean():>9.2f}{percentile(times, 95):>9.2f}{err:>10.4f}{roi_frames:>12}")
+
+# --- Adaptive complexity governor ---
+class ScriptedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class ScriptedPoseBackend:
+    """
+    Fake PoseEngine: 'inference' advances a fake clock by a cost that depends on
+    model complexity, input size and a load factor the script changes over time.
+    """
+    COST_MS = {0: 12.0, 1: 25.0, 2: 60.0}  # at 640x480
+
+    def __init__(self, complexity, clock, load):
+        self.complexity = complexity
+        self.clock = clock
+        self.load = load
+
+    def process_frame(self, frame):
+        pixels = frame.shape[0] * frame.shape[1] / (640 * 480)
+        self.clock.now += self.COST_MS[self.complexity] * (0.3 + 0.7 * pixels) * self.load[0] / 1000
+        return np.full((33, 4), 0.5, dtype=np.float32)
+
+def bench_governor(args):
+    from src.perception.governor import AdaptivePoseEngine
+
+    clock = ScriptedClock()
+    load = [1.0]
+    engine = AdaptivePoseEngine(
+        budget_ms=args.budget_ms, clock=clock,
+        engine_factory=lambda complexity: ScriptedPoseBackend(complexity, clock, load),
+    )
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    # Script: normal laptop, 3x and 8x slowdowns (thermal throttling / other load), then recovery
+    script = [(300, 1.0), (300, 3.0), (300, 8.0), (300, 1.0)]
+    print(f"{'frames':>8}{'load':>6}{'level':>7}{'complexity':>12}{'scale':>7}{'skip':>6}{'mean ms':>9}{'frame ms':>10}")
+    levels, frame_ms = [], []
+    for frames, factor in script:
+        load[0] = factor
+        costs = []
+        for _ in range(frames):
+            start = clock.now
+            engine.process_frame(frame)
+            costs.append((clock.now - start) * 1000)
+            clock.now += 1 / 30  # camera cadence
+        stats = engine.stats()
+        # What the governor holds to the budget: cost per camera frame, once settled
+        levels.append(stats['level'])
+        frame_ms.append(sum(costs[-60:]) / 60)
+        print(f"{frames:>8}{factor:>6.1f}{stats['level']:>7}{stats['model_complexity']:>12}"
+              f"{stats['scale']:>7.2f}{stats['skip']:>6}{stats['mean_ms']:>9.1f}{frame_ms[-1]:>10.1f}")
+    print(f"inferred {stats['inferred']}, extrapolated {stats['extrapolated']}")
+    for when, old, new, reason in stats['switches']:
+        print(f"  t={when:6.2f}s level {old} -> {new}: {reason}")
+
+    failed = False
+    def check(name, ok):
+        nonlocal failed
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        failed |= not ok
+
+    check("steps down under 3x load", levels[1] > levels[0])
+    check("steps down further under 8x load", levels[2] > levels[1])
+    check(f"per-frame cost back within {args.budget_ms:.0f} ms after stepping down",
+          frame_ms[1] <= args.budget_ms and frame_ms[2] <= args.budget_ms)
+    check("recovers its starting level once the load is back to 1x", levels[3] == levels[0])
+    if failed:
+        raise SystemExit(1)
+
+# --- Sprite rotation cache ---
+def headless_display(width=1280, height=720):
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    pygame.init()
+    return pygame.display.set_mode((width, height))
+
+def fight_poses(count, fps=60.0):
+    """
+    Idle sway with a punch or kick every ~0.4 s, as (33, 4) arrays.
+    """
+    from src.logic.synthetic import pulse, synthetic_pose
+
+    poses = []
+    for i in range(count):
+        t = i / fps
+        beat = t % 1.6
+        poses.append(synthetic_pose(
+            t, punch_left=pulse(beat, 0.0, 0.3), punch_right=pulse(beat, 0.4, 0.3),
+            kick_left=pulse(beat, 0.8, 0.4), kick_right=pulse(beat, 1.2, 0.4), sway=0.02,
+        ))
+    return poses
+
+def bench_sprites(args):
+    from src.game.renderer import AvatarRenderer
+
+    screen = headless_display()
+    poses = fight_poses(min(args.iterations, 1200))
+
+    def run(renderer, label):
+        renderer.draw_avatar(screen, poses[0], 1, 200)  # loads sprites
+        renderer.sprite_manager.hits = renderer.sprite_manager.misses = 0
+        times = []
+        for pose in poses:
+            start = time.perf_counter()
+            renderer.draw_avatar(screen, pose, 1, 200)
+            renderer.draw_avatar(screen, pose, 2, 700)
+            times.append((time.perf_counter() - start) * 1000)
+        times = np.array(times)
+        stats = renderer.sprite_manager.cache_stats()
+        print(f"{label:<26}{times.mean():>9.2f}{percentile(times, 95):>9.2f}{stats['hit_rate']:>10.1%}"
+              f"{stats['entries']:>9}{stats['bytes'] / 2**20:>10.1f}")
+
+    print(f"{len(poses)} frames, 2 avatars")
+    print(f"{'mode':<26}{'mean ms':>9}{'p95 ms':>9}{'hit rate':>10}{'entries':>9}{'cache MB':>10}")
+    uncached = AvatarRenderer(1280, 720)
+    uncached.sprite_manager.max_cache_bytes = 0  # keeps only the last surface
+    run(uncached, 'no cache')
+    run(AvatarRenderer(1280, 720), 'cache (2 deg)')
+    run(AvatarRenderer(1280, 720, scale_limbs=True), 'cache, scaled limbs')
+
+# --- Full frame render ---
+def bench_render(args):
+    headless_display()
+    from src.game.engine import GameEngine
+
+    game = GameEngine()
+    poses = fight_poses(min(args.iterations, 600))
+    renderer = game.renderer
+
+    def drop_caches():
+        # What every frame used to pay: background redraw, font loads, text renders, overlay alloc
+        renderer.background = None
+        renderer.overlay = None
+        renderer.fonts.clear()
+        renderer.text_cache.clear()
+
+    def run(state, cold):
+        game.state = state
+        game.winner = 1
+        times = []
+        for i, pose in enumerate(poses):
+            game.landmarks_p1 = pose
+            game.landmarks_p2 = pose if state != "LOBBY" else None
+            game.p1_hit_timer = 1.0 if i % 10 < 3 else 0.0
+            if cold:
+                drop_caches()
+            start = time.perf_counter()
+            game.render()
+            times.append((time.perf_counter() - start) * 1000)
+        return np.array(times)
+
+    game.render()  # loads sprites
+    print(f"{len(poses)} frames per state, {game.WIDTH}x{game.HEIGHT}")
+    print(f"{'state':<10}{'uncached ms':>13}{'cached ms':>11}{'cached p95':>12}")
+    for state in ("LOBBY", "FIGHT", "GAMEOVER"):
+        cold = run(state, True)
+        warm = run(state, False)
+        print(f"{state:<10}{cold.mean():>13.2f}{warm.mean():>11.2f}{percentile(warm, 95):>12.2f}")
+
+# --- Dirty-rect rendering ---
+def bench_dirty(args):
+    import pygame
+    screen = headless_display()
+    from src.game.engine import GameEngine
+    from src.game.dirty_rects import DirtyRectScreen
+    from src.game.renderer import AvatarRenderer
+
+    game = GameEngine()
+    poses = fight_poses(min(args.iterations, 600))
+
+    # Script: lobby (nobody, P1 joins, both), fight with P2 dropping out for a while, game over
+    n = len(poses)
+    script = []
+    for i in range(n // 4):
+        script.append(("LOBBY", poses[i] if i >= n // 12 else None, poses[i] if i >= n // 6 else None, 100, 100, "IDLE"))
+    for i in range(n // 4, 3 * n // 4):
+        p2 = None if n // 2 <= i < n // 2 + 10 else poses[i]
+        action = "PUNCH" if i % 20 < 4 else "IDLE"
+        script.append(("FIGHT", poses[i], p2, 100, max(0, 100 - (i - n // 4) // 3), action))
+    for i in range(3 * n // 4, n):
+        script.append(("GAMEOVER", poses[i], poses[i], 100, 0, "IDLE"))
+
+    screen_px = screen.get_width() * screen.get_height()
+    print(f"{len(script)} frames per run")
+    print(f"{'sprites':<14}{'state':<10}{'mean px pushed':>16}{'% of screen':>13}{'max px':>10}{'identical':>11}")
+    failed = False
+    for label, scale_limbs in (("full size", False), ("scaled limbs", True)):
+        game.renderer = AvatarRenderer(game.WIDTH, game.HEIGHT, scale_limbs=scale_limbs)
+        full = DirtyRectScreen(pygame.Surface(screen.get_size(), 0, screen), enabled=False)
+        dirty = DirtyRectScreen(pygame.Surface(screen.get_size(), 0, screen), enabled=True)
+        pushed = {}
+        mismatches = {}
+        for state, p1, p2, hp1, hp2, action in script:
+            game.state, game.winner = state, 1
+            game.landmarks_p1, game.landmarks_p2 = p1, p2
+            game.p1_health, game.p2_health = hp1, hp2
+            game.p1_hit_timer = 1.0 if action == "PUNCH" else 0.0
+
+            # Same frame through a full redraw and through dirty rects
+            game.layers = full
+            game.compose()
+            game.layers = dirty
+            game.compose()
+            same = pygame.image.tobytes(full.screen, 'RGB') == pygame.image.tobytes(dirty.screen, 'RGB')
+            mismatches[state] = mismatches.get(state, 0) + (not same)
+            pushed.setdefault(state, []).append(dirty.pixels_pushed)
+
+        for state, values in pushed.items():
+            values = np.array(values)
+            failed = failed or mismatches[state] > 0
+            identical = 'yes' if not mismatches[state] else f'{mismatches[state]} bad'
+            print(f"{label:<14}{state:<10}{values.mean():>16.0f}{values.mean() / screen_px:>13.1%}"
+                  f"{values.max():>10}{identical:>11}")
+    if failed:
+        raise SystemExit("dirty-rect output differs from full redraw")
+
+# --- Avatar draw path ---
+LEGACY_BONES = [("torso", 11, 24), ("arm", 11, 13), ("arm", 13, 15), ("arm", 12, 14), ("arm", 14, 16),
+                ("leg", 23, 25), ("leg", 25, 27), ("leg", 24, 26), ("leg", 26, 28)]
+
+def legacy_bone_geometry(landmarks, offset_x):
+    """
+    Previous draw_avatar math: per-landmark dict and scalar NumPy calls per bone.
+    Returns {(start, end): (mid, angle, length)} and the points dict.
+    """
+    from src.logic.frame import as_pose_frame
+
+    points = {}
+    for idx, (x, y) in enumerate(as_pose_frame(landmarks).xy.tolist()):
+        points[idx] = (int(x * 300) + offset_x, int(y * 400) + 100)
+    bones = {}
+    for _, idx_start, idx_end in LEGACY_BONES:
+        mid_x = (points[idx_start][0] + points[idx_end][0]) // 2
+        mid_y = (points[idx_start][1] + points[idx_end][1]) // 2
+        dx = points[idx_end][0] - points[idx_start][0]
+        dy = points[idx_end][1] - points[idx_start][1]
+        angle = -np.degrees(np.arctan2(dy, dx)) - 90
+        bones[(idx_start, idx_end)] = ((mid_x, mid_y), angle, (dx * dx + dy * dy) ** 0.5)
+    return bones, points
+
+def legacy_draw_avatar(renderer, surface, landmarks, player_id, offset_x):
+    import pygame
+    bones, points = legacy_bone_geometry(landmarks, offset_x)
+    sprites = renderer.sprite_manager
+
+    def draw_part(part_name, idx_start, idx_end):
+        mid, angle, length = bones[(idx_start, idx_end)]
+        img = sprites.get_rotated_part(player_id, part_name, angle)
+        if img:
+            surface.blit(img, img.get_rect(center=mid))
+
+    draw_part("torso", 11, 24)
+    img = sprites.get_rotated_part(player_id, "head", 0)
+    if img:
+        surface.blit(img, img.get_rect(center=points[0]))
+    for part_name, idx_start, idx_end in LEGACY_BONES[1:]:
+        draw_part(part_name, idx_start, idx_end)
+    color = renderer.P1_COLOR if player_id == 1 else renderer.P2_COLOR
+    pygame.draw.circle(surface, color, points[15], 5)
+    pygame.draw.circle(surface, color, points[16], 5)
+
+def bench_avatar(args):
+    import pygame
+    from src.game.renderer import AvatarRenderer
+
+    screen = headless_display()
+    rng = np.random.default_rng(3)
+    poses = fight_poses(min(args.iterations, 1000))
+    # Plus random poses, to hit every angle quadrant and off-screen points
+    poses += [rng.uniform(-0.2, 1.2, size=(33, 4)).astype(np.float32) for _ in range(200)]
+    renderer = AvatarRenderer(1280, 720)
+    renderer.draw_avatar(screen, poses[0], 1, 200)  # loads sprites
+
+    # Geometry must match the previous code exactly
+    worst_angle, worst_mid = 0.0, 0
+    for pose in poses:
+        legacy, _ = legacy_bone_geometry(pose, 200)
+        mid, angle, length = renderer.bone_geometry(renderer.project(pose, 200))
+        for i, bone in enumerate(renderer.skeleton):
+            if bone.end is None:
+                continue
+            old_mid, old_angle, old_length = legacy[(bone.start, bone.end)]
+            worst_angle = max(worst_angle, abs(float(angle[i]) - float(old_angle)))
+            worst_mid = max(worst_mid, abs(mid[i][0] - old_mid[0]), abs(mid[i][1] - old_mid[1]))
+    print(f"{len(poses)} poses: max angle diff {worst_angle:.3e} deg, max midpoint diff {worst_mid} px")
+
+    reference = pygame.Surface(screen.get_size(), 0, screen)
+    drawn = pygame.Surface(screen.get_size(), 0, screen)
+    mismatches = 0
+    for pose in poses[:200]:
+        reference.fill((0, 0, 0))
+        drawn.fill((0, 0, 0))
+        legacy_draw_avatar(renderer, reference, pose, 1, 200)
+        renderer.draw_avatar(drawn, pose, 1, 200)
+        mismatches += pygame.image.tobytes(reference, 'RGB') != pygame.image.tobytes(drawn, 'RGB')
+    print(f"rendered avatars identical to the previous draw path: {200 - mismatches}/200")
+
+    def timed(fn):
+        cycle = iter(poses * 2)
+        return time_us(lambda: fn(next(cycle)), len(poses))
+
+    print(f"{'path':<34}{'us/avatar':>10}")
+    print(f"{'legacy projection + bone math':<34}{timed(lambda pose: legacy_bone_geometry(pose, 200)):>10.1f}")
+    print(f"{'batched projection + bone math':<34}"
+          f"{timed(lambda pose: renderer.bone_geometry(renderer.project(pose, 200))):>10.1f}")
+
+    # Whole draw path with blits out of the way (1x1 target) and every rotation cached
+    poses = poses[:-200]
+    tiny = pygame.Surface((1, 1), 0, screen)
+    renderer.sprite_manager.max_cache_bytes = 2**40
+    timed(lambda pose: renderer.draw_avatar(tiny, pose, 1, 200))
+    print(f"{'legacy draw_avatar':<34}{timed(lambda pose: legacy_draw_avatar(renderer, tiny, pose, 1, 200)):>10.1f}")
+    print(f"{'draw_avatar':<34}{timed(lambda pose: renderer.draw_avatar(tiny, pose, 1, 200)):>10.1f}")
+    if worst_angle > 1e-9 or worst_mid or mismatches:
+        raise SystemExit("avatar geometry differs from the previous draw path")
+
+# --- Fixed-timestep determinism ---
+def bench_timestep(args):
+    from src.game.engine import GameEngine
+    from src.game.sources import GeneratorLandmarkSource
+    from src.logic.synthetic import fight_frames
+
+    print(f"{'render fps':>10}{'frames':>8}{'KO tick':>9}{'winner':>8}{'p1 hp':>7}{'p2 hp':>7}{'hits':>6}{'ms/frame':>10}")
+    outcomes = {}
+    for fps in (30, 60, 144):
+        # 30 fps camera frames, 4 ticks each at 120 Hz
+        game = GameEngine(render_fps=fps, display="offscreen",
+                          landmark_source=GeneratorLandmarkSource(fight_frames(), repeat=4))
+        game.PUNCH_DAMAGE = 10.0  # short match
+        # Health after every tick that changed it, and the tick the match ended on
+        history = []
+        end_tick = [None]
+        tick = game.update
+        def recorded_tick(game=game, tick=tick, history=history, end_tick=end_tick):
+            before = (game.p1_health, game.p2_health)
+            tick()
+            if (game.p1_health, game.p2_health) != before:
+                history.append((game.ticks, game.p1_health, game.p2_health))
+            if game.state == "GAMEOVER" and end_tick[0] is None:
+                end_tick[0] = game.ticks
+        game.update = recorded_tick
+
+        frames = 0
+        start = time.perf_counter()
+        while game.state != "GAMEOVER" and game.ticks < 120 * 60:
+            game.advance(1.0 / fps)
+            frames += 1
+        elapsed = time.perf_counter() - start
+        outcomes[fps] = (game.winner, end_tick[0], game.p1_health, game.p2_health, history)
+        print(f"{fps:>10}{frames:>8}{end_tick[0]!s:>9}{game.winner!s:>8}{game.p1_health:>7.1f}{game.p2_health:>7.1f}"
+              f"{len(history):>6}{elapsed / frames * 1000:>10.2f}")
+
+    # Winner, KO tick, final health and every damage event (tick, hp, hp) must match
+    reference = outcomes[30]
+    same = all(outcome == reference for outcome in outcomes.values())
+    print("identical match outcome at every render rate" if same else "MATCH OUTCOME DIFFERS")
+    if not same:
+        raise SystemExit(1)
+
+# --- Headless simulation throughput ---
+def bench_headless(args):
+    import os
+    import tempfile
+    from src.game.engine import GameEngine
+    from src.game.sources import GeneratorLandmarkSource, RecordedLandmarkSource, save_recording
+    from src.logic.synthetic import fight_frames
+
+    ticks = min(args.iterations, 120 * 60)
+    path = os.path.join(tempfile.mkdtemp(), 'fight.npz')
+    save_recording(path, fight_frames(seconds=ticks / 120 + 1))
+
+    def engine(source, display):
+        game = GameEngine(display=display, landmark_source=source)
+        game.PUNCH_DAMAGE = 10.0  # short match
+        return game
+
+    runs = [
+        ("synthetic, no render", lambda: engine(GeneratorLandmarkSource(fight_frames(), repeat=4), "none"), 0),
+        ("recording, no render", lambda: engine(RecordedLandmarkSource(path, repeat=4), "none"), 0),
+        ("recording, render 30 fps", lambda: engine(RecordedLandmarkSource(path, repeat=4), "offscreen"), 4),
+        ("recording, render every tick", lambda: engine(RecordedLandmarkSource(path, repeat=4), "offscreen"), 1),
+    ]
+    print(f"{'run':<30}{'ticks':>7}{'ticks/sec':>11}{'x realtime':>12}{'winner':>8}{'health':>14}")
+    outcomes = set()
+    for name, make, render_every in runs:
+        stats = make().run_headless(max_ticks=ticks, render_every=render_every)
+        outcomes.add((stats['ticks'], stats['winner'], stats['health']))
+        print(f"{name:<30}{stats['ticks']:>7}{stats['ticks_per_sec']:>11.0f}{stats['ticks_per_sec'] / 120:>12.1f}"
+              f"{stats['winner']!s:>8}{str(stats['health']):>14}")
+    print("same outcome for every run" if len(outcomes) == 1 else "OUTCOMES DIFFER")
+    if len(outcomes) != 1:
+        raise SystemExit(1)
+
+# --- Session recorder and replay ---
+def bench_recorder(args):
+    import asyncio
+    import os
+    import tempfile
+    from src.game.engine import GameEngine
+    from src.logic.synthetic import fight_frames
+    from src.network.recorder import SessionLog, SessionRecorder, SessionReplaySource
+    from src.network.server import MultiPlayerServer
+
+    workdir = tempfile.mkdtemp()
+    pairs = list(fight_frames(seconds=60))
+
+    def write_log(path, compress):
+        recorder = SessionRecorder(path, compress=compress).start()
+        for i, (p1, p2) in enumerate(pairs):
+            recorder.record(1, p1, i / 30)
+            recorder.record(2, p2, i / 30 + 0.001)
+        recorder.close()
+        return recorder
+
+    # record() is all the receive thread pays; the writer thread does the rest
+    recorder = SessionRecorder(os.path.join(workdir, 'latency.gfs'), max_pending=args.iterations + 1).start()
+    frame = pairs[0][0]
+    call_us = time_us(lambda: recorder.record(1, frame, 0.0), args.iterations)
+    recorder.close()
+    print(f"record() call: {call_us:.2f} us ({recorder.dropped} dropped)")
+
+    print(f"{'log':<8}{'frames':>8}{'bytes':>10}{'bytes/frame':>13}{'write frames/s':>16}{'read frames/s':>15}{'seek ms':>9}")
+    for name, compress in (("raw", False), ("zlib", True)):
+        path = os.path.join(workdir, f'{name}.gfs')
+        start = time.perf_counter()
+        recorder = write_log(path, compress)
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log = SessionLog(path)
+        count = sum(1 for _ in log.records())
+        read_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        first = next(log.records(start_time=45.0))
+        seek_ms = (time.perf_counter() - start) * 1000
+        assert count == len(pairs) * 2 and 45.0 <= first['recv_time'] < 45.0 + 1 / 30
+        size = os.path.getsize(path)
+        print(f"{name:<8}{count:>8}{size:>10}{size / count:>13.1f}{count / write_s:>16.0f}{count / read_s:>15.0f}{seek_ms:>9.3f}")
+
+    # A log cut short (no index, last chunk incomplete) is still readable
+    with open(path, 'rb') as f:
+        data = f.read()
+    truncated = os.path.join(workdir, 'truncated.gfs')
+    with open(truncated, 'wb') as f:
+        f.write(data[:len(data) * 2 // 3])
+    print(f"truncated log: {len(SessionLog(truncated))} of {count} frames recoverable")
+
+    # Live: two clients through MultiPlayerServer._handle_client
+    path = os.path.join(workdir, 'live.gfs')
+    server = MultiPlayerServer(host='127.0.0.1', port=args.port, recorder=SessionRecorder(path))
+    server.start()
+    duration = min(args.duration, 2.0)
+
+    async def run_clients():
+        await asyncio.gather(*[simulated_client('127.0.0.1', args.port, args.rate, duration, synthetic_landmarks(i))
+                               for i in range(2)])
+
+    asyncio.run(run_clients())
+    time.sleep(0.2)
+    server.stop()
+    log = SessionLog(path)
+    players = [int(rec['player']) for rec in log.records()]
+    print(f"live: {len(log)} records over {duration:.1f}s "
+          f"(P1 {players.count(1)}, P2 {players.count(2)}, {server.recorder.dropped} dropped)")
+
+    # Replay at max speed: one tick per 1/120 s of session time, twice
+    outcomes = []
+    for _ in range(2):
+        source = SessionReplaySource(os.path.join(workdir, 'zlib.gfs'), tick_dt=1 / 120)
+        game = GameEngine(display="none", landmark_source=source)
+        game.PUNCH_DAMAGE = 10.0  # short match
+        stats = game.run_headless(max_ticks=120 * 60)
+        outcomes.append((stats['ticks'], stats['winner'], stats['health']))
+        print(f"replay: {stats['ticks']} ticks at {stats['ticks_per_sec']:.0f} ticks/s, "
+              f"winner {stats['winner']}, health {stats['health']}")
+    print("deterministic replay" if outcomes[0] == outcomes[1] else "REPLAYS DIFFER")
+    if outcomes[0] != outcomes[1]:
+        raise SystemExit(1)
+
+# --- Camera-to-screen latency stages ---
+async def fight_client(host, port, rate, duration, player):
+    import asyncio
+    import struct
+    from src.logic.synthetic import fight_frames
+    from src.network.utils import encode_landmarks, make_hello
+
+    reader, writer = await asyncio.open_connection(host, port)
+    hello = make_hello()
+    writer.write(struct.pack('>I', len(hello)) + hello)
+    await reader.readexactly(struct.unpack('>I', await reader.readexactly(4))[0])
+
+    interval = 1.0 / rate
+    next_send = time.perf_counter()
+    end = time.time() + duration
+    for seq, pair in enumerate(fight_frames(input_hz=rate, seconds=duration + 1)):
+        if time.time() >= end:
+            break
+        data = encode_landmarks(pair[player - 1], player, seq, timestamp=time.time())
+        writer.write(struct.pack('>I', len(data)) + data)
+        await writer.drain()
+        next_send += interval
+        await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+    writer.close()
+
+def bench_latency(args):
+    import asyncio
+    import os
+    import tempfile
+    import threading
+    from src.game.engine import GameEngine
+    from src.game.sources import QueueLandmarkSource
+    from src.network.server import MultiPlayerServer
+
+    game = GameEngine(display="offscreen", landmark_source=QueueLandmarkSource())
+    game.server = MultiPlayerServer(host='127.0.0.1', port=args.port, latency=game.latency)
+    game.show_latency = True
+    game.server.start()
+
+    async def run_clients():
+        await asyncio.gather(*[fight_client('127.0.0.1', args.port, args.rate, args.duration, player)
+                               for player in (1, 2)])
+    clients = threading.Thread(target=asyncio.run, args=(run_clients(),))
+    clients.start()
+
+    # Real-time game loop at 60 fps, as GameEngine.run but without the window
+    previous = time.perf_counter()
+    while clients.is_alive():
+        now = time.perf_counter()
+        game.advance(now - previous)
+        previous = now
+        time.sleep(max(0.0, 1 / 60 - (time.perf_counter() - now)))
+    game.server.stop()
+
+    print(f"{'stage':<16}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for row in game.latency.summary():
+        print(f"{row['stage']:<16}{row['count']:>7}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}")
+    print("overlay:")
+    for line in game.latency.overlay_lines():
+        print(f"  {line}")
+
+    workdir = tempfile.mkdtemp()
+    for name in ('latency.csv', 'latency.json'):
+        path = os.path.join(workdir, name)
+        game.latency.dump(path)
+        game.latency.dump(path)
+        with open(path) as f:
+            print(f"{name}: {len(f.read().splitlines())} lines")
+    print(f"add(): {time_us(lambda: game.latency.add('queue', 0.001), args.iterations):.2f} us")
+
+# --- Clock sync and capture-time smoothing over a jittery link ---
+class JitteryLinkSource:
+    """
+    Landmark source delivering fight frames over a simulated in-order link
+    (delay + random jitter, so frames bunch up), one tick_dt per tick.
+    Capture timestamps get stamp_jitter of camera timing noise; stamped=False
+    strips them, as frames used to be handled. Frames superseded before a
+    tick picks them up are counted in `skipped`. buffer_frames=True also
+    feeds every frame through a FrameBuffer, like MultiPlayerServer.
+    """
+    def __init__(self, pairs, delay, jitter, tick_dt, stamped=True, clock_offset=0.0, stamp_jitter=0.002, seed=0,
+                 buffer_frames=False):
+        from src.logic.frame import PoseFrame
+        rng = np.random.default_rng(seed)
+        self.arrivals = []
+        arrival = 0.0
+        for p1, p2 in pairs:
+            ts = p1.timestamp + clock_offset + rng.uniform(0.0, stamp_jitter) if stamped else 0.0
+            arrival = max(arrival, p1.timestamp + delay + rng.uniform(0.0, jitter))
+            self.arrivals.append((arrival, PoseFrame(p1.data, ts, p1.seq), PoseFrame(p2.data, ts, p2.seq)))
+        self.tick_dt = tick_dt
+        self.now = 0.0
+        self.index = 0
+        self.current = (None, None)
+        self.skipped = 0
+        self.finished = False
+        self.buffer_frames = buffer_frames
+        if buffer_frames:
+            from src.network.frame_buffer import FrameBuffer
+            self.buffers = {1: FrameBuffer(clock=lambda: self.now), 2: FrameBuffer(clock=lambda: self.now)}
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_landmarks(self):
+        self.now += self.tick_dt
+        first = self.index
+        while self.index < len(self.arrivals) and self.arrivals[self.index][0] <= self.now:
+            arrival, p1, p2 = self.arrivals[self.index]
+            self.current = (p1, p2)
+            if self.buffer_frames:
+                self.buffers[1].push(p1, arrival)
+                self.buffers[2].push(p2, arrival)
+            self.index += 1
+        self.skipped += max(0, self.index - first - 1)
+        self.finished = self.index >= len(self.arrivals) and not (
+            self.buffer_frames and any(buffer.stats()['buffered'] for buffer in self.buffers.values()))
+        return self.current
+
+    def get_frames(self, player_id):
+        return self.buffers[player_id].pop_ready()
+
+def bench_clocksync(args):
+    from src.game.engine import GameEngine
+    from src.logic.synthetic import fight_frames
+    from src.network.clock import ClockOffset
+    from src.network.client import GameClient
+    from src.network.server import MultiPlayerServer
+
+    delay, jitter = args.delay / 1000, args.jitter / 1000
+    pairs = list(fight_frames(seconds=30))
+    tick_dt = 1 / 120
+
+    # 1. Wrist velocity as the detector sees it: distance over time between
+    # consecutive frames, timed at consumption vs at capture
+    source = JitteryLinkSource(pairs, delay, jitter, tick_dt, clock_offset=1.0)
+    truth, consume_v, capture_v = [], [], []
+    last = None
+    while not source.finished:
+        p1, _ = source.get_landmarks()
+        if p1 is None or p1 is (last and last[0]):
+            continue
+        if last is not None:
+            moved = float(np.linalg.norm(p1.xy[15] - last[0].xy[15]))
+            frames = p1.seq - last[0].seq
+            truth.append(moved / (frames / 30))
+            consume_v.append(moved / max(source.now - last[1], 1e-3))
+            capture_v.append(moved / (p1.timestamp - last[0].timestamp))
+        last = (p1, source.now)
+    truth = np.array(truth)
+    print(f"link: {args.delay:.0f} ms + up to {args.jitter:.0f} ms jitter, {len(truth)} frame pairs")
+    print(f"{'velocity timed at':<20}{'mean abs err':>14}{'p99 abs err':>13}{'max':>8}")
+    p99 = {}
+    for name, v in (("consumption", consume_v), ("capture", capture_v)):
+        err = np.abs(np.array(v) - truth)
+        p99[name] = np.percentile(err, 99)
+        print(f"{name:<20}{err.mean():>14.3f}{p99[name]:>13.3f}{err.max():>8.2f}")
+    failed = False
+
+    def check(name, ok):
+        nonlocal failed
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        failed |= not ok
+
+    # Capture-time velocities stay close to the truth whatever the link does
+    check("capture-time p99 velocity error under 0.25/s and a tenth of consumption-time",
+          p99['capture'] < 0.25 and (jitter == 0 or p99['capture'] < 0.1 * p99['consumption']))
+
+    # 2. Whole game: punches landed with and without jitter, per timebase
+    def hits(link_jitter, stamped):
+        source = JitteryLinkSource(pairs, delay, link_jitter, tick_dt, stamped, clock_offset=1.0)
+        game = GameEngine(display="none", landmark_source=source)
+        game.PUNCH_DAMAGE = 1.0
+        game.run_headless(max_ticks=int(32 / tick_dt), stop_at_gameover=False)
+        return f"{100 - game.p2_health:.0f}/{100 - game.p1_health:.0f} ({source.skipped} skipped)"
+
+    print(f"punches landed P1/P2 ({len(pairs)} frames each)")
+    print(f"{'timebase':<14}{'clean link':>22}{'jittery link':>22}")
+    for name, stamped in (("consumption", False), ("capture", True)):
+        print(f"{name:<14}{hits(0.0, stamped):>22}{hits(jitter, stamped):>22}")
+
+    # 3. Offset estimation: client clock 250 ms behind, asymmetric jittery link
+    rng = np.random.default_rng(1)
+    true_offset = 0.25
+    clock = ClockOffset()
+    estimates = {}
+    naive = []
+    t = 100.0
+    for n in range(1, 33):
+        up = delay + rng.exponential(jitter / 2)
+        down = delay + rng.exponential(jitter / 2)
+        t0 = t
+        t1 = t0 + up + true_offset
+        t2 = t1 + 0.0002
+        t3 = t2 - true_offset + down
+        _, offset = clock.add_exchange(1, t0, t1, t2, t3)
+        naive.append(offset)
+        if n in (1, 2, 4, 8, 16, 32):
+            estimates[n] = (clock.offset(1), float(np.mean(naive)))
+        t += 0.1
+    print(f"{'exchanges':>10}{'min-RTT err ms':>16}{'mean err ms':>13}")
+    for n, (best, mean) in estimates.items():
+        print(f"{n:>10}{abs(best - true_offset) * 1000:>16.2f}{abs(mean - true_offset) * 1000:>13.2f}")
+    best, mean = estimates[32]
+    check("min-RTT offset within max(2 ms, jitter / 10) after 32 exchanges, no worse than the mean",
+          abs(best - true_offset) < max(0.002, jitter / 10) and abs(best - true_offset) <= abs(mean - true_offset))
+
+    # 4. Loopback handshake: client and host end up with the same estimate
+    server = MultiPlayerServer(host='127.0.0.1', port=args.port)
+    server.start()
+    client = GameClient('127.0.0.1', args.port)
+    client.connect()
+    time.sleep(0.2)
+    offset, rtt = client.clock.offset(0), client.clock.rtt(0)
+    host_offset = server.clock_offset.offset(1)
+    print(f"loopback: client offset {offset * 1e3:+.3f} ms rtt {rtt * 1e3:.3f} ms, "
+          f"host sees {host_offset * 1e3:+.3f} ms over {len(server.clock_offset.exchanges[1])} exchanges")
+    client.close()
+    server.stop()
+    # Same clock on both ends: the offset is zero up to scheduling noise
+    check("loopback offsets within 1 ms of zero and of each other",
+          abs(offset) < 0.001 and abs(host_offset) < 0.001 and abs(offset - host_offset) < 0.001)
+    if failed:
+        raise SystemExit(1)
+
+# --- Per-player frame buffer ---
+def bench_framebuffer(args):
+    from src.game.engine import GameEngine
+    from src.logic.frame import PoseFrame
+    from src.logic.synthetic import fight_frames
+    from src.network.frame_buffer import FrameBuffer
+
+    def frame(i):
+        # Client clock 1 s ahead of the host's
+        return PoseFrame(np.full((33, 4), i, dtype=np.float32), 1.0 + i / 30, i)
+
+    def drain(buffer, until, start=0.0, dt=1 / 120):
+        """Ticks the game clock from start to until, collecting released frames."""
+        out = []
+        now = start
+        while now < until:
+            now += dt
+            out.extend(f.seq for f in buffer.pop_ready(now))
+        return out
+
+    def check(name, ok, detail):
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<12} {detail}")
+        return ok
+
+    results = []
+
+    # Burst: frames 30..39 are held up on the link, then arrive together
+    buffer = FrameBuffer()
+    arrivals = [(i / 30 + 0.02, i) for i in range(30)] + [(39 / 30 + 0.02, i) for i in range(30, 40)]
+    released = []
+    now = 0.0
+    for arrival, i in arrivals:
+        released.extend(drain(buffer, arrival, now))
+        now = max(now, arrival)
+        buffer.push(frame(i), arrival)
+    released.extend(drain(buffer, now + 0.5, now))
+    results.append(check("burst", released == list(range(40)),
+                         f"{len(released)}/40 frames released in order, delay grew to {buffer.delay * 1000:.0f} ms"))
+
+    # Gap: 0.5 s without frames holds the last pose, then the stream resumes
+    buffer = FrameBuffer()
+    for i in range(30):
+        buffer.push(frame(i), i / 30 + 0.02)
+    first = drain(buffer, 1.5)
+    held = buffer.sample_at(1.5)
+    for i in range(45, 60):
+        buffer.push(frame(i), i / 30 + 0.02)
+    resumed = drain(buffer, 2.5, 1.5)
+    results.append(check("gap", first == list(range(30)) and held.seq == 29 and resumed == list(range(45, 60)),
+                         f"held frame {held.seq} through the gap, {len(resumed)} frames after it"))
+
+    # Overflow: 20 frames queue up in a buffer of 8 before the game reads it
+    buffer = FrameBuffer(capacity=8)
+    for i in range(20):
+        buffer.push(frame(i), 1.0)
+    released = drain(buffer, 2.0, 1.0)
+    results.append(check("overflow", released == list(range(12, 20)) and buffer.overflowed == 12,
+                         f"oldest {buffer.overflowed} dropped, kept {released[0]}..{released[-1]}"))
+
+    # Reordering, duplicates and frames behind the playout point
+    buffer = FrameBuffer()
+    for i in (0, 3, 1, 3):
+        buffer.push(frame(i), 0.2)
+    released = drain(buffer, 0.3)
+    buffer.push(frame(2), 0.3)
+    results.append(check("reorder", released == [0, 1, 3] and buffer.duplicates == 1 and buffer.late == 1,
+                         f"released {released}, {buffer.duplicates} duplicate, {buffer.late} late"))
+
+    # Interpolation between two frames
+    buffer = FrameBuffer()
+    buffer.push(frame(0), 0.0)
+    buffer.push(frame(3), 0.1)
+    mid = buffer.sample(1.05)
+    results.append(check("sample", np.allclose(mid.data, 1.5), f"pose halfway is {mid.data[0, 0]:.2f} (frames 0 and 3)"))
+
+    # Whole game over a jittery link: every frame vs the newest one per tick
+    delay, jitter, tick_dt = args.delay / 1000, args.jitter / 1000, 1 / 120
+    pairs = list(fight_frames(seconds=30))
+
+    def hits(link_jitter, buffered):
+        source = JitteryLinkSource(pairs, delay, link_jitter, tick_dt, clock_offset=1.0, buffer_frames=buffered)
+        game = GameEngine(display="none", landmark_source=source)
+        game.PUNCH_DAMAGE = 1.0
+        game.run_headless(max_ticks=int(32 / tick_dt), stop_at_gameover=False)
+        return f"{100 - game.p2_health:.0f}/{100 - game.p1_health:.0f}"
+
+    print(f"punches landed P1/P2 ({len(pairs)} frames each, {args.delay:.0f} ms + up to {args.jitter:.0f} ms jitter)")
+    print(f"{'input':<14}{'clean link':>12}{'jittery link':>14}")
+    for name, buffered in (("latest only", False), ("frame buffer", True)):
+        print(f"{name:<14}{hits(0.0, buffered):>12}{hits(jitter, buffered):>14}")
+
+    buffer = FrameBuffer(capacity=64)
+    frames = [frame(i) for i in range(args.iterations)]
+    start = time.perf_counter()
+    for i, f in enumerate(frames):
+        buffer.push(f, f.timestamp - 0.98)
+        buffer.pop_ready(f.timestamp - 0.98)
+    print(f"push + pop_ready: {(time.perf_counter() - start) / len(frames) * 1e6:.1f} us/frame")
+    if not all(results):
+        raise SystemExit(1)
+
+# --- Multi-gesture detection ---
+def score_gestures(detections, events, labels, slack=0.1):
+    """
+    Matches (time, label) detections to labeled (label, start, end) events.
+    Returns {label: (true positives, false positives, events)}.
+    """
+    scores = {label: [0, 0, 0] for label in labels}
+    for label, _, _ in events:
+        if label in scores:
+            scores[label][2] += 1
+    matched = set()
+    for t, label in detections:
+        if label not in scores:
+            continue
+        hit = next((i for i, (event_label, start, end) in enumerate(events)
+                    if event_label == label and start <= t <= end + slack and i not in matched), None)
+        if hit is None:
+            scores[label][1] += 1
+        else:
+            matched.add(hit)
+            scores[label][0] += 1
+    return scores
+
+def bench_gestures(args):
+    from src.logic.gestures import ACTIONS, GestureDetector
+    from src.logic.rules import ActionDetector
+    from src.logic.synthetic import gesture_sequence
+
+    failed = False
+    for noise in (0.0, 0.003):
+        # Two players with different scripts, one detector call per batch of frames
+        sequences = [gesture_sequence(seconds=120, noise=noise, seed=seed) for seed in (1, 2)]
+        for batch in (1, 4):
+            detector = GestureDetector(players=2)
+            detections = [[], []]
+            frames = len(sequences[0][0])
+            for start in range(0, frames, batch):
+                for player, (player_frames, _) in enumerate(sequences):
+                    for f in player_frames[start:start + batch]:
+                        detector.push(player, f, f.timestamp)
+                for player, action in enumerate(detector.detect()):
+                    if action != 'IDLE':
+                        detections[player].append((sequences[player][0][min(start + batch, frames) - 1].timestamp, action))
+
+            totals = {label: [0, 0, 0] for label in ACTIONS}
+            for player, (_, events) in enumerate(sequences):
+                for label, counts in score_gestures(detections[player], events, ACTIONS, slack=batch / 30 + 0.1).items():
+                    totals[label] = [a + b for a, b in zip(totals[label], counts)]
+            print(f"noise {noise}, {batch} frame(s) per call:")
+            print(f"  {'gesture':<13}{'events':>7}{'precision':>11}{'recall':>8}")
+            for label, (tp, fp, n) in totals.items():
+                precision = tp / (tp + fp) if tp + fp else 1.0
+                recall = tp / n if n else 1.0
+                print(f"  {label:<13}{n:>7}{precision:>11.2f}{recall:>8.2f}")
+                if noise == 0.0 and (precision < 0.9 or recall < 0.9):
+                    failed = True
+
+        # The classic detector on the same frames, punches only
+        totals = {label: [0, 0, 0] for label in ('PUNCH_LEFT', 'PUNCH_RIGHT')}
+        for player_frames, events in sequences:
+            classic = ActionDetector()
+            detections = []
+            for f in player_frames:
+                action = classic.detect(f, f.timestamp)
+                if action != 'IDLE':
+                    detections.append((f.timestamp, action))
+            for label, counts in score_gestures(detections, events, totals).items():
+                totals[label] = [a + b for a, b in zip(totals[label], counts)]
+        print("  ActionDetector: " + ", ".join(
+            f"{label} precision {tp / (tp + fp) if tp + fp else 1.0:.2f} recall {tp / n if n else 1.0:.2f}"
+            for label, (tp, fp, n) in totals.items()))
+
+    # Arm already held out while the body slides across at a steady speed: fast
+    # and extended, but never thrown, so no punch
+    from src.logic.frame import PoseFrame
+    from src.logic.synthetic import synthetic_pose
+    detector = GestureDetector(players=1)
+    slide = []
+    for i in range(60):
+        t = i / 30
+        pose = synthetic_pose(t, punch_left=1.0)
+        pose[:, 0] += 0.6 * t
+        action = detector.update([PoseFrame(pose, t, i)], [t])[0]
+        if action != 'IDLE':
+            slide.append(action)
+    print(f"{'ok  ' if not slide else 'FAIL'} steady slide with the arm out: {len(slide)} false strikes")
+    failed |= bool(slide)
+
+    # Same scripted fight through the engine with either detector
+    from src.game.engine import GameEngine
+    from src.game.sources import GeneratorLandmarkSource
+    from src.logic.synthetic import fight_frames
+    outcomes = set()
+    for gestures in (False, True):
+        game = GameEngine(display="none", landmark_source=GeneratorLandmarkSource(fight_frames(), repeat=4),
+                          gestures=gestures)
+        game.PUNCH_DAMAGE = 10.0  # short match
+        stats = game.run_headless(max_ticks=120 * 60)
+        outcomes.add((stats['winner'], stats['health']))
+        print(f"engine, {'GestureDetector' if gestures else 'ActionDetector':<16} KO at {stats['sim_time']:5.2f}s, "
+              f"winner {stats['winner']}, health {stats['health']}")
+    if len(outcomes) != 1:
+        print("OUTCOMES DIFFER")
+        failed = True
+
+    # Cost per game tick with a new frame for each player
+    frames = sequences[0][0][:args.iterations]
+    classic = [ActionDetector(), ActionDetector()]
+    def classic_tick(i=[0]):
+        f = frames[i[0] % len(frames)]
+        i[0] += 1
+        classic[0].detect(f, f.timestamp)
+        classic[1].detect(f, f.timestamp)
+    detector = GestureDetector(players=2)
+    def batched_tick(i=[0]):
+        f = frames[i[0] % len(frames)]
+        i[0] += 1
+        detector.push(0, f, f.timestamp)
+        detector.push(1, f, f.timestamp)
+        detector.detect()
+    print(f"2 x ActionDetector.detect (punches):          {time_us(classic_tick, args.iterations):7.1f} us")
+    print(f"GestureDetector push x2 + detect (7 gestures): {time_us(batched_tick, args.iterations):7.1f} us")
+    # One batched pass costs about the same for more players
+    for players in (8, 32):
+        many = GestureDetector(players=players)
+        def many_tick(i=[0]):
+            f = frames[i[0] % len(frames)]
+            i[0] += 1
+            for player in range(players):
+                many.push(player, f, f.timestamp)
+            many.detect()
+        print(f"{f'GestureDetector, {players} players:':<47}{time_us(many_tick, args.iterations // 4):7.1f} us")
+    if failed:
+        raise SystemExit(1)
+
+# --- Geometry kernels ---
+def scalar_angle(a, b, c):
+    """
+    The original per-call calculate_angle, as the reference.
+    """
+    a = np.array(a)
+    b = np.array(b)
+    c = np.array(c)
+    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
+    angle = np.abs(radians*180.0/np.pi)
+    if angle > 180.0:
+        angle = 360 - angle
+    return angle
+
+def bench_geometry(args):
+    from src.logic.geometry import ELBOWS, KNEES, calculate_angle, joint_angles, normalize_keypoint, normalize_pose, torso_origin
+
+    rng = np.random.default_rng(0)
+    joints = np.concatenate([ELBOWS, KNEES, [(0, 11, 23), (11, 23, 25), (12, 24, 26), (13, 11, 23)]])
+    ok = True
+
+    # 2D angles: identical to the scalar version, float32 and float64
+    for dtype in (np.float32, np.float64):
+        points = rng.random((200, 33, 3)).astype(dtype)
+        batched = joint_angles(points[..., :2], joints)
+        reference = np.array([[scalar_angle(p[a], p[b], p[c]) for a, b, c in joints] for p in points])
+        wrapped = np.array([[calculate_angle(p[a], p[b], p[c]) for a, b, c in joints] for p in points])
+        same = np.array_equal(batched, reference) and np.array_equal(wrapped, reference)
+        ok &= same
+        print(f"2D angles, {np.dtype(dtype).name}: max diff {np.abs(batched - reference).max():.1e}, "
+              f"{'identical' if same else 'DIFFERENT'}")
+
+    # 3D angles against arccos of the normalized dot product, and a known right angle
+    points = rng.random((200, 33, 3))
+    batched = joint_angles(points, joints)
+    ba = points[:, joints[:, 0]] - points[:, joints[:, 1]]
+    bc = points[:, joints[:, 2]] - points[:, joints[:, 1]]
+    cos = (ba * bc).sum(-1) / np.linalg.norm(ba, axis=-1) / np.linalg.norm(bc, axis=-1)
+    error = np.abs(batched - np.degrees(np.arccos(np.clip(cos, -1, 1)))).max()
+    elbow = np.zeros((33, 3))
+    elbow[11], elbow[13], elbow[15] = (0, 0, 0), (0, 0.3, 0), (0, 0.6, 0.4)  # forearm towards the camera
+    bent = joint_angles(elbow, ELBOWS[:1])[0]
+    ok &= error < 1e-6 and abs(bent - np.degrees(np.arccos(-0.6))) < 1e-9
+    print(f"3D angles: max diff vs arccos {error:.1e}, elbow bent towards the camera {bent:.1f} deg "
+          f"(image plane {joint_angles(elbow[:, :2], ELBOWS[:1])[0]:.1f})")
+
+    # Whole-frame normalization vs per-point
+    points = rng.random((50, 33, 2))
+    center, width = torso_origin(points)
+    batched = normalize_pose(points)
+    reference = np.array([[normalize_keypoint(p, center[i], 1 / width[i]) for p in frame] for i, frame in enumerate(points)])
+    error = np.abs(batched - reference).max()
+    ok &= error < 1e-12
+    print(f"normalize_pose vs normalize_keypoint: max diff {error:.1e}")
+
+    # Throughput: angles per second
+    print(f"{'frames':>8}{'joints':>8}{'per-call us':>13}{'batched us':>12}{'speedup':>9}")
+    for frames in (1, 8, 120):
+        points = rng.random((frames, 33, 2)).astype(np.float32)
+        n = max(1, args.iterations // (frames * len(joints)))
+        per_call = time_us(lambda: [calculate_angle(p[a], p[b], p[c]) for p in points for a, b, c in joints], n)
+        batched = time_us(lambda: joint_angles(points, joints), 2000)
+        print(f"{frames:>8}{len(joints):>8}{per_call:>13.1f}{batched:>12.1f}{per_call / batched:>8.0f}x")
+    points = rng.random((120, 33, 2))
+    per_point = time_us(lambda: [[normalize_keypoint(p, c, 1 / w) for p in frame]
+                                 for frame, c, w in zip(points, center, width)], 5)
+    whole = time_us(lambda: normalize_pose(points), 2000)
+    print(f"normalize 120 frames: per point {per_point:.0f} us, whole frames {whole:.1f} us")
+    if not ok:
+        raise SystemExit(1)
+
+# --- Swept hitboxes ---
+def bench_physics(args):
+    from src.game.engine import GameEngine
+    from src.game.sources import GeneratorLandmarkSource
+    from src.logic.physics import BOX_NAMES, STRIKE_NAMES, PhysicsEngine, segment_distance
+    from src.logic.synthetic import fight_frames, synthetic_pose
+
+    failures = []
+    def check(name, ok):
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    def distance(p0, p1, q0, q1):
+        return float(segment_distance(*(np.array(p, dtype=np.float64) for p in (p0, p1, q0, q1))))
+
+    print("segment distance:")
+    check("crossing segments touch", distance((-1, -1), (1, 1), (-1, 1), (1, -1)) == 0.0)
+    check("parallel segments 3 apart", abs(distance((0, 0), (4, 0), (1, 3), (5, 3)) - 3) < 1e-12)
+    check("collinear, end to end 2 apart", abs(distance((0, 0), (1, 0), (3, 0), (4, 0)) - 2) < 1e-12)
+    check("point above a segment", abs(distance((0, 5), (0, 5), (-1, 0), (1, 0)) - 5) < 1e-12)
+    check("point past a segment's end", abs(distance((3, 0), (3, 0), (-1, 0), (1, 0)) - 2) < 1e-12)
+    check("segment vs point", abs(distance((-1, 0), (1, 0), (0, 5), (0, 5)) - 5) < 1e-12)
+    check("point to point", abs(distance((0, 0), (0, 0), (3, 4), (3, 4)) - 5) < 1e-12)
+    check("T junction", abs(distance((0, 1), (0, 3), (-2, 0), (2, 0)) - 1) < 1e-12)
+
+    # Random segments against dense sampling, and symmetry
+    rng = np.random.default_rng(0)
+    p0, p1, q0, q1 = rng.uniform(-1, 1, (4, 500, 2))
+    exact = segment_distance(p0, p1, q0, q1)
+    u = np.linspace(0, 1, 400)[:, None, None]
+    ps = p0 + (p1 - p0) * u
+    qs = q0 + (q1 - q0) * u
+    sampled = np.array([np.linalg.norm(ps[:, None, i] - qs[None, :, i], axis=-1).min() for i in range(len(exact))])
+    check(f"500 random pairs vs sampling (max gap {np.max(sampled - exact):.1e})",
+          np.all(exact <= sampled + 1e-12) and np.all(sampled - exact < 1e-2))
+    check("symmetric in its arguments", np.allclose(exact, segment_distance(q0, q1, p0, p1)))
+
+    print("hurtboxes and strikes:")
+    physics = PhysicsEngine(placements={1: (430, 100), 2: (550, 100)})
+    stance = synthetic_pose()
+    jab = synthetic_pose(punch_left=1.0)
+    x, y, w, h = physics.get_hitbox(stance, player_id=1)
+    check(f"stance body box ({x:.0f}, {y:.0f}, {w:.0f}, {h:.0f}) holds every landmark",
+          all(physics.check_hit(p, (x, y, w, h)) for p in physics.to_arena(1, stance)))
+    hx, hy, hw, hh = physics.get_hitbox(stance, "head", player_id=2)
+    check("head box centred on the nose", np.allclose((hx + hw / 2, hy + hh / 2), physics.to_arena(2, stance)[0]))
+    check("no contact from the guard", not physics.strike_hits(1, stance, stance, 2, stance).any())
+    hits = physics.strike_hits(1, stance, jab, 2, stance)
+    check("left jab lands with the left fist only: "
+          + ", ".join(BOX_NAMES[i] for i in np.flatnonzero(hits[0])), hits[0].any() and not hits[1:].any())
+    far = PhysicsEngine(placements={1: (200, 100), 2: (800, 100)})
+    check("same jab out of reach misses", not far.strike_hits(1, stance, jab, 2, stance).any())
+
+    # Tunneling: the fist jumps from one side of the head to the other in one frame
+    head = physics.to_arena(2, stance)[0]
+    before, after = stance.copy(), stance.copy()
+    before[15, :2] = (head - (430, 100) - (60, 0)) / physics.scale
+    after[15, :2] = (head - (430, 100) + (60, 0)) / physics.scale
+    at_ends = physics.strike_hits(1, None, before, 2, stance)[0, 0] or physics.strike_hits(1, None, after, 2, stance)[0, 0]
+    swept = physics.strike_hits(1, before, after, 2, stance)[0, 0]
+    check(f"fist crossing the head between frames: endpoints {'hit' if at_ends else 'miss'}, sweep "
+          f"{'hits' if swept else 'misses'}", swept and not at_ends)
+
+    print("engine (punch damage 10):")
+    for gestures in (False, True):
+        for placements in (None, {1: (200, 100), 2: (800, 100)}):
+            game = GameEngine(display="none", landmark_source=GeneratorLandmarkSource(fight_frames(), repeat=4),
+                              gestures=gestures, hitboxes=True)
+            if placements:
+                game.physics.placements = placements
+            game.PUNCH_DAMAGE = 10.0
+            stats = game.run_headless(max_ticks=120 * 60)
+            name = (f"{'GestureDetector' if gestures else 'ActionDetector'}, "
+                    f"{'out of reach' if placements else 'fighting distance'}: winner {stats['winner']}, "
+                    f"health {stats['health']}")
+            check(name, stats['health'] == ((100, 100) if placements else (30.0, 0)))
+
+    # Cost: every strike sweep x every hurtbox, batched vs one pair at a time
+    prev_pose, pose = synthetic_pose(0.0), synthetic_pose(0.1, punch_left=0.5)
+    batched = time_us(lambda: physics.strike_hits(1, prev_pose, pose, 2, stance), args.iterations)
+    starts, ends, radii = physics.hurtboxes(2, stance)
+    fists = physics.to_arena(1, pose)
+    def per_pair():
+        for point in (15, 16, 27, 28):
+            for box in range(len(radii)):
+                segment_distance(fists[point], fists[point], starts[box], ends[box])
+    print(f"strike_hits ({len(STRIKE_NAMES)} x {len(BOX_NAMES)}): {batched:.1f} us batched, "
+          f"{time_us(per_pair, max(1, args.iterations // 10)):.1f} us one pair at a time")
+    many = rng.uniform(0, 1000, (4, 1000, 1, 2)), rng.uniform(0, 1000, (4, 1, 1000, 2))
+    pairs = time_us(lambda: segment_distance(many[0][0], many[0][1], many[1][0], many[1][1]), 10)
+    print(f"segment_distance, 1000 x 1000 pairs: {pairs / 1000:.1f} ms ({1e6 / pairs:.0f}M pairs/s)")
+    if failures:
+        raise SystemExit(1)
+
+# --- Template gestures (DTW) ---
+def bench_templates(args):
+    import os
+    import tempfile
+    from src.logic.synthetic import COMBOS, combo_frames, combo_sequence
+    from src.logic.templates import TemplateLibrary, TemplateRecognizer
+
+    threshold = 12.0
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+
+    def library(count):
+        """
+        Each combo at three speeds, then random-speed noisy variants up to count.
+        """
+        templates = []
+        for speed in (0.8, 1.0, 1.25):
+            for name in sorted(COMBOS):
+                frames, times = combo_frames(name, speed=speed)
+                templates.append((f"{name.lower()}_{speed:g}", name, frames, times, threshold))
+        names = sorted(COMBOS)
+        while len(templates) < count:
+            name = names[rng.integers(len(names))]
+            frames, times = combo_frames(name, speed=rng.uniform(0.7, 1.4), noise=0.004, seed=len(templates))
+            templates.append((f"{name.lower()}_{len(templates)}", name, frames, times, threshold))
+        path = os.path.join(directory, f"templates_{count}.gftp")
+        TemplateLibrary.save(path, templates[:count])
+        return path
+
+    frames, events = combo_sequence(seconds=120, noise=0.003, seed=3)
+
+    def run(path, exhaustive=False):
+        start = time.perf_counter()
+        lib = TemplateLibrary(path)
+        opened = time.perf_counter() - start
+        recognizer = TemplateRecognizer(lib)
+        detections = []
+        times = []
+        for f in frames:
+            start = time.perf_counter()
+            match = recognizer.update(f, f.timestamp)
+            times.append(time.perf_counter() - start)
+            if exhaustive:
+                # Every template through full DTW, no bounds
+                queries, _ = recognizer.queries(f.timestamp)
+                start = time.perf_counter()
+                recognizer.dtw(recognizer.costs(queries, np.arange(len(lib))), np.full(len(lib), np.inf))
+                times[-1] = time.perf_counter() - start
+            if match:
+                detections.append((f.timestamp, match[0]))
+        return lib, recognizer, detections, np.array(times) * 1e6, opened
+
+    def reference_dtw(cost, band):
+        m = len(cost)
+        table = np.full((m + 1, m + 1), np.inf)
+        table[0, 0] = 0.0
+        for i in range(m):
+            for j in range(max(0, i - band), min(m, i + band + 1)):
+                table[i + 1, j + 1] = cost[i, j] + min(table[i, j], table[i, j + 1], table[i + 1, j])
+        return table[m, m]
+
+    # Batched DTW against the textbook double loop, and the bounds around it
+    path = library(15)
+    lib = TemplateLibrary(path)
+    recognizer = TemplateRecognizer(lib)
+    for f in frames[:90]:
+        recognizer.update(f, f.timestamp)
+    queries, _ = recognizer.queries(frames[89].timestamp)
+    everything = np.arange(len(lib))
+    cost = recognizer.costs(queries, everything)
+    distances = recognizer.dtw(cost, np.full(len(lib), np.inf))
+    reference = np.array([reference_dtw(c, recognizer.band) for c in cost])
+    excess = np.maximum(queries - recognizer.upper, 0.0) + np.maximum(recognizer.lower - queries, 0.0)
+    bound = (excess ** 2).sum(axis=(1, 2))
+    straight = np.einsum('kii->k', cost)
+    exact = np.allclose(distances, reference)
+    ordered = np.all(bound <= distances + 1e-9) and np.all(distances <= straight + 1e-9)
+    print(f"DTW vs reference: max diff {np.abs(distances - reference).max():.1e}; "
+          f"LB_Keogh <= DTW <= straight path: {'yes' if ordered else 'NO'}")
+    failed = not (exact and ordered)
+
+    # Accuracy on a stream of combos at random speeds, with single moves in between
+    lib, recognizer, detections, _, _ = run(path)
+    scores = score_gestures(detections, events, sorted(COMBOS), slack=0.5)
+    print(f"{len(lib)} templates, threshold {threshold}, 120 s stream with noise:")
+    print(f"  {'combo':<14}{'events':>7}{'precision':>11}{'recall':>8}")
+    for name, (tp, fp, n) in scores.items():
+        precision = tp / (tp + fp) if tp + fp else 1.0
+        recall = tp / n if n else 1.0
+        print(f"  {name:<14}{n:>7}{precision:>11.2f}{recall:>8.2f}")
+        failed |= precision < 0.8 or recall < 0.8
+    print(f"  {sum(1 for label, _, _ in events if label is None)} single moves in between")
+
+    size = os.path.getsize(path)
+    print(f"library file: {size} bytes, {(size - 16) / len(lib):.0f} bytes per template "
+          f"({lib.length} frames x {lib.dims} float16 features + 40 byte entry)")
+
+    # Cost per update as the library grows
+    print(f"{'templates':>10}{'open ms':>9}{'mean us':>9}{'p99 us':>8}{'matches/s':>12}"
+          f"{'lb pruned':>11}{'abandoned':>11}{'full dtw':>10}{'exhaustive us':>15}")
+    for count in (15, 60, 240, 960):
+        path = library(count)
+        lib, recognizer, _, times, opened = run(path)
+        stats = recognizer.stats
+        checked = stats['checked']
+        _, _, _, exhaustive, _ = run(path, exhaustive=True)
+        print(f"{count:>10}{opened * 1000:>9.2f}{times.mean():>9.0f}{np.percentile(times, 99):>8.0f}"
+              f"{count * 1e6 / times.mean():>12.0f}{stats['lb_pruned'] / checked:>11.1%}"
+              f"{stats['abandoned'] / checked:>11.1%}{stats['completed'] / checked:>10.1%}{exhaustive.mean():>15.0f}")
+        if count <= 60 and times.mean() > 2000:
+            print("  over the 2 ms budget")
+            failed = True
+    if failed:
+        raise SystemExit(1)
+
+def bench_tuning(args):
+    import os
+    import tempfile
+    from src.logic.synthetic import gesture_sequence
+    from src.logic.tuning import build_cache, grid_configs, run_sweep, search, write_labels
+    from src.network.recorder import SessionRecorder
+
+    directory = tempfile.mkdtemp()
+
+    # Two labeled sessions, both players punching (and kicking, blocking...) at random
+    sessions = []
+    for s in range(2):
+        path = os.path.join(directory, f"session_{s}.gfsl")
+        recorder = SessionRecorder(path)
+        recorder.start()
+        labels = {}
+        for player_id in (1, 2):
+            frames, events = gesture_sequence(seconds=30, noise=0.002, seed=10 * s + player_id)
+            for f in frames:
+                recorder.record(player_id, f, recv_time=f.timestamp + 0.03)
+            labels[player_id] = [event for event in events if event[0] is not None]
+        recorder.close()
+        write_labels(path + '.labels.csv', labels)
+        sessions.append(path)
+
+    cache = os.path.join(directory, 'cache.npy')
+    start = time.perf_counter()
+    streams = build_cache(sessions, cache)
+    built = time.perf_counter() - start
+    rows = streams[-1][1]
+    print(f"{len(sessions)} sessions, {len(streams)} streams, {rows} frames: cache built in {built * 1000:.0f} ms "
+          f"({os.path.getsize(cache) / 1e6:.1f} MB, memory-mapped by every worker)")
+
+    # The pool must reproduce the serial results exactly
+    configs = grid_configs()[::9]
+    start = time.perf_counter()
+    serial = run_sweep(configs, streams, cache, workers=0)
+    serial_time = time.perf_counter() - start
+    workers = os.cpu_count()
+    start = time.perf_counter()
+    pooled = run_sweep(configs, streams, cache, workers=workers)
+    pool_time = time.perf_counter() - start
+    keys = ('precision', 'recall', 'f1', 'latency_p50_ms', 'latency_p95_ms')
+    same = all(np.allclose([a[k] for k in keys], [b[k] for k in keys], equal_nan=True) for a, b in zip(serial, pooled))
+    print(f"{len(configs)} configs: serial {serial_time:.2f} s, pool of {workers} {pool_time:.2f} s "
+          f"(job {np.mean([r['seconds'] for r in pooled]) * 1000:.0f} ms); results identical: {'yes' if same else 'NO'}")
+
+    for method, trials in (('grid', None), ('random', 24), ('bayes', 24)):
+        start = time.perf_counter()
+        results = search(sessions, method, trials or 0, workers=workers, seed=1,
+                         cache_path=os.path.join(directory, f'{method}.npy'))
+        best = results[0]
+        print(f"{method:>7}: {len(results):>3} configs in {time.perf_counter() - start:5.1f} s, best "
+              f"min_cutoff {best['min_cutoff']:.3g} beta {best['beta']:.3g} "
+              f"elbow {best['ELBOW_EXTENSION_THRESHOLD']:.0f} velocity {best['PUNCH_VELOCITY_THRESHOLD']:.2f}: "
+              f"precision {best['precision']:.2f} recall {best['recall']:.2f} p50 {best['latency_p50_ms']:.0f} ms")
+
+    # Where the engine's settings land
+    default = run_sweep([{'min_cutoff': 0.01, 'beta': 0.5, 'ELBOW_EXTENSION_THRESHOLD': 150,
+                          'PUNCH_VELOCITY_THRESHOLD': 0.5}], streams, cache, workers=0)[0]
+    print(f"engine defaults: precision {default['precision']:.2f} recall {default['recall']:.2f} "
+          f"p50 {default['latency_p50_ms']:.0f} ms")
+    if not same:
+        raise SystemExit(1)
+
+BENCHMARKS = {
+    'wire': bench_wire,
+    'frame': bench_frame,
+    'smoothing': bench_smoothing,
+    'server': bench_server,
+    'transport': bench_transport,
+    'pipeline': bench_pipeline,
+    'camera': bench_camera,
+    'workers': bench_workers,
+    'roi': bench_roi,
+    'governor': bench_governor,
+    'sprites': bench_sprites,
+    'render': bench_render,
+    'dirty': bench_dirty,
+    'avatar': bench_avatar,
+    'timestep': bench_timestep,
+    'headless': bench_headless,
+    'recorder': bench_recorder,
+    'latency': bench_latency,
+    'clocksync': bench_clocksync,
+    'framebuffer': bench_framebuffer,
+    'gestures': bench_gestures,
+    'geometry': bench_geometry,
+    'physics': bench_physics,
+    'templates': bench_templates,
+    'tuning': bench_tuning,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Gesture Fighter Benchmarks')
+    parser.add_argument('name', choices=sorted(BENCHMARKS), help='Benchmark to run')
+    parser.add_argument('--iterations', type=int, default=2000, help='Iterations per measurement')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per load-test run')
+    parser.add_argument('--rate', type=float, default=30.0, help='Frames/sec sent by each simulated client')
+    parser.add_argument('--port', type=int, default=5600, help='First loopback port for network benchmarks')
+    parser.add_argument('--delay', type=float, default=20.0, help='Lossy link one-way delay (ms)')
+    parser.add_argument('--jitter', type=float, default=40.0, help='Lossy link jitter (ms), enough to reorder 30 fps frames')
+    parser.add_argument('--loss', type=float, default=0.05, help='Lossy link loss probability')
+    parser.add_argument('--source', type=str, default=None, help='Recorded video file or frame directory')
+    parser.add_argument('--drop-policy', choices=['drop_oldest', 'drop_newest', 'block'], default='block',
+                        help='Pipeline queue policy (block = process every frame)')
+    parser.add_argument('--queue-size', type=int, default=2, help='Frames buffered between pipeline stages')
+    parser.add_argument('--budget-ms', type=float, default=33.0, help='Latency budget for the governor benchmark')
+    args = parser.parse_args()
+    BENCHMARKS[args.name](args)
+
+if __name__ == "__main__":
+    main()
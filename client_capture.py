@@ -23,14 +23,161 @@ def serialize_landmarks(landmarks):
         })
     return json.dumps(data).encode('utf-8')
 
+# Binary frame format (must match src/network/utils.py)
+BINARY_VERSION = 1
+FRAME_HEADER = struct.Struct('<BBBBId')  # version, encoding, player_id, reserved, seq, timestamp
+ENCODING_FLOAT32 = 0
+ENCODING_INT16 = 1
+QUANT_SCALE = 8192.0
+HELLO = struct.Struct('<4sBB')
+UDP_ACK = struct.Struct('<4sBBHI')  # magic, version, encoding, udp port, token
+UDP_PREFIX = struct.Struct('<I')
+PING = struct.Struct('<4sd')     # magic, t0
+PONG = struct.Struct('<4sddd')   # magic, t0, t1, t2
+SYNC = struct.Struct('<4sdddd')  # magic, t0, t1, t2, t3
+
+def encode_landmarks(landmarks, seq, timestamp, quantize=False):
+    values = []
+    for lm in landmarks.landmark:
+        values.extend((lm.x, lm.y, lm.z, lm.visibility))
+    if quantize:
+        q = [max(-32768, min(32767, int(round(v * QUANT_SCALE)))) for v in values]
+        body = struct.pack(f'<{len(q)}h', *q)
+        encoding = ENCODING_INT16
+    else:
+        body = struct.pack(f'<{len(values)}f', *values)
+        encoding = ENCODING_FLOAT32
+    return FRAME_HEADER.pack(BINARY_VERSION, encoding, 0, 0, seq & 0xFFFFFFFF, timestamp) + body
+
+def send_msg(sock, data):
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+def recvall(sock, n):
+    data = b''
+    while len(data) < n:
+        packet = sock.recv(n - len(data))
+        if not packet:
+            return None
+        data += packet
+    return data
+
+def negotiate(sock, quantize, udp=False, timeout=1.0):
+    """
+    Offers binary frames (optionally over UDP) to the host.
+    Returns (use_binary, udp_port, udp_token); udp_port is None for TCP.
+    """
+    magic = b'GFHU' if udp else b'GFHI'
+    send_msg(sock, HELLO.pack(magic, BINARY_VERSION, ENCODING_INT16 if quantize else ENCODING_FLOAT32))
+    sock.settimeout(timeout)
+    try:
+        raw_len = recvall(sock, 4)
+        reply = recvall(sock, struct.unpack('>I', raw_len)[0]) if raw_len else None
+    except socket.timeout:
+        reply = None
+    finally:
+        sock.settimeout(None)
+    if reply and len(reply) == UDP_ACK.size and reply.startswith(b'GFUD'):
+        _, _, _, udp_port, token = UDP_ACK.unpack(reply)
+        return True, udp_port, token
+    return bool(reply) and reply.startswith(b'GFOK'), None, None
+
+def sync_clock(sock, rounds=8, timeout=0.5):
+    """
+    NTP-style ping/pong with the host; each exchange is reported back so the
+    host can map capture timestamps onto its clock.
+    Returns (offset, rtt) of the lowest-RTT exchange, or None.
+    """
+    best = None
+    sock.settimeout(timeout)
+    try:
+        for _ in range(rounds):
+            t0 = time.time()
+            send_msg(sock, PING.pack(b'GFPI', t0))
+            raw_len = recvall(sock, 4)
+            reply = recvall(sock, struct.unpack('>I', raw_len)[0]) if raw_len else None
+            t3 = time.time()
+            if not reply or len(reply) != PONG.size or not reply.startswith(b'GFPO'):
+                break
+            _, echo, t1, t2 = PONG.unpack(reply)
+            if echo != t0:
+                break
+            send_msg(sock, SYNC.pack(b'GFSY', t0, t1, t2, t3))
+            rtt = (t3 - t0) - (t2 - t1)
+            if best is None or rtt < best[1]:
+                best = (((t1 - t0) + (t2 - t3)) / 2, rtt)
+    except socket.timeout:
+        pass
+    finally:
+        sock.settimeout(None)
+    return best
+
+# --- Pipelined mode (needs the src package next to this script) ---
+def run_pipeline(args):
+    from src.network.client import GameClient
+    from src.perception.pipeline import CapturePipeline, print_report
+
+    client = GameClient(args.host, args.port, wire_format='json' if args.json else 'binary',
+                        quantize=args.quantize, transport='udp' if args.udp else 'tcp')
+    if not client.connect():
+        return
+
+    if args.adaptive:
+        from src.perception.governor import AdaptivePoseEngine
+        pose_engine = AdaptivePoseEngine(budget_ms=args.budget_ms)
+    else:
+        from src.perception.pose import PoseEngine
+        pose_engine = PoseEngine(model_complexity=args.complexity)
+
+    source = args.source if args.source else args.camera
+    pipeline = CapturePipeline(source, pose_engine=pose_engine, client=client, preview=not args.no_preview,
+                               queue_size=args.queue_size, drop_policy=args.drop_policy)
+    if not pipeline.start():
+        client.close()
+        return
+
+    print("Pipelined capture started. Press 'q' to quit.")
+    try:
+        while not pipeline.finished:
+            shown = pipeline.poll_preview()
+            if shown is not None:
+                cv2.imshow('Gesture Fighter Client (Sending Data...)', shown[0])
+            if args.no_preview:
+                time.sleep(0.05)
+            elif cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        pipeline.stop()
+        client.close()
+        cv2.destroyAllWindows()
+        print_report(pipeline.report())
+        if args.adaptive:
+            print(f"Governor: {pose_engine.stats()}")
+
 # --- Main Logic ---
 def main():
     parser = argparse.ArgumentParser(description='Gesture Fighter Client')
     parser.add_argument('--host', type=str, required=True, help='IP Address of the Mac Host')
     parser.add_argument('--port', type=int, default=5000, help='Port to connect to')
     parser.add_argument('--camera', type=int, default=0, help='Camera ID')
+    parser.add_argument('--json', action='store_true', help='Force the legacy JSON wire format')
+    parser.add_argument('--quantize', action='store_true', help='Send int16 quantized landmarks')
+    parser.add_argument('--udp', action='store_true', help='Stream frames over UDP (latest wins)')
+    parser.add_argument('--pipeline', action='store_true', help='Run capture/inference/send as parallel stages')
+    parser.add_argument('--source', type=str, default=None, help='Video file or frame directory instead of a camera (pipeline mode)')
+    parser.add_argument('--no-preview', action='store_true', help='Disable the preview window (pipeline mode)')
+    parser.add_argument('--queue-size', type=int, default=1, help='Frames buffered between stages (pipeline mode)')
+    parser.add_argument('--drop-policy', choices=['drop_oldest', 'drop_newest', 'block'], default='drop_oldest',
+                        help='What a full stage queue does (pipeline mode)')
+    parser.add_argument('--complexity', type=int, choices=[0, 1, 2], default=1, help='MediaPipe model complexity')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt complexity/resolution/frame-skip to hold --budget-ms (pipeline mode)')
+    parser.add_argument('--budget-ms', type=float, default=33.0, help='Inference latency budget for --adaptive')
     args = parser.parse_args()
 
+    if args.pipeline:
+        run_pipeline(args)
+        return
+
     print(f"Connecting to Host {args.host}:{args.port}...")
 
     # 1. Setup Network
@@ -38,6 +185,12 @@ def main():
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         sock.connect((args.host, args.port))
         print("Successfully Connected!")
+        use_binary, udp_port, udp_token = (False, None, None) if args.json else negotiate(sock, args.quantize, args.udp)
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if udp_port else None
+        print(f"Wire format: {'binary' if use_binary else 'json'} over {'UDP' if udp_sock else 'TCP'}")
+        clock = sync_clock(sock) if use_binary else None
+        if clock:
+            print(f"Clock offset to host {clock[0] * 1000:+.1f} ms (RTT {clock[1] * 1000:.1f} ms)")
     except Exception as e:
         print(f"Connection Failed: {e}")
         return
@@ -51,18 +204,20 @@ def main():
     # 3. Setup MediaPipe
     mp_pose = mp.solutions.pose
     pose = mp_pose.Pose(
-        model_complexity=1,
+        model_complexity=args.complexity,
         min_detection_confidence=0.5,
         min_tracking_confidence=0.5
     )
     mp_drawing = mp.solutions.drawing_utils
 
     print("Capture Started. Press 'q' to quit.")
+    seq = 0
 
     try:
         while True:
             ret, frame = cap.read()
             if not ret: break
+            capture_time = time.time()
 
             # Process
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -72,10 +227,18 @@ def main():
             # Send Data
             if results.pose_landmarks:
                 try:
-                    data = serialize_landmarks(results.pose_landmarks)
-                    # Send Length + Data
-                    msg = struct.pack('>I', len(data)) + data
-                    sock.sendall(msg)
+                    if use_binary:
+                        data = encode_landmarks(results.pose_landmarks, seq, capture_time, args.quantize)
+                        seq += 1
+                    else:
+                        data = serialize_landmarks(results.pose_landmarks)
+
+                    if udp_sock:
+                        udp_sock.sendto(UDP_PREFIX.pack(udp_token) + data, (args.host, udp_port))
+                    else:
+                        # Send Length + Data
+                        msg = struct.pack('>I', len(data)) + data
+                        sock.sendall(msg)
                 except Exception as e:
                     print(f"Send Error: {e}")
                     break
@@ -92,6 +255,7 @@ def main():
                 
     finally:
         cap.release()
+        if udp_sock: udp_sock.close()
         sock.close()
         cv2.destroyAllWindows()
         print("Disconnected.")
@@ -0,0 +1,129 @@
+import pygame
+
+class DirtyRectScreen:
+    """
+    Frame composer for the game screen: a static layer plus keyed dynamic elements.
+
+    Full mode (enabled=False) draws the static layer and every element straight
+    to the screen and reports the whole screen as changed, i.e. a plain redraw.
+
+    Dirty-rect mode keeps the static layer baked in a surface. Each frame the
+    rects the elements covered last frame are restored from it, every element is
+    drawn again, and only the old and new rects of elements whose signature or
+    rects changed are reported, ready for pygame.display.update(rects).
+    Elements must draw the same pixels for the same signature.
+    """
+    def __init__(self, screen, enabled=True):
+        self.screen = screen
+        self.enabled = enabled
+        self.static = None
+        self.static_key = None
+        self.elements = {}   # key -> (signature, rects) from the previous frame
+        self.current = {}
+        self.dirty = []
+        self.full = False
+
+        self.frames = 0
+        self.pixels_pushed = 0       # last frame
+        self.total_pixels_pushed = 0
+
+    def begin(self, static_key, draw_static):
+        """
+        Starts a frame on the static layer drawn by draw_static(surface).
+        A new static_key (e.g. a state change) repaints the whole screen.
+        """
+        self.current = {}
+        self.dirty = []
+        if not self.enabled:
+            draw_static(self.screen)
+            self.full = True
+            return
+
+        if static_key != self.static_key or self.static is None or self.static.get_size() != self.screen.get_size():
+            self.static = pygame.Surface(self.screen.get_size(), 0, self.screen)
+            draw_static(self.static)
+            self.static_key = static_key
+            self.screen.blit(self.static, (0, 0))
+            self.elements = {}
+            self.full = True
+            return
+
+        # Erase last frame's elements
+        self.full = False
+        for _, rects in self.elements.values():
+            for rect in rects:
+                self.screen.blit(self.static, rect, rect)
+
+    def draw(self, key, signature, draw_fn):
+        """
+        Draws one element with draw_fn(surface), which returns the Rect, list
+        of Rects or None it touched.
+        """
+        touched = draw_fn(self.screen)
+        if touched is None:
+            rects = []
+        elif isinstance(touched, pygame.Rect):
+            rects = [touched]
+        else:
+            rects = [rect for rect in touched if rect is not None]
+        rects = [rect for rect in rects if rect.width and rect.height]
+        self.current[key] = (signature, rects)
+
+        if self.enabled and not self.full:
+            previous = self.elements.get(key)
+            if previous is None or previous[0] != signature or previous[1] != rects:
+                if previous is not None:
+                    self.dirty.extend(previous[1])
+                self.dirty.extend(rects)
+
+    def end(self):
+        """
+        Finishes the frame. Returns the rects to push to the display.
+        """
+        screen_rect = self.screen.get_rect()
+        if self.full:
+            rects = [screen_rect]
+        else:
+            # Elements that disappeared this frame
+            for key, (_, old_rects) in self.elements.items():
+                if key not in self.current:
+                    self.dirty.extend(old_rects)
+            rects = merge_rects(rect.clip(screen_rect) for rect in self.dirty)
+            if sum(rect.width * rect.height for rect in rects) >= screen_rect.width * screen_rect.height:
+                rects = [screen_rect]
+        self.elements = self.current
+
+        self.frames += 1
+        self.pixels_pushed = sum(rect.width * rect.height for rect in rects)
+        self.total_pixels_pushed += self.pixels_pushed
+        return rects
+
+    def stats(self):
+        width, height = self.screen.get_size()
+        mean = self.total_pixels_pushed / self.frames if self.frames else 0.0
+        return {
+            'frames': self.frames,
+            'pixels_pushed': self.pixels_pushed,
+            'mean_pixels_pushed': mean,
+            'mean_screen_fraction': mean / (width * height),
+        }
+
+def merge_rects(rects):
+    """
+    Replaces overlapping rects with their bounding rect until none overlap,
+    so no pixel is pushed twice. Drops empty rects.
+    """
+    merged = []
+    for rect in rects:
+        if not (rect.width and rect.height):
+            continue
+        rect = rect.copy()
+        i = 0
+        while i < len(merged):
+            if rect.colliderect(merged[i]):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
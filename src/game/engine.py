@@ -1,37 +1,113 @@
+import os
 import pygame
 import sys
-from src.perception.camera import CameraManager
-from src.perception.pose import PoseEngine
+import time
 from src.logic.rules import ActionDetector
-from src.game.renderer import AvatarRenderer
+from src.game.renderer import AVATAR_SCALE, AVATAR_TOP, AvatarRenderer
+from src.game.dirty_rects import DirtyRectScreen
+from src.game.latency import LatencyTracker
+from src.logic.frame import as_pose_frame, lerp_pose
+from src.logic.physics import ACTION_STRIKES, PhysicsEngine
 
 class GameEngine:
-    def __init__(self):
+    def __init__(self, server_mode="threaded", dirty_rects=False, sim_hz=120, render_fps=60,
+                 landmark_source=None, display="window", recorder=None, latency_dump=None,
+                 gestures=False, hitboxes=False, udp_port=None,
+                 jitter_buffer=False):
+        # display: "window", "offscreen" (render to a Surface, no window) or "none" (no rendering)
+        self.display = display
+        if display != "window":
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
         self.WIDTH = 1280
         self.HEIGHT = 720
-        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT), pygame.DOUBLEBUF)
-        pygame.display.set_caption("Gesture Fighter - SERVER HOST")
+
+        # Fixed-timestep simulation: rules advance in SIM_DT ticks, rendering
+        # runs at render_fps (0 = uncapped) and interpolates between ticks
+        self.SIM_DT = 1.0 / sim_hz
+        self.MAX_FRAME_TIME = 0.25  # longest stall the simulation catches up on
+        self.render_fps = render_fps
+
+        # Rules in simulation time
+        self.PUNCH_DAMAGE = 1.5     # per detected punch
+        self.KICK_DAMAGE = 2.5      # per detected kick (gestures=True)
+        self.HIT_FLASH_TIME = 0.2   # seconds "HIT!" stays up
+        self.STRIKE_WINDOW = 0.35   # seconds a detected strike can still connect (hitboxes=True)
+
+        if display == "window":
+            self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT), pygame.DOUBLEBUF)
+            pygame.display.set_caption("Gesture Fighter - SERVER HOST")
+        else:
+            self.screen = pygame.Surface((self.WIDTH, self.HEIGHT))
         self.clock = pygame.time.Clock()
+
+        # Per-stage latency (F3 shows it), dumped to latency_dump (.csv/.json) every 5 s
+        self.latency = LatencyTracker(dump_path=latency_dump)
+        self.show_latency = False
+        self.latency_lines = ()
+        self.latency_refresh = 0.0
+        self.pending_capture = {1: None, 2: None}  # capture times not yet on screen
+        self.pending_hit = {1: None, 2: None}
         
-        # Networking
-        from src.network.server import MultiPlayerServer
-        self.server = MultiPlayerServer(port=5000)
+        # Networking ("threaded": one thread per client, "async": single event loop, room 0,
+        # "local": cameras 0 and 1 on this machine, no client laptops).
+        # A landmark_source (see src/game/sources.py) replaces the server entirely.
+        # A recorder (src/network/recorder.py) logs what the threaded server receives;
+        # with udp_port set it also takes frames over UDP (clients started with --udp),
+        # with jitter_buffer it plays every frame out through a per-player FrameBuffer.
+        if landmark_source is not None:
+            self.server = landmark_source
+        elif server_mode == "local":
+            from src.perception.pool import LocalPoseTracker
+            self.server = LocalPoseTracker(camera_ids=[0, 1])
+        elif server_mode == "async":
+            from src.network.async_server import AsyncMultiPlayerServer
+            self.server = AsyncMultiPlayerServer(port=5000, latency=self.latency)
+        else:
+            from src.network.server import MultiPlayerServer
+            self.server = MultiPlayerServer(port=5000, udp_port=udp_port, recorder=recorder,
+                                            latency=self.latency, buffer_frames=jitter_buffer)
+        # Servers with per-player frame buffers hand over every frame (see new_frames)
+        self.buffered_input = getattr(self.server, 'buffer_frames', False)
         
         # Logic
         from src.logic.smoothing import LandmarkSmoother
-        self.smoother_p1 = LandmarkSmoother(min_cutoff=0.01, beta=0.5)
-        self.smoother_p2 = LandmarkSmoother(min_cutoff=0.01, beta=0.5)
+        # Occluded landmarks (visibility < 0.3) restart their filter instead of
+        # dragging the stale position along when they reappear
+        self.smoother_p1 = LandmarkSmoother(min_cutoff=0.01, beta=0.5, reset_visibility=0.3)
+        self.smoother_p2 = LandmarkSmoother(min_cutoff=0.01, beta=0.5, reset_visibility=0.3)
         
         self.detector_p1 = ActionDetector()
         self.detector_p2 = ActionDetector()
+        # gestures: one batched detector for both players (punches, kicks, blocks, dodges)
+        self.gestures = None
+        if gestures:
+            from src.logic.gestures import GestureDetector
+            self.gestures = GestureDetector(players=2)
+        # hitboxes: a strike only does damage once the fist or foot, swept between
+        # frames, touches the opponent's body; the avatars stand at fighting distance
+        self.AVATAR_X = {1: 200, 2: 800}
+        self.physics = None
+        if hitboxes:
+            self.AVATAR_X = {1: 430, 2: 550}
+            self.physics = PhysicsEngine(placements={pid: (x, AVATAR_TOP) for pid, x in self.AVATAR_X.items()},
+                                         scale=AVATAR_SCALE)
         
         self.renderer = AvatarRenderer(self.WIDTH, self.HEIGHT)
+        # dirty_rects: only push the screen areas that changed (display.update instead of flip)
+        self.layers = DirtyRectScreen(self.screen, enabled=dirty_rects)
         self.running = True
         
         # State: LOBBY, FIGHT, GAMEOVER
         self.state = "LOBBY"
         self.winner = None
+
+        self.sim_time = 0.0
+        self.ticks = 0
+        self.accumulator = 0.0
+        self.raw_p1 = None  # last frames received, to tell new input from repeats
+        self.raw_p2 = None
+        self.input_time = {1: None, 2: None}  # capture time of each player's newest frame
         
         self.reset_game()
 
@@ -42,16 +118,24 @@ class GameEngine:
         self.p2_action = "IDLE"
         self.landmarks_p1 = None
         self.landmarks_p2 = None
+        # Landmarks as of the previous tick, for render interpolation
+        self.prev_landmarks_p1 = None
+        self.prev_landmarks_p2 = None
+        self.p1_hit_timer = 0.0
+        self.p2_hit_timer = 0.0
+        self.strikes = {1: None, 2: None}  # (strike row, damage, expiry) awaiting contact
 
     def run(self):
         print("Starting Game Server...")
         self.server.start()
         try:
+            previous = time.perf_counter()
             while self.running:
+                now = time.perf_counter()
                 self.handle_events()
-                self.update()
-                self.render()
-                self.clock.tick(30)
+                self.advance(now - previous)
+                previous = now
+                self.clock.tick(self.render_fps)
         finally:
             self.server.stop()
             pygame.quit()
@@ -64,28 +148,98 @@ class GameEngine:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
+                if event.key == pygame.K_F3:
+                    self.show_latency = not self.show_latency
                 if event.key == pygame.K_r:
                     if self.state == "GAMEOVER":
                         self.state = "LOBBY"
                         self.reset_game()
 
+    def run_headless(self, max_ticks=None, render_every=0, stop_at_gameover=True):
+        """
+        Runs simulation ticks back to back: no clock, no events, no window.
+        Renders (off-screen) every `render_every` ticks, 0 = never.
+        Stops after max_ticks, at GAMEOVER, or when the landmark source is finished.
+        """
+        self.server.start()
+        ticks = 0
+        frames = 0
+        start = time.perf_counter()
+        try:
+            while max_ticks is None or ticks < max_ticks:
+                self.update()
+                ticks += 1
+                if render_every and ticks % render_every == 0:
+                    self.render()
+                    frames += 1
+                if stop_at_gameover and self.state == "GAMEOVER":
+                    break
+                if getattr(self.server, 'finished', False):
+                    break
+        finally:
+            self.server.stop()
+        elapsed = time.perf_counter() - start
+        return {
+            'ticks': ticks,
+            'frames_rendered': frames,
+            'seconds': elapsed,
+            'ticks_per_sec': ticks / elapsed if elapsed > 0 else 0.0,
+            'sim_time': self.sim_time,
+            'state': self.state,
+            'winner': self.winner,
+            'health': (self.p1_health, self.p2_health),
+        }
+
+    def advance(self, frame_time, render=True):
+        """
+        One display frame: runs every simulation tick due after frame_time
+        seconds, then renders the state interpolated between the last two ticks.
+        """
+        self.accumulator += min(frame_time, self.MAX_FRAME_TIME)
+        while self.accumulator >= self.SIM_DT:
+            self.update()
+            self.accumulator -= self.SIM_DT
+        if render:
+            self.render(self.accumulator / self.SIM_DT)
+
     def update(self):
+        """
+        One simulation tick of SIM_DT seconds.
+        """
+        self.sim_time += self.SIM_DT
+        self.ticks += 1
+        self.prev_landmarks_p1 = self.landmarks_p1
+        self.prev_landmarks_p2 = self.landmarks_p2
+
         # 1. Network Data
         raw_p1, raw_p2 = self.server.get_landmarks()
         
-        # Smooth and Store
-        from src.network.utils import MockLandmarksResult
-        current_time = pygame.time.get_ticks() / 1000.0
+        # New frames this tick: all of them from a buffering server, else the
+        # latest if it changed (input arrives slower than the tick rate)
+        new_p1 = self.new_frames(1, raw_p1, self.raw_p1, self.landmarks_p1)
+        new_p2 = self.new_frames(2, raw_p2, self.raw_p2, self.landmarks_p2)
+        self.raw_p1 = raw_p1
+        self.raw_p2 = raw_p2
+        if new_p1 or new_p2:
+            self.frames_arrived(new_p1 and new_p1[-1], new_p2 and new_p2[-1])
+        work_start = time.perf_counter()
         
-        if raw_p1:
-             self.landmarks_p1 = MockLandmarksResult(self.smoother_p1.smooth(raw_p1, current_time))
-        else:
+        # Smooth and Store (smoother returns PoseFrames directly), in capture time
+        smoothed_p1 = self.smooth_frames(1, new_p1)
+        smoothed_p2 = self.smooth_frames(2, new_p2)
+
+        if raw_p1 is None:
              self.landmarks_p1 = None
+        elif smoothed_p1:
+             self.landmarks_p1 = smoothed_p1[-1][0]
              
-        if raw_p2:
-             self.landmarks_p2 = MockLandmarksResult(self.smoother_p2.smooth(raw_p2, current_time))
-        else:
+        if raw_p2 is None:
              self.landmarks_p2 = None
+        elif smoothed_p2:
+             self.landmarks_p2 = smoothed_p2[-1][0]
+
+        self.p1_hit_timer = max(0.0, self.p1_hit_timer - self.SIM_DT)
+        self.p2_hit_timer = max(0.0, self.p2_hit_timer - self.SIM_DT)
 
         # State Machine Logic
         if self.state == "LOBBY":
@@ -97,16 +251,31 @@ class GameEngine:
                 self.reset_game()
 
         elif self.state == "FIGHT":
-            # Action Detect
-            self.p1_action = self.detector_p1.detect(self.landmarks_p1)
-            self.p2_action = self.detector_p2.detect(self.landmarks_p2)
+            # Action Detect on every new frame (velocities and cooldowns in capture time)
+            if self.gestures:
+                self.p1_action, self.p2_action = self.detect_gestures((new_p1, smoothed_p1), (new_p2, smoothed_p2))
+            else:
+                self.p1_action = self.detect_frames(self.detector_p1, smoothed_p1)
+                self.p2_action = self.detect_frames(self.detector_p2, smoothed_p2)
             
             # Hit Detect
-            if "PUNCH" in self.p1_action and self.landmarks_p2:
-                self.p2_health = max(0, self.p2_health - 1.5) # 1.5 dmg per frame
+            if self.physics:
+                p1_damage = self.strike_contact(1, self.p1_action)
+                p2_damage = self.strike_contact(2, self.p2_action)
+            else:
+                p1_damage = self.attack_damage(self.p1_action)
+                p2_damage = self.attack_damage(self.p2_action)
+            if p1_damage:
+                self.p1_hit_timer = self.HIT_FLASH_TIME
+                self.pending_hit[1] = self.pending_capture[1]
+                if self.landmarks_p2:
+                    self.p2_health = max(0, self.p2_health - p1_damage)
             
-            if "PUNCH" in self.p2_action and self.landmarks_p1:
-                self.p1_health = max(0, self.p1_health - 1.5)
+            if p2_damage:
+                self.p2_hit_timer = self.HIT_FLASH_TIME
+                self.pending_hit[2] = self.pending_capture[2]
+                if self.landmarks_p1:
+                    self.p1_health = max(0, self.p1_health - p2_damage)
                 
             # Win Check
             if self.p1_health <= 0:
@@ -116,38 +285,211 @@ class GameEngine:
                 self.state = "GAMEOVER"
                 self.winner = 1
 
-    def render(self):
+        if new_p1 or new_p2:
+            self.latency.add('smooth_detect', time.perf_counter() - work_start)
+        self.latency.maybe_dump()
+
+    def new_frames(self, player_id, raw, last_raw, landmarks):
+        if raw is None:
+            return []
+        if self.buffered_input:
+            return self.server.get_frames(player_id)
+        if raw is not last_raw or landmarks is None:
+            return [raw]
+        return []
+
+    def smooth_frames(self, player_id, frames):
+        """
+        Smooths frames in order, each at its capture time. Returns [(PoseFrame, time)].
+        """
+        smoother = self.smoother_p1 if player_id == 1 else self.smoother_p2
+        smoothed = []
+        for frame in frames:
+            t = self.frame_time(player_id, frame)
+            smoothed.append((smoother.smooth(frame, t), t))
+        return smoothed
+
+    def detect_frames(self, detector, smoothed):
+        """
+        Feeds every frame to the detector; returns the first action found.
+        """
+        action = "IDLE"
+        for landmarks, t in smoothed:
+            detected = detector.detect(landmarks, t)
+            if action == "IDLE":
+                action = detected
+        return action
+
+    def detect_gestures(self, *players):
+        """
+        Pushes each player's new (raw, smoothed) frames and detects for both
+        in one call. The detector gets the raw poses: its windowed features
+        do their own noise rejection, and the smoother's lag would spread a
+        punch's speed and extension over different frames.
+        """
+        for player, (raw_frames, smoothed) in enumerate(players):
+            for raw, (_, t) in zip(raw_frames, smoothed):
+                self.gestures.push(player, raw, t)
+        return self.gestures.detect()
+
+    def attack_damage(self, action):
+        if "PUNCH" in action:
+            return self.PUNCH_DAMAGE
+        if "KICK" in action:
+            return self.KICK_DAMAGE
+        return 0
+
+    def strike_contact(self, player_id, action):
+        """
+        Arms a strike when one is detected; returns its damage on the tick
+        the limb's sweep since the last tick touches the opponent's
+        hurtboxes (within STRIKE_WINDOW), else 0.
+        """
+        damage = self.attack_damage(action)
+        if damage:
+            self.strikes[player_id] = (ACTION_STRIKES[action], damage, self.sim_time + self.STRIKE_WINDOW)
+        strike = self.strikes[player_id]
+        if strike is None:
+            return 0
+        row, damage, expiry = strike
+        if self.sim_time > expiry:
+            self.strikes[player_id] = None
+            return 0
+
+        opponent = 3 - player_id
+        attacker = self.landmarks_p1 if player_id == 1 else self.landmarks_p2
+        previous = self.prev_landmarks_p1 if player_id == 1 else self.prev_landmarks_p2
+        defender = self.landmarks_p1 if opponent == 1 else self.landmarks_p2
+        if not attacker or not defender:
+            return 0
+        if not self.physics.strike_hits(player_id, previous, attacker, opponent, defender)[row].any():
+            return 0
+        self.strikes[player_id] = None
+        return damage
+
+    def frame_time(self, player_id, raw):
+        """
+        Time a new frame was captured: its capture timestamp (client clock,
+        only differences matter), else its receive time, else simulation
+        time. Kept increasing per player; a jump back of over a second (a new
+        client with another clock) restarts that player's filter and detector.
+        """
+        t = raw.timestamp or raw.recv_time or self.sim_time
+        last = self.input_time[player_id]
+        if last is not None and t <= last:
+            if last - t > 1.0:
+                self.reset_tracking(player_id)
+            else:
+                t = last + 1e-3
+        self.input_time[player_id] = t
+        return t
+
+    def reset_tracking(self, player_id):
+        if player_id == 1:
+            self.smoother_p1.filter.reset()
+            self.detector_p1 = ActionDetector()
+        else:
+            self.smoother_p2.filter.reset()
+            self.detector_p2 = ActionDetector()
+        if self.gestures:
+            self.gestures.reset(player_id - 1)
+
+    def frames_arrived(self, raw_p1, raw_p2):
+        """
+        Records how long new frames waited for this tick and remembers their
+        capture times until they reach the screen.
+        """
+        now = time.time()
+        for player_id, raw in ((1, raw_p1), (2, raw_p2)):
+            if not raw or raw.recv_time is None:
+                continue  # not from a traced server (replays, local sources)
+            self.latency.add('queue', now - raw.recv_time)
+            self.pending_capture[player_id] = self.latency.capture_time(player_id, raw)
+
+    def render(self, alpha=1.0):
+        if self.display == "none":
+            return
+        start = time.perf_counter()
+        rects = self.compose(alpha)
+        composed = time.perf_counter()
+        self.latency.add('render', composed - start)
+        if self.display == "window":
+            if self.layers.enabled:
+                pygame.display.update(rects)
+            else:
+                pygame.display.flip()
+            self.latency.add('flip', time.perf_counter() - composed)
+        self.frame_shown()
+
+    def frame_shown(self):
+        now = time.time()
+        for player_id in (1, 2):
+            if self.pending_capture[player_id] is not None:
+                self.latency.add('end_to_end', now - self.pending_capture[player_id])
+                self.pending_capture[player_id] = None
+            if self.pending_hit[player_id] is not None:
+                self.latency.add('hit_to_screen', now - self.pending_hit[player_id])
+                self.pending_hit[player_id] = None
+
+    def compose(self, alpha=1.0):
+        """
+        Draws the current state into self.screen, with avatars interpolated
+        alpha of the way from the previous tick. Returns the changed rects.
+        """
+        layers = self.layers
         # LOBBY
         if self.state == "LOBBY":
             p1_r = self.landmarks_p1 is not None
             p2_r = self.landmarks_p2 is not None
-            self.renderer.draw_lobby(self.screen, p1_r, p2_r)
-            pygame.display.flip()
-            return
+            layers.begin("LOBBY", self.renderer.draw_lobby_static)
+            layers.draw("status", (p1_r, p2_r), lambda s: self.renderer.draw_lobby_status(s, p1_r, p2_r))
+            return layers.end()
 
         # FIGHT or GAMEOVER (Draw game under overlay)
-        self.renderer.draw_bg(self.screen)
+        layers.begin("ARENA", self.renderer.draw_bg)
         
         # Avatars
-        self.renderer.draw_avatar(self.screen, self.landmarks_p1, 1, 200)
-        self.renderer.draw_avatar(self.screen, self.landmarks_p2, 2, 800)
+        pose_p1 = lerp_pose(self.prev_landmarks_p1, self.landmarks_p1, alpha)
+        pose_p2 = lerp_pose(self.prev_landmarks_p2, self.landmarks_p2, alpha)
+        layers.draw("p1", pose_signature(pose_p1),
+                    lambda s: self.renderer.draw_avatar(s, pose_p1, 1, self.AVATAR_X[1]))
+        layers.draw("p2", pose_signature(pose_p2),
+                    lambda s: self.renderer.draw_avatar(s, pose_p2, 2, self.AVATAR_X[2]))
         
         # HUD
-        self.renderer.draw_health_bar(self.screen, 50, 50, 400, 30, self.p1_health/100.0)
-        self.renderer.draw_health_bar(self.screen, self.WIDTH-450, 50, 400, 30, self.p2_health/100.0)
+        layers.draw("p1_health", self.p1_health,
+                    lambda s: self.renderer.draw_health_bar(s, 50, 50, 400, 30, self.p1_health/100.0))
+        layers.draw("p2_health", self.p2_health,
+                    lambda s: self.renderer.draw_health_bar(s, self.WIDTH-450, 50, 400, 30, self.p2_health/100.0))
         
         # Hit Text
-        font = pygame.font.SysFont("Verdana", 48, bold=True)
-        if "PUNCH" in self.p1_action:
-             self.screen.blit(font.render("HIT!", True, (255, 255, 0)), (200, 200))
-        if "PUNCH" in self.p2_action:
-             self.screen.blit(font.render("HIT!", True, (255, 255, 0)), (self.WIDTH-300, 200))
+        hit = self.renderer.render_text("HIT!", 48, (255, 255, 0), bold=True)
+        if self.p1_hit_timer > 0:
+             layers.draw("p1_hit", True, lambda s: s.blit(hit, (200, 200)))
+        if self.p2_hit_timer > 0:
+             layers.draw("p2_hit", True, lambda s: s.blit(hit, (self.WIDTH-300, 200)))
 
         # GAMEOVER Overlay
         if self.state == "GAMEOVER":
-            self.renderer.draw_game_over(self.screen, self.winner)
-            
-        pygame.display.flip()
+            layers.draw("game_over", self.winner, lambda s: self.renderer.draw_game_over(s, self.winner))
+
+        self.draw_latency_overlay()
+        return layers.end()
+
+    def draw_latency_overlay(self):
+        if not self.show_latency:
+            return
+        now = time.perf_counter()
+        if now >= self.latency_refresh:
+            self.latency_lines = tuple(self.latency.overlay_lines())
+            self.latency_refresh = now + 0.5
+        lines = self.latency_lines
+        self.layers.draw("latency", lines, lambda s: self.renderer.draw_debug_text(s, lines, 20, self.HEIGHT - 20 * len(lines) - 20))
+
+def pose_signature(landmarks):
+    if landmarks is None:
+        return None
+    return as_pose_frame(landmarks).data.tobytes()
 
 if __name__ == "__main__":
     game = GameEngine()
@@ -0,0 +1,114 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+import numpy as np
+from src.network.clock import ClockOffset
+
+"""
+Camera-to-screen latency tracing. Stages, in the order a frame passes them:
+
+  capture_to_recv  client capture timestamp -> host receive (clock offset corrected)
+  decode           wire bytes -> PoseFrame on the receive thread
+  queue            host receive -> picked up by a simulation tick
+  smooth_detect    smoothing + action detection in GameEngine.update
+  render           composing the frame (GameEngine.compose)
+  flip             pushing it to the display
+  end_to_end       capture -> first flip showing that pose
+  hit_to_screen    capture of the frame a punch was detected on -> "HIT!" flipped
+"""
+
+STAGES = ('capture_to_recv', 'decode', 'queue', 'smooth_detect', 'render', 'flip', 'end_to_end', 'hit_to_screen')
+
+class LatencyTracker:
+    """
+    Rolling per-stage latency samples (the last `window` per stage) with
+    p50/p95/p99 summaries, shared by the receive threads and the game loop.
+    With dump_path set, maybe_dump() writes the summary every
+    dump_interval seconds (.csv appends rows, anything else rewrites JSON).
+    """
+    def __init__(self, window=1000, dump_path=None, dump_interval=5.0, clock=time.perf_counter):
+        self.samples = {stage: deque(maxlen=window) for stage in STAGES}
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.clock_offset = ClockOffset()
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self.clock = clock
+        self.next_dump = clock() + dump_interval
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.samples[stage].append(seconds * 1000)
+            self.counts[stage] += 1
+
+    def frame_received(self, player_id, frame, recv_time, decode_seconds=None):
+        """
+        Receive-thread hook: stamps the frame with recv_time and records
+        its network and decode stages.
+        """
+        frame.recv_time = recv_time
+        if decode_seconds is not None:
+            self.add('decode', decode_seconds)
+        if frame.timestamp:
+            self.clock_offset.add_frame(player_id, frame.timestamp, recv_time)
+            self.add('capture_to_recv', recv_time - self.clock_offset.to_host(player_id, frame.timestamp))
+
+    def capture_time(self, player_id, frame):
+        """
+        Host-clock capture time of a frame, or None if it carries none.
+        """
+        if not frame.timestamp:
+            return None
+        return self.clock_offset.to_host(player_id, frame.timestamp)
+
+    def summary(self):
+        with self.lock:
+            snapshot = {stage: np.array(times) for stage, times in self.samples.items()}
+            counts = dict(self.counts)
+        rows = []
+        for stage in STAGES:
+            times = snapshot[stage]
+            if len(times):
+                p50, p95, p99 = np.percentile(times, (50, 95, 99))
+            else:
+                p50 = p95 = p99 = 0.0
+            rows.append({'stage': stage, 'count': counts[stage],
+                         'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)})
+        return rows
+
+    def maybe_dump(self):
+        if self.dump_path is None or self.clock() < self.next_dump:
+            return False
+        self.next_dump = self.clock() + self.dump_interval
+        self.dump(self.dump_path)
+        return True
+
+    def dump(self, path):
+        rows = self.summary()
+        stamp = time.time()
+        if path.endswith('.csv'):
+            with open(path, 'a', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['time'] + list(rows[0]))
+                if f.tell() == 0:
+                    writer.writeheader()
+                for row in rows:
+                    writer.writerow({'time': stamp, **row})
+        else:
+            with open(path, 'w') as f:
+                json.dump({'time': stamp, 'stages': rows}, f, indent=2)
+
+    def overlay_lines(self):
+        lines = [f"{'stage':<16}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+        for row in self.summary():
+            if row['count']:
+                lines.append(f"{row['stage']:<16}{row['p50_ms']:>7.1f}{row['p95_ms']:>7.1f}{row['p99_ms']:>7.1f}")
+        for player_id in sorted(self.clock_offset.min_delay):
+            if self.clock_offset.synced(player_id):
+                lines.append(f"P{player_id} clock offset {self.clock_offset.offset(player_id) * 1000:+.1f} ms, "
+                             f"rtt {self.clock_offset.rtt(player_id) * 1000:.1f} ms")
+            else:
+                lines.append(f"P{player_id} clock unsynced, offset + delay >= "
+                             f"{self.clock_offset.min_delay[player_id] * 1000:.1f} ms")
+        return lines
@@ -1,9 +1,45 @@
 import pygame
 import numpy as np
+from collections import OrderedDict, namedtuple
+from src.logic.frame import as_pose_frame
 
-    def __init__(self, screen_width, screen_height):
+# A sprite drawn along the bone start -> end (rotated, centered on the midpoint),
+# or upright on the start landmark when end is None. Drawn in table order.
+Bone = namedtuple('Bone', 'part start end scale', defaults=(1.0,))
+
+SKELETON = (
+    Bone("torso", 11, 24),  # Diagonal approx for center
+    Bone("head", 0, None),
+    # Left Arm
+    Bone("arm", 11, 13),
+    Bone("arm", 13, 15),
+    # Right Arm
+    Bone("arm", 12, 14),
+    Bone("arm", 14, 16),
+    # Legs
+    Bone("leg", 23, 25),
+    Bone("leg", 25, 27),
+    Bone("leg", 24, 26),
+    Bone("leg", 26, 28),
+)
+
+HAND_MARKERS = (15, 16)
+
+# Normalized landmark -> avatar pixels
+AVATAR_SCALE = (300, 400)
+AVATAR_TOP = 100
+
+class AvatarRenderer:
+    def __init__(self, screen_width, screen_height, scale_limbs=False, skeleton=SKELETON):
         self.width = screen_width
         self.height = screen_height
+        # Scale limb sprites to the on-screen bone length (cached per quantized scale)
+        self.scale_limbs = scale_limbs
+
+        # Skeleton table as index arrays for batched bone geometry
+        self.skeleton = tuple(skeleton)
+        self.bone_start = np.array([bone.start for bone in self.skeleton], dtype=np.intp)
+        self.bone_end = np.array([bone.start if bone.end is None else bone.end for bone in self.skeleton], dtype=np.intp)
         
         # Colors
         self.P1_COLOR = (0, 255, 255) # Cyan
@@ -19,18 +55,63 @@ import numpy as np
         
         self.sprites_loaded = False
 
-    def draw_bg(self, surface):
+        # Static layers and text, built on first use
+        self.background = None   # baked grid floor
+        self.overlay = None      # translucent game-over shade
+        self.fonts = {}          # (size, bold) -> Font
+        self.mono_font = None    # debug overlays, created on first use
+        self.text_cache = OrderedDict()  # (text, size, bold, color) -> Surface, least recently used first
+        self.max_text_cache = 256
+
+    def resize(self, screen_width, screen_height):
+        self.width = screen_width
+        self.height = screen_height
+        self.background = None
+        self.overlay = None
+
+    def font(self, size, bold=False):
+        key = (size, bold)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont("Verdana", size, bold=bold)
+        return self.fonts[key]
+
+    def render_text(self, text, size, color, bold=False):
+        """
+        Rendered text surface, memoized (HUD strings repeat every frame).
+        Least recently used strings are evicted past max_text_cache.
+        """
+        key = (text, size, bold, color)
+        img = self.text_cache.get(key)
+        if img is not None:
+            self.text_cache.move_to_end(key)
+            return img
+        img = self.font(size, bold).render(text, True, color)
+        self.text_cache[key] = img
+        while len(self.text_cache) > self.max_text_cache:
+            self.text_cache.popitem(last=False)
+        return img
+
+    def bake_bg(self, surface):
         # Draw a retro grid floor
-        surface.fill((20, 20, 35)) # Deep dark blue
+        bg = pygame.Surface((self.width, self.height), 0, surface)
+        bg.fill((20, 20, 35)) # Deep dark blue
         
         # Grid lines
         for x in range(0, self.width, 50):
-            pygame.draw.line(surface, (30, 30, 50), (x, 0), (x, self.height), 1)
+            pygame.draw.line(bg, (30, 30, 50), (x, 0), (x, self.height), 1)
         for y in range(0, self.height, 50):
-            pygame.draw.line(surface, (30, 30, 50), (0, y), (self.width, y), 1)
+            pygame.draw.line(bg, (30, 30, 50), (0, y), (self.width, y), 1)
             
         # Floor horizon
-        pygame.draw.line(surface, (0, 255, 255), (0, 600), (self.width, 600), 2)
+        pygame.draw.line(bg, (0, 255, 255), (0, 600), (self.width, 600), 2)
+        return bg
+
+    def draw_bg(self, surface):
+        if surface.get_size() != (self.width, self.height):
+            self.resize(*surface.get_size())
+        if self.background is None:
+            self.background = self.bake_bg(surface)
+        return surface.blit(self.background, (0, 0))
 
     def draw_health_bar(self, surface, x, y, width, height, percent):
         # Background
@@ -45,119 +126,140 @@ import numpy as np
         fill_width = int(width * percent)
         if fill_width > 0:
              pygame.draw.rect(surface, color, (x, y, fill_width, height))
+        return pygame.Rect(x-2, y-2, width+4, height+4)
 
     def draw_lobby(self, surface, p1_ready, p2_ready):
+        self.draw_lobby_static(surface)
+        return self.draw_lobby_status(surface, p1_ready, p2_ready)
+
+    def draw_lobby_static(self, surface):
+        """
+        Lobby parts that never change: background, title and player labels.
+        """
         self.draw_bg(surface)
         
-        font_big = pygame.font.SysFont("Verdana", 64, bold=True)
-        font_small = pygame.font.SysFont("Verdana", 32)
-        
-        title = font_big.render("GESTURE FIGHTER", True, (0, 255, 255))
+        title = self.render_text("GESTURE FIGHTER", 64, (0, 255, 255), bold=True)
         surface.blit(title, (self.width//2 - title.get_width()//2, 100))
         
-        # P1 Status
-        offset_p1 = 200
-        pygame.draw.circle(surface, (0, 255, 0) if p1_ready else (50, 50, 50), (300, 300), 50)
-        p1_text = font_small.render("PLAYER 1", True, (255, 255, 255))
-        p1_status = font_small.render("READY" if p1_ready else "WAITING...", True, (0, 255, 0) if p1_ready else (100, 100, 100))
+        p1_text = self.render_text("PLAYER 1", 32, (255, 255, 255))
         surface.blit(p1_text, (300 - p1_text.get_width()//2, 370))
-        surface.blit(p1_status, (300 - p1_status.get_width()//2, 410))
+        p2_text = self.render_text("PLAYER 2", 32, (255, 255, 255))
+        surface.blit(p2_text, (980 - p2_text.get_width()//2, 370))
+        return surface.get_rect()
+
+    def draw_lobby_status(self, surface, p1_ready, p2_ready):
+        """
+        Ready circles and status lines. Returns the rects drawn.
+        """
+        rects = []
+        # P1 Status
+        rects.append(pygame.draw.circle(surface, (0, 255, 0) if p1_ready else (50, 50, 50), (300, 300), 50))
+        p1_status = self.render_text("READY" if p1_ready else "WAITING...", 32, (0, 255, 0) if p1_ready else (100, 100, 100))
+        rects.append(surface.blit(p1_status, (300 - p1_status.get_width()//2, 410)))
 
         # P2 Status
-        pygame.draw.circle(surface, (255, 0, 0) if p2_ready else (50, 50, 50), (980, 300), 50)
-        p2_text = font_small.render("PLAYER 2", True, (255, 255, 255))
-        p2_status = font_small.render("READY" if p2_ready else "WAITING...", True, (0, 255, 0) if p2_ready else (100, 100, 100))
-        surface.blit(p2_text, (980 - p2_text.get_width()//2, 370))
-        surface.blit(p2_status, (980 - p2_status.get_width()//2, 410))
+        rects.append(pygame.draw.circle(surface, (255, 0, 0) if p2_ready else (50, 50, 50), (980, 300), 50))
+        p2_status = self.render_text("READY" if p2_ready else "WAITING...", 32, (0, 255, 0) if p2_ready else (100, 100, 100))
+        rects.append(surface.blit(p2_status, (980 - p2_status.get_width()//2, 410)))
         
         if p1_ready and p2_ready:
-             msg = font_small.render("FIGHT STARTING...", True, (255, 255, 255))
-             surface.blit(msg, (self.width//2 - msg.get_width()//2, 550))
+             msg = self.render_text("FIGHT STARTING...", 32, (255, 255, 255))
+             rects.append(surface.blit(msg, (self.width//2 - msg.get_width()//2, 550)))
+        return rects
 
     def draw_game_over(self, surface, winner_id):
-        s = pygame.Surface((self.width, self.height))
-        s.set_alpha(200)
-        s.fill((0, 0, 0))
-        surface.blit(s, (0,0))
+        if self.overlay is None or self.overlay.get_size() != (self.width, self.height):
+            self.overlay = pygame.Surface((self.width, self.height))
+            self.overlay.set_alpha(200)
+            self.overlay.fill((0, 0, 0))
+        rect = surface.blit(self.overlay, (0,0))
         
-        font = pygame.font.SysFont("Verdana", 96, bold=True)
         text = f"PLAYER {winner_id} WINS!"
         color = (0, 255, 255) if winner_id == 1 else (255, 0, 0)
         
-        img = font.render(text, True, color)
+        img = self.render_text(text, 96, color, bold=True)
         surface.blit(img, (self.width//2 - img.get_width()//2, self.height//2 - 100))
         
-        font_small = pygame.font.SysFont("Verdana", 32)
-        restart = font_small.render("Press 'R' to Restart", True, (255, 255, 255))
+        restart = self.render_text("Press 'R' to Restart", 32, (255, 255, 255))
         surface.blit(restart, (self.width//2 - restart.get_width()//2, self.height//2 + 50))
+        return rect
+
+    def draw_debug_text(self, surface, lines, x, y):
+        """
+        Monospace text block on a dark backing (debug overlays). Not
+        memoized: the numbers change every refresh.
+        """
+        if self.mono_font is None:
+            self.mono_font = pygame.font.SysFont("Courier New,monospace", 16, bold=True)
+        images = [self.mono_font.render(line, True, (0, 255, 0)) for line in lines]
+        width = max((img.get_width() for img in images), default=0)
+        rect = pygame.Rect(x - 6, y - 6, width + 12, 20 * len(images) + 12)
+        surface.fill((0, 0, 0), rect)
+        for i, img in enumerate(images):
+            surface.blit(img, (x, y + 20 * i))
+        return rect
+
+    def project(self, landmarks, offset_x=0):
+        """
+        Normalized landmarks -> (33, 2) int screen points.
+        """
+        xy = as_pose_frame(landmarks).xy.astype(np.float64) * AVATAR_SCALE
+        return np.trunc(xy).astype(np.int64) + (offset_x, AVATAR_TOP)
+
+    def bone_geometry(self, points):
+        """
+        Midpoints, sprite angles (degrees) and on-screen lengths of every
+        skeleton bone, computed in one pass over the skeleton table.
+        """
+        start = points[self.bone_start]
+        end = points[self.bone_end]
+        mid = (start + end) // 2
+        delta = end - start
+        angle = -np.degrees(np.arctan2(delta[:, 1], delta[:, 0])) - 90 # Adjust for vertical sprites
+        length = np.hypot(delta[:, 0], delta[:, 1])
+        return mid, angle, length
 
     def draw_avatar(self, surface, landmarks, player_id=1, offset_x=0):
+        """
+        Returns the bounding rect of everything drawn, or None.
+        """
         if not self.sprites_loaded:
              self.sprite_manager.load_sprites()
              self.sprites_loaded = True
              
-        if not landmarks:
-            return
-
-        points = {}
-        # Convert landmarks to screen space
-        for idx, lm in enumerate(landmarks.landmark):
-            # Scale
-            px = int(lm.x * 300) + offset_x
-            py = int(lm.y * 400) + 100
-            points[idx] = (px, py)
-
-        # Helper to draw sprite
-        def draw_part(part_name, idx_start, idx_end, scale=1.0):
-            if idx_start in points and idx_end in points:
-                mid_x = (points[idx_start][0] + points[idx_end][0]) // 2
-                mid_y = (points[idx_start][1] + points[idx_end][1]) // 2
-                
-                # Calculate angle
-                dx = points[idx_end][0] - points[idx_start][0]
-                dy = points[idx_end][1] - points[idx_start][1]
-                angle = -np.degrees(np.arctan2(dy, dx)) - 90 # Adjust for vertical sprites
-                
-                img = self.sprite_manager.get_rotated_part(player_id, part_name, angle)
-                if img:
-                    # Simple scaling based on assumption (sprites are 200px ish?). 
-                    # ideally we scale img to match length of limb.
-                    # For now just blit centered
-                    rect = img.get_rect(center=(mid_x, mid_y))
-                    surface.blit(img, rect)
-                    return True
-            return False
-
-        # Draw Limbs using Sprites
-        # Torso (Connect 11-12 to 23-24)
-        if 11 in points and 24 in points:
-             draw_part("torso", 11, 24) # Diagonal approx for center
-             
-        # Head (No angle, just position)
-        if 0 in points:
-            x, y = points[0]
-            img = self.sprite_manager.get_rotated_part(player_id, "head", 0)
+        if not isinstance(landmarks, np.ndarray) and not landmarks:
+            return None
+
+        points = self.project(landmarks, offset_x)
+        mid, angle, length = self.bone_geometry(points)
+        mids = mid.tolist()
+        angles = angle.tolist()
+        lengths = length.tolist()
+        pts = points.tolist()
+
+        touched = []
+        for i, bone in enumerate(self.skeleton):
+            scale = bone.scale
+            if bone.end is None:
+                # Anchored part (head): upright, centered on the landmark
+                center = pts[bone.start]
+                angle_i = 0
+            else:
+                center = mids[i]
+                angle_i = angles[i]
+                if self.scale_limbs:
+                    part_h = self.sprite_manager.part_height(player_id, bone.part)
+                    if part_h:
+                        scale = max(0.05, lengths[i] / part_h * bone.scale)
+
+            img = self.sprite_manager.get_rotated_part(player_id, bone.part, angle_i, scale)
             if img:
-                rect = img.get_rect(center=(x, y))
-                surface.blit(img, rect)
-            
-        # Left Arm
-        draw_part("arm", 11, 13)
-        draw_part("arm", 13, 15)
-        
-        # Right Arm
-        draw_part("arm", 12, 14)
-        draw_part("arm", 14, 16)
-        
-        # Legs
-        draw_part("leg", 23, 25)
-        draw_part("leg", 25, 27)
-        
-        draw_part("leg", 24, 26)
-        draw_part("leg", 26, 28)
+                rect = img.get_rect(center=center)
+                touched.append(surface.blit(img, rect))
         
         # Fallback Wireframe (Low opacity) if sprites fail
         # Or just draw keypoints for 'Hands'
         color = self.P1_COLOR if player_id == 1 else self.P2_COLOR
-        if 15 in points: pygame.draw.circle(surface, color, points[15], 5)
-        if 16 in points: pygame.draw.circle(surface, color, points[16], 5)
+        for idx in HAND_MARKERS:
+            touched.append(pygame.draw.circle(surface, color, pts[idx], 5))
+        return touched[0].unionall(touched[1:]) if touched else None
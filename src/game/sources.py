@@ -0,0 +1,130 @@
+import queue
+import numpy as np
+from src.logic.frame import NUM_LANDMARKS, PoseFrame, as_pose_frame
+
+"""
+Landmark sources that stand in for MultiPlayerServer in GameEngine
+(start()/stop()/get_landmarks() -> (p1, p2)), for headless runs and tests.
+get_landmarks() is called once per simulation tick; returning the same
+PoseFrame object again means "no new camera frame this tick".
+"""
+
+def _pose(landmarks, timestamp, seq):
+    return None if landmarks is None else as_pose_frame(landmarks, timestamp, seq)
+
+class GeneratorLandmarkSource:
+    """
+    Serves (p1, p2) pairs from any iterable, each held for `repeat` ticks
+    (e.g. 4 for 30 fps input into a 120 Hz simulation).
+    After the last pair it keeps serving it and sets `finished`.
+    """
+    def __init__(self, frames, repeat=1):
+        self.frames = iter(frames)
+        self.repeat = repeat
+        self.current = (None, None)
+        self.held = repeat  # ticks the current pair has been served
+        self.seq = 0
+        self.finished = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def get_landmarks(self):
+        if self.held >= self.repeat and not self.finished:
+            try:
+                p1, p2 = next(self.frames)
+                self.seq += 1
+                self.current = (_pose(p1, 0.0, self.seq), _pose(p2, 0.0, self.seq))
+                self.held = 0
+            except StopIteration:
+                self.finished = True
+        self.held += 1
+        return self.current
+
+class QueueLandmarkSource:
+    """
+    In-process queue fed by another thread (or a test) with put(p1, p2).
+    Each tick takes at most one pair, or with latest_only the newest one
+    queued (dropping the rest, like the network servers). Without input it
+    keeps serving the last pair. close() marks it finished once drained.
+    """
+    def __init__(self, maxsize=0, latest_only=False):
+        self.queue = queue.Queue(maxsize)
+        self.latest_only = latest_only
+        self.current = (None, None)
+        self.seq = 0
+        self.closed = False
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.close()
+
+    def put(self, p1, p2, timestamp=0.0):
+        self.seq += 1
+        self.queue.put((_pose(p1, timestamp, self.seq), _pose(p2, timestamp, self.seq)))
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def finished(self):
+        return self.closed and self.queue.empty()
+
+    def get_landmarks(self):
+        try:
+            self.current = self.queue.get_nowait()
+            while self.latest_only:
+                self.current = self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        return self.current
+
+def save_recording(path, frames, timestamps=None):
+    """
+    Writes (p1, p2) pairs (PoseFrames, arrays or None) to a compressed .npz
+    that RecordedLandmarkSource can play back.
+    """
+    frames = list(frames)
+    n = len(frames)
+    data = np.zeros((2, n, NUM_LANDMARKS, 4), dtype=np.float32)
+    present = np.zeros((2, n), dtype=bool)
+    for i, pair in enumerate(frames):
+        for p, landmarks in enumerate(pair):
+            if landmarks is not None:
+                data[p, i] = as_pose_frame(landmarks).data
+                present[p, i] = True
+    if timestamps is None:
+        timestamps = [getattr(pair[0], 'timestamp', 0.0) if pair[0] is not None else 0.0 for pair in frames]
+    np.savez_compressed(path, p1=data[0], p2=data[1], present=present,
+                        timestamps=np.asarray(timestamps, dtype=np.float64))
+
+class RecordedLandmarkSource(GeneratorLandmarkSource):
+    """
+    Plays back a recording written by save_recording, `repeat` ticks per frame.
+    """
+    def __init__(self, path, repeat=1, loop=False):
+        with np.load(path) as rec:
+            self.p1 = rec['p1']
+            self.p2 = rec['p2']
+            self.present = rec['present']
+            self.timestamps = rec['timestamps']
+        self.loop = loop
+        super().__init__(self._frames(), repeat)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _frames(self):
+        while True:
+            for i in range(len(self.timestamps)):
+                t = float(self.timestamps[i])
+                p1 = PoseFrame(self.p1[i], t, i) if self.present[0, i] else None
+                p2 = PoseFrame(self.p2[i], t, i) if self.present[1, i] else None
+                yield p1, p2
+            if not self.loop:
+                return
@@ -1,25 +1,53 @@
 import pygame
+from collections import OrderedDict
 
 class SpriteManager:
-    def __init__(self):
+    """
+    Loads the player sprite sheets and serves rotated body parts.
+    Rotations are cached with the angle snapped to `angle_step` degrees (and the
+    optional limb scale to `scale_step`), evicting least-recently-used surfaces
+    once the cache holds more than `max_cache_bytes` of pixels (an unscaled
+    512x512 part rotates to up to ~2 MB; 64 MB keeps the common angles of
+    both players).
+    """
+    def __init__(self, angle_step=2.0, scale_step=0.05, max_cache_bytes=64 * 1024 * 1024):
         self.p1_parts = {}
         self.p2_parts = {}
+
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+        self.max_cache_bytes = max_cache_bytes
+        self.cache = OrderedDict()  # (player_id, part, angle, scale) -> surface
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
         
     def load_sprites(self):
         # Load P1 (Red)
         try:
-            sheet_p1 = pygame.image.load("assets/p1_spritesheet.png").convert_alpha()
+            sheet_p1 = self.load_image("assets/p1_spritesheet.png")
             self.p1_parts = self.slice_sheet(sheet_p1)
         except Exception as e:
             print(f"Error loading P1 sprites: {e}")
             
         # Load P2 (Blue)
         try:
-            sheet_p2 = pygame.image.load("assets/p2_spritesheet.png").convert_alpha()
+            sheet_p2 = self.load_image("assets/p2_spritesheet.png")
             self.p2_parts = self.slice_sheet(sheet_p2)
         except Exception as e:
             print(f"Error loading P2 sprites: {e}")
 
+        self.clear_cache()
+
+    def load_image(self, path):
+        image = pygame.image.load(path)
+        if pygame.display.get_surface() is not None:
+            return image.convert_alpha()
+        # Headless (no video mode to convert to): plain per-pixel alpha surface
+        converted = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+        converted.blit(image, (0, 0))
+        return converted
+
     def slice_sheet(self, sheet):
         """
         Heuristic Slicing:
@@ -42,12 +70,58 @@ class SpriteManager:
         }
         return parts
 
-    def get_rotated_part(self, player_id, part_name, angle):
+    def part_height(self, player_id, part_name):
+        parts = self.p1_parts if player_id == 1 else self.p2_parts
+        return parts[part_name].get_height() if part_name in parts else 0
+
+    def quantize(self, angle, scale=1.0):
+        angle = (round(angle / self.angle_step) * self.angle_step) % 360
+        scale = round(scale / self.scale_step) * self.scale_step
+        return angle, scale
+
+    def get_rotated_part(self, player_id, part_name, angle, scale=1.0):
         parts = self.p1_parts if player_id == 1 else self.p2_parts
         if part_name not in parts:
             return None
-            
-        orig_image = parts[part_name]
-        # Rotate around center
-        rotated_image = pygame.transform.rotate(orig_image, -angle) # Negative for pygame coord system
-        return rotated_image
+
+        angle, scale = self.quantize(angle, scale)
+        key = (player_id, part_name, angle, scale)
+        img = self.cache.get(key)
+        if img is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return img
+
+        self.misses += 1
+        img = self._render(parts[part_name], angle, scale)
+        self._store(key, img)
+        return img
+
+    def _render(self, orig_image, angle, scale):
+        # Rotate around center (negative for pygame coord system)
+        if scale == 1.0:
+            return pygame.transform.rotate(orig_image, -angle)
+        return pygame.transform.rotozoom(orig_image, -angle, scale)
+
+    def _store(self, key, img):
+        size = img.get_width() * img.get_height() * img.get_bytesize()
+        self.cache[key] = img
+        self.cache_bytes += size
+        while self.cache_bytes > self.max_cache_bytes and len(self.cache) > 1:
+            _, old = self.cache.popitem(last=False)
+            self.cache_bytes -= old.get_width() * old.get_height() * old.get_bytesize()
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.cache_bytes = 0
+        self.hits = self.misses = 0
+
+    def cache_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.cache),
+            'bytes': self.cache_bytes,
+        }
@@ -0,0 +1,112 @@
+import numpy as np
+
+NUM_LANDMARKS = 33
+
+# Column layout of PoseFrame.data
+X, Y, Z, V = 0, 1, 2, 3
+
+class LandmarkView:
+    """
+    Read-only view of one row of a PoseFrame, shaped like a MediaPipe landmark.
+    """
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    @property
+    def x(self):
+        return float(self._row[X])
+
+    @property
+    def y(self):
+        return float(self._row[Y])
+
+    @property
+    def z(self):
+        return float(self._row[Z])
+
+    @property
+    def visibility(self):
+        return float(self._row[V])
+
+class LandmarkList:
+    """
+    Sequence over a PoseFrame's rows, so `frame.landmark[i].x` keeps working.
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        self._data = data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, idx):
+        return LandmarkView(self._data[idx])
+
+    def __iter__(self):
+        for row in self._data:
+            yield LandmarkView(row)
+
+class PoseFrame:
+    """
+    One pose: a read-only (33, 4) float32 array of x, y, z, visibility
+    plus the capture timestamp and sequence id it was sent with, and the
+    host time it arrived (recv_time, set by the server when tracing latency).
+    """
+    __slots__ = ('data', 'xy', 'timestamp', 'seq', 'recv_time')
+
+    def __init__(self, data, timestamp=0.0, seq=0):
+        # A read-only view: the caller's own array (pool or shared-memory
+        # buffers are passed in without a copy) stays writable
+        data = np.asarray(data, dtype=np.float32).reshape(NUM_LANDMARKS, 4).view()
+        data.flags.writeable = False
+        self.data = data
+        self.xy = data[:, :2]
+        self.timestamp = timestamp
+        self.seq = seq
+        self.recv_time = None
+
+    @property
+    def landmark(self):
+        # Compatibility with MediaPipe-style consumers; hot paths use .xy/.joint()
+        return LandmarkList(self.data)
+
+    def joint(self, idx):
+        return self.data[idx]
+
+    def __bool__(self):
+        return True
+
+def as_pose_frame(landmarks, timestamp=0.0, seq=0):
+    """
+    Returns landmarks as a PoseFrame (no copy if it already is one).
+    Accepts MediaPipe results, MockLandmarksResult, dict lists and arrays.
+    """
+    if landmarks is None or isinstance(landmarks, PoseFrame):
+        return landmarks
+    if isinstance(landmarks, np.ndarray):
+        return PoseFrame(landmarks, timestamp, seq)
+
+    source = landmarks.landmark if hasattr(landmarks, 'landmark') else landmarks
+    if len(source) != NUM_LANDMARKS:
+        raise ValueError(f"expected {NUM_LANDMARKS} landmarks, got {len(source)}")
+    arr = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    for i, lm in enumerate(source):
+        if isinstance(lm, dict):
+            arr[i] = (lm['x'], lm['y'], lm['z'], lm['v'])
+        else:
+            arr[i] = (lm.x, lm.y, lm.z, lm.visibility)
+    return PoseFrame(arr, timestamp, seq)
+
+def lerp_pose(a, b, alpha):
+    """
+    Blend between two poses (alpha 0 = a, 1 = b). Falls back to b if either is missing.
+    """
+    if a is None or b is None or a is b:
+        return b
+    a = as_pose_frame(a)
+    b = as_pose_frame(b)
+    data = a.data + (b.data - a.data) * np.float32(alpha)
+    return PoseFrame(data, a.timestamp + (b.timestamp - a.timestamp) * alpha, b.seq)
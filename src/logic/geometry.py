@@ -1,25 +1,80 @@
 import numpy as np
 
+"""
+Pose geometry on landmark arrays. The kernels take any leading batch shape,
+e.g. a (frames, 33, 2) or (players, frames, 33, 3) tensor, so a whole
+history is handled in a few NumPy calls instead of one call per joint.
+"""
+
+# MediaPipe indices
+L_SHOULDER, R_SHOULDER = 11, 12
+L_HIP, R_HIP = 23, 24
+
+# (a, b, c) -> angle at b
+ELBOWS = np.array([
+    (11, 13, 15),  # left elbow
+    (12, 14, 16),  # right elbow
+], dtype=np.intp)
+KNEES = np.array([
+    (23, 25, 27),  # left knee
+    (24, 26, 28),  # right knee
+], dtype=np.intp)
+
+def joint_angles(points, joints):
+    """
+    Angles (degrees, 0-180) at b for every (a, b, c) row of joints (N, 3):
+    points (..., 33, D) -> (..., N). D=2 gives the angle in the image
+    plane, D=3 the angle in space (using z).
+    """
+    joints = np.asarray(joints, dtype=np.intp).reshape(-1, 3)
+    a = points[..., joints[:, 0], :]
+    b = points[..., joints[:, 1], :]
+    c = points[..., joints[:, 2], :]
+    ba = a - b
+    bc = c - b
+    if points.shape[-1] == 2:
+        radians = np.arctan2(bc[..., 1], bc[..., 0]) - np.arctan2(ba[..., 1], ba[..., 0])
+        angle = np.abs(radians*180.0/np.pi)
+        return np.where(angle > 180.0, 360 - angle, angle)
+    cross = np.sqrt((np.cross(ba, bc) ** 2).sum(axis=-1))
+    dot = (ba * bc).sum(axis=-1)
+    return np.arctan2(cross, dot)*180.0/np.pi
+
+def torso_origin(points):
+    """
+    Hip centre (..., D) and shoulder width (...,) of each frame.
+    """
+    hip_center = (points[..., L_HIP, :] + points[..., R_HIP, :]) * 0.5
+    width = np.sqrt(((points[..., L_SHOULDER, :] - points[..., R_SHOULDER, :]) ** 2).sum(axis=-1))
+    return hip_center, width
+
+def normalize_pose(points, hip_center=None, scale=None):
+    """
+    Translates every point of each frame relative to hip_center and
+    multiplies by scale: points (..., K, D), hip_center (..., D), scale
+    (...). By default the frame's own hip centre and 1 / shoulder width
+    (1 where the shoulders coincide), so poses compare across camera
+    distances.
+    """
+    if hip_center is None or scale is None:
+        center, width = torso_origin(points)
+        if hip_center is None:
+            hip_center = center
+        if scale is None:
+            scale = 1.0 / np.where(width > 1e-6, width, 1.0)
+    return (points - np.asarray(hip_center)[..., None, :]) * np.asarray(scale)[..., None, None]
+
 def calculate_angle(a, b, c):
     """
     Calculates the angle at point b given points a, b, c.
-    Points are (x, y) or (x, y, z).
+    Points are (x, y) or (x, y, z); z is ignored (see joint_angles for 3D).
     Returns angle in degrees (0-180).
     """
-    a = np.array(a) # First
-    b = np.array(b) # Mid
-    c = np.array(c) # End
-    
-    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians*180.0/np.pi)
-    
-    if angle > 180.0:
-        angle = 360 - angle
-        
-    return angle
+    points = np.array([a, b, c])[:, :2]
+    return joint_angles(points, (0, 1, 2))[0]
 
 def normalize_keypoint(point, hip_center, scale):
     """
     Translates point relative to hip_center and scales it.
     """
-    return (point - hip_center) * scale
+    return normalize_pose(np.asarray(point)[None], hip_center, scale)[0]
@@ -0,0 +1,212 @@
+import numpy as np
+from src.logic.frame import as_pose_frame
+from src.logic.geometry import ELBOWS, KNEES, joint_angles
+
+"""
+Batched gesture detection: a NumPy ring buffer of recent frames per player,
+with angles, velocities and accelerations for every limb computed in one pass
+over all players and frames. Positions are measured in torso lengths
+(shoulder centre to hip centre) so thresholds hold at any camera distance.
+"""
+
+# Joint angles: (a, b, c) -> angle at b
+ANGLE_JOINTS = np.concatenate([ELBOWS, KNEES])
+L_ELBOW, R_ELBOW, L_KNEE, R_KNEE = range(4)
+
+# Tracked end points (velocities and accelerations)
+END_POINTS = np.array([15, 16, 27, 28, 0], dtype=np.intp)
+END_ROOTS = np.array([11, 12, 23, 24, 0], dtype=np.intp)  # nose: hip centre, filled in
+L_WRIST, R_WRIST, L_ANKLE, R_ANKLE, NOSE = range(5)
+
+# Priority order when several gestures show on the same frame
+ACTIONS = ('PUNCH_LEFT', 'PUNCH_RIGHT', 'KICK_LEFT', 'KICK_RIGHT', 'BLOCK', 'DODGE_LEFT', 'DODGE_RIGHT')
+
+def _window_max(x, frames):
+    """
+    Max over each frame and the frames-1 before it, along axis 1.
+    """
+    out = x.copy()
+    for k in range(1, frames):
+        out[:, k:] = np.maximum(out[:, k:], x[:, :-k])
+    return out
+
+def _window_all(x, frames):
+    """
+    True where a frame and the frames-1 before it are all True (False
+    until there are that many frames).
+    """
+    out = x.copy()
+    for k in range(1, frames):
+        out[:, k:] &= x[:, :-k]
+        out[:, :k] = False
+    return out
+
+class GestureDetector:
+    """
+    Punches, kicks, blocks and dodges for several players at once.
+
+    push() adds a frame to a player's ring buffer (`window` frames); detect()
+    evaluates every frame added since the previous call, for all players in
+    one batched pass, and returns one action per player: the first gesture
+    found on those frames, 'IDLE' otherwise. Each gesture is judged over the
+    frames leading up to it, so a fast punch between two ticks still counts;
+    punches and kicks also need the limb to have sped up sharply just before,
+    so a limb that is merely carried along at speed doesn't strike.
+    After an action a player is on cooldown (capture time).
+    """
+    def __init__(self, players=2, window=8, cooldown=0.4):
+        self.players = players
+        self.window = window
+        self.cooldown = cooldown
+
+        # Thresholds (torso lengths, torso lengths/sec, degrees)
+        self.EXTENSION_ANGLE = 150      # elbow/knee straight
+        self.PUNCH_REACH = 0.6          # wrist-shoulder distance
+        self.PUNCH_SPEED = 2.0
+        self.KICK_REACH = 0.6           # ankle sideways from the hip
+        self.KICK_SPEED = 2.0
+        self.BLOCK_HEIGHT = 0.25        # wrists above the shoulder line
+        self.BLOCK_WIDTH = 0.35         # wrists this close to the nose, sideways
+        self.BLOCK_FRAMES = 3           # held this many frames
+        self.DODGE_LEAN = 0.3           # nose sideways from the hip centre
+        self.DODGE_SPEED = 1.0          # sideways nose speed
+        self.SPEED_FRAMES = 3           # peak speed taken over this many frames
+        self.STRIKE_ACCEL = 40.0        # speed-up (torso lengths/sec^2) that starts a strike
+        self.ONSET_FRAMES = 5           # ... within this many frames
+
+        self.xy = np.zeros((players, window, 33, 2), dtype=np.float32)
+        self.times = np.full((players, window), -np.inf)
+        self.head = np.zeros(players, dtype=np.intp)   # next slot to write
+        self.new = np.zeros(players, dtype=np.intp)    # frames since the last detect()
+        self.cooldown_until = np.full(players, -np.inf)
+        self.rows = np.arange(players)[:, None]
+        self.offsets = np.arange(window)
+
+    def reset(self, player=None):
+        players = slice(None) if player is None else player
+        self.times[players] = -np.inf
+        self.new[players] = 0
+        self.cooldown_until[players] = -np.inf
+
+    def push(self, player, landmarks, t):
+        """
+        Adds one frame (capture time t, increasing) for player 0..players-1.
+        """
+        slot = self.head[player]
+        self.xy[player, slot] = as_pose_frame(landmarks).xy
+        self.times[player, slot] = t
+        self.head[player] = (slot + 1) % self.window
+        self.new[player] = min(self.new[player] + 1, self.window)
+
+    def features(self):
+        """
+        Per-frame features for every player, oldest frame first:
+        times (P, W), torso length (P, W), joint angles (P, W, 4), end point
+        positions relative to their root in torso lengths (P, W, 5, 2),
+        wrist x relative to the nose (P, W, 2), and velocities and
+        accelerations (P, W, 5, 2) in torso lengths per second (zero where
+        the history is too short).
+        """
+        order = (self.head[:, None] + self.offsets) % self.window
+        xy = self.xy[self.rows, order]
+        t = self.times[self.rows, order]
+
+        shoulders = (xy[..., 11, :] + xy[..., 12, :]) * 0.5
+        hips = (xy[..., 23, :] + xy[..., 24, :]) * 0.5
+        torso = np.sqrt(((shoulders - hips) ** 2).sum(axis=-1))
+        torso = np.where(torso > 1e-6, torso, 1.0)
+
+        angles = joint_angles(xy, ANGLE_JOINTS)
+
+        # End points relative to shoulder (wrists), hip (ankles), hip centre (nose)
+        ends = xy[..., END_POINTS, :]
+        roots = xy[..., END_ROOTS, :]
+        roots[..., NOSE, :] = hips
+        rel = (ends - roots) / torso[..., None, None]
+        face = (ends[..., (L_WRIST, R_WRIST), 0] - ends[..., NOSE:, 0]) / torso[..., None]
+
+        # Finite differences in capture time, scaled by the newer frame's torso
+        with np.errstate(invalid='ignore'):  # empty slots hold -inf
+            dt = t[:, 1:] - t[:, :-1]
+        ok = np.isfinite(dt) & (dt > 0)
+        scale = np.where(ok, 1.0 / np.where(ok, dt, 1.0), 0.0)[..., None, None]
+        vel = np.zeros(ends.shape)
+        vel[:, 1:] = (ends[:, 1:] - ends[:, :-1]) * (scale / torso[:, 1:, None, None])
+        acc = np.zeros(ends.shape)
+        acc[:, 2:] = (vel[:, 2:] - vel[:, 1:-1]) * (scale[:, 1:] * ok[:, :-1, None, None])
+        return {'times': t, 'torso': torso, 'angles': angles, 'rel': rel, 'face': face, 'vel': vel, 'acc': acc}
+
+    def gestures(self, f):
+        """
+        (P, W, len(ACTIONS)) bool: which gestures each frame shows.
+        """
+        angles, rel, vel = f['angles'], f['rel'], f['vel']
+        speed_now = np.sqrt((vel ** 2).sum(axis=-1))
+        speed = _window_max(speed_now, self.SPEED_FRAMES)
+        # Strikes are thrown, not drifted into: the limb sped up sharply just before
+        # (acceleration along the direction of motion)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            speed_up = np.where(speed_now > 1e-6, (f['acc'] * vel).sum(axis=-1) / speed_now, 0.0)
+        thrown = _window_max(speed_up, self.ONSET_FRAMES) > self.STRIKE_ACCEL
+        reach = np.sqrt((rel ** 2).sum(axis=-1))
+        straight = angles > self.EXTENSION_ANGLE
+        # Still reaching out (or holding), not pulling back
+        extending = np.ones_like(reach, dtype=bool)
+        extending[:, 1:] = reach[:, 1:] >= reach[:, :-1]
+
+        punch = (straight[..., (L_ELBOW, R_ELBOW)] & extending[..., (L_WRIST, R_WRIST)]
+                 & (reach[..., (L_WRIST, R_WRIST)] > self.PUNCH_REACH) & (speed[..., (L_WRIST, R_WRIST)] > self.PUNCH_SPEED)
+                 & thrown[..., (L_WRIST, R_WRIST)])
+
+        # Ankle out sideways and up near hip height
+        kick = (straight[..., (L_KNEE, R_KNEE)] & extending[..., (L_ANKLE, R_ANKLE)]
+                & (np.abs(rel[..., (L_ANKLE, R_ANKLE), 0]) > self.KICK_REACH)
+                & (rel[..., (L_ANKLE, R_ANKLE), 1] < 0.5) & (speed[..., (L_ANKLE, R_ANKLE)] > self.KICK_SPEED)
+                & thrown[..., (L_ANKLE, R_ANKLE)])
+
+        # Both wrists above the shoulders, in front of the face: fires once held
+        wrists_up = (-rel[..., (L_WRIST, R_WRIST), 1] > self.BLOCK_HEIGHT).all(axis=-1)
+        wrists_in = (np.abs(f['face']) < self.BLOCK_WIDTH).all(axis=-1)
+        held = _window_all(wrists_up & wrists_in, self.BLOCK_FRAMES)
+        block = held.copy()
+        block[:, 1:] &= ~held[:, :-1]
+
+        # Head slipped sideways over the hips, moving that way
+        nose_x = rel[..., NOSE, 0]
+        dodge_l = (nose_x > self.DODGE_LEAN) & (vel[..., NOSE, 0] > self.DODGE_SPEED)
+        dodge_r = (nose_x < -self.DODGE_LEAN) & (vel[..., NOSE, 0] < -self.DODGE_SPEED)
+        return np.stack([punch[..., 0], punch[..., 1], kick[..., 0], kick[..., 1], block, dodge_l, dodge_r], axis=-1)
+
+    def detect(self):
+        """
+        Evaluates the frames pushed since the last call. Returns one action per player.
+        """
+        actions = ['IDLE'] * self.players
+        if not self.new.any():
+            return actions
+        f = self.features()
+        shown = self.gestures(f)
+        t = f['times']
+        fresh = self.offsets >= self.window - self.new[:, None]
+        candidates = shown.any(axis=-1) & fresh & (t >= self.cooldown_until[:, None])
+        self.new[:] = 0
+
+        for player in np.flatnonzero(candidates.any(axis=1)):
+            frame = np.argmax(candidates[player])
+            actions[player] = ACTIONS[np.argmax(shown[player, frame])]
+            self.cooldown_until[player] = t[player, frame] + self.cooldown
+        return actions
+
+    def update(self, frames, times):
+        """
+        Pushes each player's new frames (a list per player, or one frame or
+        None) with their capture times, then detect().
+        """
+        for player, (player_frames, player_times) in enumerate(zip(frames, times)):
+            if player_frames is None:
+                continue
+            if not isinstance(player_frames, (list, tuple)):
+                player_frames, player_times = [player_frames], [player_times]
+            for landmarks, t in zip(player_frames, player_times):
+                self.push(player, landmarks, t)
+        return self.detect()
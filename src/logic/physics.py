@@ -1,8 +1,86 @@
+import numpy as np
+from src.logic.frame import as_pose_frame
+
+"""
+Hit detection in arena coordinates (the renderer's pixel space: a player's
+normalized landmarks scaled by AVATAR_SCALE and shifted to their spot).
+Bodies are capsules (segment + radius); strikes are the segment a fist or
+foot swept between two frames, so a fast punch that jumps clean over a
+forearm between camera frames still connects.
+"""
+
+# Hurtboxes: (start, end, radius in arena px); start == end is a circle.
+# The torso and head are built from several landmarks (see hurtboxes()).
+LIMB_BOXES = np.array([
+    (11, 13), (13, 15),  # left arm
+    (12, 14), (14, 16),  # right arm
+    (23, 25), (25, 27),  # left leg
+    (24, 26), (26, 28),  # right leg
+], dtype=np.intp)
+HEAD, TORSO = 0, 1
+BOX_NAMES = ('head', 'torso', 'l_upper_arm', 'l_forearm', 'r_upper_arm', 'r_forearm',
+             'l_thigh', 'l_shin', 'r_thigh', 'r_shin')
+
+# Striking end points, in this order: left fist, right fist, left foot, right foot
+STRIKE_POINTS = np.array([15, 16, 27, 28], dtype=np.intp)
+STRIKE_NAMES = ('l_fist', 'r_fist', 'l_foot', 'r_foot')
+ACTION_STRIKES = {'PUNCH_LEFT': 0, 'PUNCH_RIGHT': 1, 'KICK_LEFT': 2, 'KICK_RIGHT': 3}
+
+def segment_distance(p0, p1, q0, q1):
+    """
+    Closest distance between segments p0-p1 and q0-q1 (either may be a
+    point), broadcast over any leading shape: (..., 2) -> (...).
+    """
+    d1 = p1 - p0
+    d2 = q1 - q0
+    r = p0 - q0
+    a = (d1 * d1).sum(axis=-1)
+    e = (d2 * d2).sum(axis=-1)
+    f = (d2 * r).sum(axis=-1)
+    c = (d1 * r).sum(axis=-1)
+    b = (d1 * d2).sum(axis=-1)
+    p_point = a <= 1e-12
+    q_point = e <= 1e-12
+    safe_a = np.where(p_point, 1.0, a)
+    safe_e = np.where(q_point, 1.0, e)
+
+    # Closest point of the infinite lines, s clamped to p's segment (0 if parallel)
+    denom = a * e - b * b
+    s = np.where(denom > 1e-12, np.clip((b * f - c * e) / np.where(denom > 1e-12, denom, 1.0), 0.0, 1.0), 0.0)
+    # Matching t on q; if it falls off q, clamp it and redo s for that end
+    t = (b * s + f) / safe_e
+    s = np.where(t < 0.0, np.clip(-c / safe_a, 0.0, 1.0), np.where(t > 1.0, np.clip((b - c) / safe_a, 0.0, 1.0), s))
+    t = np.clip(t, 0.0, 1.0)
+
+    # Degenerate segments
+    s = np.where(p_point, 0.0, np.where(q_point, np.clip(-c / safe_a, 0.0, 1.0), s))
+    t = np.where(q_point, 0.0, np.where(p_point, np.clip(f / safe_e, 0.0, 1.0), t))
+
+    gap = (p0 + d1 * s[..., None]) - (q0 + d2 * t[..., None])
+    return np.sqrt((gap * gap).sum(axis=-1))
+
 class PhysicsEngine:
     """
     Handles collisions between separate entity coordinates.
-    Arguments are typically normalized game coordinates (0-1000 range).
+
+    Each player's camera-normalized landmarks are placed in the arena at
+    placements[player_id] = (x, y) with `scale` arena units per normalized
+    unit, the same mapping the renderer draws with. hurtboxes() turns a
+    pose into capsules; strike_hits() tests every strike sweep of one
+    player against every hurtbox of the other in one batched call.
     """
+    def __init__(self, placements=None, scale=(300, 400)):
+        self.placements = placements or {1: (200, 100), 2: (800, 100)}
+        self.scale = np.array(scale, dtype=np.float64)
+
+        # Radii (arena px)
+        self.ARM_RADIUS = 10
+        self.LEG_RADIUS = 14
+        self.HEAD_RADIUS = 0.6       # times the ear-to-ear distance
+        self.TORSO_RADIUS = 0.5      # times the shoulder width
+        self.FIST_RADIUS = 10
+        self.FOOT_RADIUS = 12
+
     def check_hit(self, attack_point, hitbox_rect):
         """
         attack_point: (x, y)
@@ -10,16 +88,61 @@ class PhysicsEngine:
         """
         px, py = attack_point
         rx, ry, rw, rh = hitbox_rect
-        
+
         if rx <= px <= rx + rw and ry <= py <= ry + rh:
             return True
         return False
 
-    def get_hitbox(self, pose_coords, type="BODY"):
+    def to_arena(self, player_id, landmarks):
+        """
+        (33, 2) arena coordinates of a player's landmarks.
+        """
+        return as_pose_frame(landmarks).xy.astype(np.float64) * self.scale + self.placements[player_id]
+
+    def hurtboxes(self, player_id, landmarks):
+        """
+        Capsules covering the player's body: (starts (B, 2), ends (B, 2), radii (B,)),
+        in BOX_NAMES order.
+        """
+        points = self.to_arena(player_id, landmarks)
+        shoulders = (points[11] + points[12]) * 0.5
+        hips = (points[23] + points[24]) * 0.5
+        shoulder_width = np.linalg.norm(points[11] - points[12])
+        head_radius = self.HEAD_RADIUS * np.linalg.norm(points[7] - points[8])
+
+        starts = np.empty((2 + len(LIMB_BOXES), 2))
+        ends = np.empty_like(starts)
+        starts[HEAD] = ends[HEAD] = points[0]
+        starts[TORSO], ends[TORSO] = shoulders, hips
+        starts[2:] = points[LIMB_BOXES[:, 0]]
+        ends[2:] = points[LIMB_BOXES[:, 1]]
+        radii = np.array([head_radius, self.TORSO_RADIUS * shoulder_width]
+                         + [self.ARM_RADIUS] * 4 + [self.LEG_RADIUS] * 4, dtype=np.float64)
+        return starts, ends, radii
+
+    def get_hitbox(self, pose_coords, type="BODY", player_id=1):
         """
-        Returns a bounding box valid for the current pose.
+        Returns a bounding box valid for the current pose: (x, y, w, h) in
+        arena coordinates around every hurtbox ("BODY") or one of BOX_NAMES.
         Requires normalized pose coordinates.
         """
-        # Placeholder: returning generic box
-        # Real impl would calculate box around torso landmarks
-        return (0, 0, 0, 0)
+        starts, ends, radii = self.hurtboxes(player_id, pose_coords)
+        if type != "BODY":
+            i = BOX_NAMES.index(type)
+            starts, ends, radii = starts[i:i + 1], ends[i:i + 1], radii[i:i + 1]
+        low = (np.minimum(starts, ends) - radii[:, None]).min(axis=0)
+        high = (np.maximum(starts, ends) + radii[:, None]).max(axis=0)
+        return (float(low[0]), float(low[1]), float(high[0] - low[0]), float(high[1] - low[1]))
+
+    def strike_hits(self, attacker_id, prev_landmarks, landmarks, defender_id, defender_landmarks):
+        """
+        (strikes, boxes) bool: which of the attacker's fists and feet
+        (STRIKE_NAMES), swept from prev_landmarks to landmarks, touched which
+        of the defender's hurtboxes (BOX_NAMES, at defender_landmarks).
+        """
+        end = self.to_arena(attacker_id, landmarks)[STRIKE_POINTS]
+        start = end if prev_landmarks is None else self.to_arena(attacker_id, prev_landmarks)[STRIKE_POINTS]
+        box_starts, box_ends, box_radii = self.hurtboxes(defender_id, defender_landmarks)
+        distance = segment_distance(start[:, None], end[:, None], box_starts[None], box_ends[None])
+        strike_radii = np.array([self.FIST_RADIUS] * 2 + [self.FOOT_RADIUS] * 2, dtype=np.float64)
+        return distance <= strike_radii[:, None] + box_radii[None]
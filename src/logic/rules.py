@@ -1,5 +1,6 @@
 import numpy as np
-from src.logic.geometry import calculate_angle
+from src.logic.geometry import ELBOWS, joint_angles
+from src.logic.frame import as_pose_frame
 import time
 
 class ActionDetector:
@@ -9,7 +10,7 @@ class ActionDetector:
     """
     def __init__(self):
         self.prev_landmarks = None
-        self.prev_time = time.time()
+        self.prev_time = None
         
         # Velocity thresholds (pixels/sec or normalized units/sec)
         # These need tuning!
@@ -23,16 +24,17 @@ class ActionDetector:
         self.last_action = "IDLE"
         self.cooldown = 0
 
-    def detect(self, landmarks):
+    def detect(self, landmarks, now=None):
         """
         Returns 'IDLE', 'PUNCH_LEFT', 'PUNCH_RIGHT', 'KICK_LEFT', 'KICK_RIGHT'
+        now: time of this frame in seconds (e.g. simulation time), defaults to wall clock.
         """
         if landmarks is None:
             return "IDLE"
 
-        current_time = time.time()
-        dt = current_time - self.prev_time
-        if dt == 0: dt = 0.001
+        current_time = time.time() if now is None else now
+        dt = current_time - self.prev_time if self.prev_time is not None else 0.001
+        if dt <= 0: dt = 0.001
         
         # Extract useful joints (MediaPipe indices)
         # 11=L_Shoulder, 13=L_Elbow, 15=L_Wrist
@@ -40,29 +42,25 @@ class ActionDetector:
         # 23=L_Hip, 25=L_Knee, 27=L_Ankle
         # 24=R_Hip, 26=R_Knee, 28=R_Ankle
         
-        l_shoulder = [landmarks.landmark[11].x, landmarks.landmark[11].y]
-        l_elbow = [landmarks.landmark[13].x, landmarks.landmark[13].y]
-        l_wrist = [landmarks.landmark[15].x, landmarks.landmark[15].y]
-        
-        r_shoulder = [landmarks.landmark[12].x, landmarks.landmark[12].y]
-        r_elbow = [landmarks.landmark[14].x, landmarks.landmark[14].y]
-        r_wrist = [landmarks.landmark[16].x, landmarks.landmark[16].y]
+        landmarks = as_pose_frame(landmarks)
+        xy = landmarks.xy
+
+        l_wrist = xy[15]
+        r_wrist = xy[16]
         
-        # Calculate Angles
-        l_elbow_angle = calculate_angle(l_shoulder, l_elbow, l_wrist)
-        r_elbow_angle = calculate_angle(r_shoulder, r_elbow, r_wrist)
+        # Calculate Angles (both elbows in one call)
+        l_elbow_angle, r_elbow_angle = joint_angles(xy, ELBOWS)
         
         # Calculate Velocities if we have history
         l_wrist_vel = 0
         r_wrist_vel = 0
         
         if self.prev_landmarks:
-            prev_l_wrist = [self.prev_landmarks.landmark[15].x, self.prev_landmarks.landmark[15].y]
-            prev_r_wrist = [self.prev_landmarks.landmark[16].x, self.prev_landmarks.landmark[16].y]
+            prev_xy = self.prev_landmarks.xy
             
             # Simple Euclidean distance change
-            l_wrist_dist = np.linalg.norm(np.array(l_wrist) - np.array(prev_l_wrist))
-            r_wrist_dist = np.linalg.norm(np.array(r_wrist) - np.array(prev_r_wrist))
+            l_wrist_dist = np.linalg.norm(l_wrist - prev_xy[15])
+            r_wrist_dist = np.linalg.norm(r_wrist - prev_xy[16])
             
             l_wrist_vel = l_wrist_dist / dt
             r_wrist_vel = r_wrist_dist / dt
@@ -1,4 +1,6 @@
 import math
+import numpy as np
+from src.logic.frame import PoseFrame, as_pose_frame
 
 class OneEuroFilter:
     def __init__(self, t0, x0, dx0=0.0, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
@@ -22,6 +24,9 @@ class OneEuroFilter:
     def filter(self, t, x):
         """Compute the filtered signal."""
         t_e = t - self.t_prev
+        if t_e <= 0:
+            # Duplicate/out-of-order timestamp: nothing new to integrate
+            return self.x_prev
 
         # The filtered derivative of the signal.
         a_d = self.smoothing_factor(t_e, self.d_cutoff)
@@ -39,48 +44,163 @@ class OneEuroFilter:
         self.t_prev = t
         return x_hat
 
+class VectorOneEuroFilter:
+    """
+    One Euro filter over whole arrays: a (33, 4) frame or a (players, 33, 4) batch.
+    Same maths as OneEuroFilter, element-wise, with float64 state.
+
+    Once the shape is known every frame is filtered in place in preallocated
+    buffers, so a steady stream allocates next to nothing; the array
+    filter() returns is only valid until the next call.
+    """
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        # The parameters.
+        self.min_cutoff = float(min_cutoff)
+        self.beta = float(beta)
+        self.d_cutoff = float(d_cutoff)
+        # Previous values (allocated on the first frame).
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    @staticmethod
+    def smoothing_factor(t_e, cutoff):
+        r = 2 * math.pi * cutoff * t_e
+        return r / (r + 1)
+
+    def filter(self, t, x, reset=None):
+        """
+        t: float seconds, or one timestamp per batch entry (shape x.shape[:-2])
+        x: array (..., 33, 4)
+        reset: optional bool mask (..., 33); those landmarks restart from x
+        """
+        x = np.asarray(x, dtype=np.float64)
+        t = np.asarray(t, dtype=np.float64)
+
+        if self.x_prev is None or self.x_prev.shape != x.shape:
+            self.x_prev = x.copy()
+            self.dx_prev = np.zeros_like(x)
+            self.t_prev = np.broadcast_to(t, x.shape[:-2]).copy()
+            self._x, self._dx, self._tmp = np.empty_like(x), np.empty_like(x), np.empty_like(x)
+            return self.x_prev.copy()
+
+        # Elapsed time per batch entry, broadcast over (33, 4)
+        t_e = (t - self.t_prev)[..., None, None]
+        valid = t_e > 0
+        if valid.all():
+            return self._filter_in_place(t, t_e, x, reset)
+        t_e = np.where(valid, t_e, 1.0)
+
+        # The filtered derivative of the signal.
+        a_d = self.smoothing_factor(t_e, self.d_cutoff)
+        dx = (x - self.x_prev) / t_e
+        dx_hat = a_d * dx + (1 - a_d) * self.dx_prev
+
+        # The filtered signal.
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        a = self.smoothing_factor(t_e, cutoff)
+        x_hat = a * x + (1 - a) * self.x_prev
+
+        # Duplicate timestamps keep the previous state
+        x_hat = np.where(valid, x_hat, self.x_prev)
+        dx_hat = np.where(valid, dx_hat, self.dx_prev)
+
+        if reset is not None:
+            reset = np.asarray(reset, dtype=bool)[..., None]
+            x_hat = np.where(reset, x, x_hat)
+            dx_hat = np.where(reset, 0.0, dx_hat)
+
+        # Memorize the previous values.
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = np.where(valid[..., 0, 0], t, self.t_prev)
+        return x_hat
+
+    def _filter_in_place(self, t, t_e, x, reset):
+        """
+        filter() when every entry moved forward in time: the same operations
+        in the same order (so bit-identical results), written into the
+        scratch buffers, which then swap with the state.
+        """
+        x_hat, dx_hat, tmp = self._x, self._dx, self._tmp
+        np.copyto(x_hat, x)
+
+        # The filtered derivative of the signal.
+        a_d = self.smoothing_factor(t_e, self.d_cutoff)
+        np.subtract(x_hat, self.x_prev, out=dx_hat)
+        dx_hat /= t_e
+        dx_hat *= a_d
+        np.multiply(1 - a_d, self.dx_prev, out=tmp)
+        dx_hat += tmp
+
+        # The filtered signal: a = r / (r + 1) with r = 2 pi cutoff t_e
+        a = tmp
+        np.abs(dx_hat, out=a)
+        a *= self.beta
+        a += self.min_cutoff
+        a *= 2 * math.pi
+        a *= t_e
+        np.divide(a, a + 1, out=a)
+        x_hat *= a
+        np.subtract(1, a, out=a)
+        a *= self.x_prev
+        x_hat += a
+
+        if reset is not None:
+            reset = np.asarray(reset, dtype=bool)[..., None]
+            np.copyto(x_hat, x, where=reset)
+            np.copyto(dx_hat, 0.0, where=reset)
+
+        # Memorize the previous values (the old state becomes the next scratch).
+        self._x, self.x_prev = self.x_prev, x_hat
+        self._dx, self.dx_prev = self.dx_prev, dx_hat
+        self.t_prev[...] = t
+        return x_hat
+
 class LandmarkSmoother:
     """
     Wrapper for smoothing 33 landmarks (x, y, z, v).
     """
-    def __init__(self, min_cutoff=0.01, beta=0.1): # Tuned for human motion
-        self.filters = {} # Map (landmark_index, axis_index) -> Filter
-        self.min_cutoff = min_cutoff
-        self.beta = beta
+    def __init__(self, min_cutoff=0.01, beta=0.1, reset_visibility=None): # Tuned for human motion
+        self.filter = VectorOneEuroFilter(min_cutoff=min_cutoff, beta=beta)
+        # Landmarks whose raw visibility falls below this restart their filter
+        self.reset_visibility = reset_visibility
         self.started = False
+
+    @property
+    def min_cutoff(self):
+        return self.filter.min_cutoff
+
+    @min_cutoff.setter
+    def min_cutoff(self, value):
+        self.filter.min_cutoff = value
+
+    @property
+    def beta(self):
+        return self.filter.beta
+
+    @beta.setter
+    def beta(self, value):
+        self.filter.beta = value
         
     def smooth(self, landmarks, timestamp):
         """
-        landmarks: Object with .landmark list or dict list
+        landmarks: PoseFrame, object with .landmark list or dict list
         timestamp: float seconds
+        Returns a PoseFrame.
         """
-        if not landmarks:
+        if not isinstance(landmarks, np.ndarray) and not landmarks:
             return None
-            
-        # Standardize input to list of dicts
-        data = []
-        is_object = hasattr(landmarks, 'landmark')
-        source = landmarks.landmark if is_object else landmarks
-        
-        smoothed_data = []
-        
-        for i, lm in enumerate(source):
-            # Extract raw
-            raw = [lm.x, lm.y, lm.z, lm.visibility] if is_object else [lm['x'], lm['y'], lm['z'], lm['v']]
-            
-            smoothed_point = {}
-            keys = ['x', 'y', 'z', 'v']
-            
-            for j, axis_val in enumerate(raw):
-                key = (i, j)
-                if key not in self.filters:
-                    self.filters[key] = OneEuroFilter(timestamp, axis_val, min_cutoff=self.min_cutoff, beta=self.beta)
-                    smoothed_val = axis_val
-                else:
-                    smoothed_val = self.filters[key].filter(timestamp, axis_val)
-                
-                smoothed_point[keys[j]] = smoothed_val
-                
-            smoothed_data.append(smoothed_point)
-            
-        return smoothed_data
+
+        frame = as_pose_frame(landmarks)
+        reset = None
+        if self.reset_visibility is not None:
+            reset = frame.data[:, 3] < self.reset_visibility
+
+        out = self.filter.filter(timestamp, frame.data, reset)
+        return PoseFrame(out, frame.timestamp, frame.seq)
@@ -0,0 +1,247 @@
+import math
+import numpy as np
+from src.logic.frame import NUM_LANDMARKS, PoseFrame
+
+"""
+Synthetic MediaPipe-style poses for benchmarks and headless runs.
+Coordinates are normalized image coordinates of a player facing the camera
+(the player's left side appears on the right of the image).
+"""
+
+# Guard stance: fists up by the chin
+BASE_POSE = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+BASE_POSE[:, 3] = 0.99
+_JOINTS = {
+    0: (0.50, 0.15),                                   # nose
+    1: (0.52, 0.13), 2: (0.53, 0.13), 3: (0.54, 0.13),  # left eye
+    4: (0.48, 0.13), 5: (0.47, 0.13), 6: (0.46, 0.13),  # right eye
+    7: (0.56, 0.14), 8: (0.44, 0.14),                  # ears
+    9: (0.52, 0.18), 10: (0.48, 0.18),                 # mouth
+    11: (0.58, 0.30), 12: (0.42, 0.30),                # shoulders
+    13: (0.62, 0.42), 14: (0.38, 0.42),                # elbows
+    15: (0.56, 0.30), 16: (0.44, 0.30),                # wrists
+    17: (0.55, 0.28), 18: (0.45, 0.28),                # pinkies
+    19: (0.56, 0.27), 20: (0.44, 0.27),                # index fingers
+    21: (0.55, 0.29), 22: (0.45, 0.29),                # thumbs
+    23: (0.55, 0.58), 24: (0.45, 0.58),                # hips
+    25: (0.56, 0.75), 26: (0.44, 0.75),                # knees
+    27: (0.56, 0.92), 28: (0.44, 0.92),                # ankles
+    29: (0.55, 0.94), 30: (0.45, 0.94),                # heels
+    31: (0.58, 0.95), 32: (0.42, 0.95),                # foot index
+}
+for _idx, (_x, _y) in _JOINTS.items():
+    BASE_POSE[_idx, 0] = _x
+    BASE_POSE[_idx, 1] = _y
+
+# (shoulder/hip, elbow/knee, wrist/ankle, hand/foot points, outward x direction)
+LEFT_ARM = (11, 13, 15, (17, 19, 21), 1.0)
+RIGHT_ARM = (12, 14, 16, (18, 20, 22), -1.0)
+LEFT_LEG = (23, 25, 27, (29, 31), 1.0)
+RIGHT_LEG = (24, 26, 28, (30, 32), -1.0)
+
+def _extend(pose, limb, amount, reach):
+    """
+    Straightens a limb sideways: amount 0 = stance, 1 = fully extended.
+    """
+    if amount <= 0:
+        return
+    root, mid, end, extras, direction = limb
+    origin = pose[root, :2]
+    target_mid = origin + np.array([direction * reach / 2, 0.0], dtype=np.float32)
+    target_end = origin + np.array([direction * reach, 0.0], dtype=np.float32)
+    old_end = pose[end, :2].copy()
+    pose[mid, :2] += (target_mid - pose[mid, :2]) * amount
+    pose[end, :2] += (target_end - pose[end, :2]) * amount
+    for idx in extras:
+        pose[idx, :2] += pose[end, :2] - old_end
+
+def _block(pose, amount):
+    """
+    Brings both fists up in front of the face: amount 0 = stance, 1 = covered.
+    """
+    if amount <= 0:
+        return
+    nose = pose[0, :2].copy()
+    for arm, side in ((LEFT_ARM, 1.0), (RIGHT_ARM, -1.0)):
+        root, mid, end, extras, _ = arm
+        target_end = nose + np.array([side * 0.03, 0.02], dtype=np.float32)
+        target_mid = pose[root, :2] + np.array([side * 0.02, 0.06], dtype=np.float32)
+        old_end = pose[end, :2].copy()
+        pose[mid, :2] += (target_mid - pose[mid, :2]) * amount
+        pose[end, :2] += (target_end - pose[end, :2]) * amount
+        for idx in extras:
+            pose[idx, :2] += pose[end, :2] - old_end
+
+def _lean(pose, amount):
+    """
+    Slips the upper body sideways over the hips: amount -1..1, positive
+    towards the player's left (+x in the image).
+    """
+    if amount == 0:
+        return
+    pose[:11, 0] += 0.12 * amount   # head
+    pose[11:23, 0] += 0.08 * amount  # shoulders and arms
+
+def pulse(t, start, duration):
+    """
+    0 -> 1 -> 0 triangle over [start, start + duration].
+    """
+    if t < start or t > start + duration:
+        return 0.0
+    phase = (t - start) / duration
+    return 1.0 - abs(2.0 * phase - 1.0)
+
+def synthetic_pose(t=0.0, punch_left=0.0, punch_right=0.0, kick_left=0.0, kick_right=0.0,
+                   sway=0.01, noise=0.0, rng=None, block=0.0, lean=0.0):
+    """
+    Returns a (33, 4) float32 pose at time t (seconds) with gentle idle sway.
+    punch_*/kick_* in [0, 1] extend the corresponding limb, block in [0, 1]
+    raises both fists to the face, lean in [-1, 1] slips the upper body.
+    """
+    pose = BASE_POSE.copy()
+    pose[:, 0] += sway * math.sin(2 * math.pi * 0.5 * t)
+    pose[:, 1] += sway * 0.5 * math.sin(2 * math.pi * 1.0 * t)
+
+    _lean(pose, lean)
+    _block(pose, block)
+
+    _extend(pose, LEFT_ARM, punch_left, 0.26)
+    _extend(pose, RIGHT_ARM, punch_right, 0.26)
+    _extend(pose, LEFT_LEG, kick_left, 0.34)
+    _extend(pose, RIGHT_LEG, kick_right, 0.34)
+
+    if noise > 0:
+        rng = rng if rng is not None else np.random.default_rng()
+        pose[:, :3] += rng.normal(0.0, noise, size=(NUM_LANDMARKS, 3)).astype(np.float32)
+    return pose
+
+def jab(t, period, start, duration=0.6):
+    """
+    Punch envelope repeating every `period` s: quick extension, hold, retract.
+    """
+    return min(1.0, 3.0 * pulse(t % period, start, duration))
+
+def fight_frames(input_hz=30, seconds=60.0, p1_period=1.2, p2_period=1.7, noise=0.0, seed=0):
+    """
+    Scripted two-player fight as camera frames: yields (p1, p2) PoseFrames at input_hz.
+    P1 throws left jabs every p1_period seconds, P2 right jabs every p2_period.
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(int(seconds * input_hz)):
+        t = i / input_hz
+        p1 = synthetic_pose(t, punch_left=jab(t, p1_period, 0.1), noise=noise, rng=rng)
+        p2 = synthetic_pose(t + 0.3, punch_right=jab(t, p2_period, 0.2), noise=noise, rng=rng)
+        yield PoseFrame(p1, t, i), PoseFrame(p2, t, i)
+
+# Labeled gestures for detector tests: label -> synthetic_pose keyword and value
+GESTURES = {
+    'PUNCH_LEFT': ('punch_left', 1.0),
+    'PUNCH_RIGHT': ('punch_right', 1.0),
+    'KICK_LEFT': ('kick_left', 1.0),
+    'KICK_RIGHT': ('kick_right', 1.0),
+    'BLOCK': ('block', 1.0),
+    'DODGE_LEFT': ('lean', 1.0),
+    'DODGE_RIGHT': ('lean', -1.0),
+}
+
+def gesture_sequence(input_hz=30, seconds=60.0, gap=(0.6, 1.2), duration=0.6, idle=0.15, noise=0.0, seed=0):
+    """
+    Random labeled gestures with idle gaps in between.
+    Returns (frames, events): PoseFrames at input_hz and (label, start, end)
+    for each gesture (label None for a deliberate idle slot).
+    """
+    rng = np.random.default_rng(seed)
+    labels = sorted(GESTURES)
+    events = []
+    t = 0.5
+    while t + duration < seconds:
+        label = None if rng.random() < idle else labels[rng.integers(len(labels))]
+        events.append((label, t, t + duration))
+        t += duration + rng.uniform(*gap)
+
+    frames = []
+    current = 0
+    for i in range(int(seconds * input_hz)):
+        t = i / input_hz
+        while current < len(events) - 1 and t > events[current][2]:
+            current += 1
+        kwargs = {}
+        label, start, end = events[current] if events else (None, 0.0, 0.0)
+        if label is not None and start <= t <= end:
+            key, value = GESTURES[label]
+            kwargs[key] = value * min(1.0, 3.0 * pulse(t, start, duration))
+        frames.append(PoseFrame(synthetic_pose(t, noise=noise, rng=rng, **kwargs), t, i))
+    return frames, events
+
+# Combos for template tests: name -> (gesture label, start, duration) moves, in seconds at speed 1
+COMBOS = {
+    'ONE_TWO': (('PUNCH_LEFT', 0.0, 0.4), ('PUNCH_RIGHT', 0.3, 0.4)),
+    'DOUBLE_PALM': (('PUNCH_LEFT', 0.0, 0.8), ('PUNCH_RIGHT', 0.0, 0.8)),
+    'KICK_PUNCH': (('KICK_LEFT', 0.0, 0.5), ('PUNCH_RIGHT', 0.4, 0.4)),
+    'SLIP_COUNTER': (('DODGE_RIGHT', 0.0, 0.5), ('PUNCH_LEFT', 0.35, 0.4)),
+    'COVER_KICK': (('BLOCK', 0.0, 0.5), ('KICK_RIGHT', 0.4, 0.5)),
+}
+
+def combo_length(name, speed=1.0):
+    return max(start + duration for _, start, duration in COMBOS[name]) / speed
+
+def combo_kwargs(name, t, speed=1.0):
+    """
+    synthetic_pose keywords for combo `name`, t seconds after it started.
+    """
+    kwargs = {}
+    for label, start, duration in COMBOS[name]:
+        key, value = GESTURES[label]
+        kwargs[key] = kwargs.get(key, 0.0) + value * min(1.0, 3.0 * pulse(t * speed, start, duration))
+    return kwargs
+
+def combo_frames(name, input_hz=30, speed=1.0, noise=0.0, seed=0):
+    """
+    One combo from stance to stance: (PoseFrames, capture times).
+    """
+    rng = np.random.default_rng(seed)
+    times = np.arange(int(combo_length(name, speed) * input_hz) + 2) / input_hz
+    frames = [PoseFrame(synthetic_pose(t, noise=noise, rng=rng, **combo_kwargs(name, t, speed)), t, i)
+              for i, t in enumerate(times)]
+    return frames, times
+
+def combo_sequence(input_hz=30, seconds=60.0, gap=(0.8, 1.6), speed=(0.8, 1.25), singles=0.3,
+                   noise=0.0, seed=0):
+    """
+    Random combos at random speeds with idle gaps, plus single gestures
+    (`singles` of the slots) that no combo template should match.
+    Returns (frames, events): PoseFrames at input_hz and (combo name or
+    None, start, end).
+    """
+    rng = np.random.default_rng(seed)
+    names = sorted(COMBOS)
+    gestures = sorted(GESTURES)
+    slots = []
+    t = 0.5
+    while t + 1.5 < seconds:
+        factor = rng.uniform(*speed)
+        if rng.random() < singles:
+            label = gestures[rng.integers(len(gestures))]
+            slots.append((None, label, factor, t, t + 0.6 / factor))
+        else:
+            name = names[rng.integers(len(names))]
+            slots.append((name, None, factor, t, t + combo_length(name, factor)))
+        t = slots[-1][4] + rng.uniform(*gap)
+
+    frames = []
+    current = 0
+    for i in range(int(seconds * input_hz)):
+        t = i / input_hz
+        while current < len(slots) - 1 and t > slots[current][4]:
+            current += 1
+        kwargs = {}
+        if slots:
+            name, label, factor, start, end = slots[current]
+            if start <= t <= end:
+                if name is not None:
+                    kwargs = combo_kwargs(name, t - start, factor)
+                else:
+                    key, value = GESTURES[label]
+                    kwargs[key] = value * min(1.0, 3.0 * pulse((t - start) * factor, 0.0, 0.6))
+        frames.append(PoseFrame(synthetic_pose(t, noise=noise, rng=rng, **kwargs), t, i))
+    return frames, [(name, start, end) for name, _, _, start, end in slots]
@@ -0,0 +1,300 @@
+import struct
+import numpy as np
+from src.logic.frame import as_pose_frame
+from src.logic.geometry import normalize_pose
+
+"""
+Template gesture recognition: a sliding window of pose features is matched
+against a library of recorded gestures (special moves, combos) with banded
+dynamic time warping. LB_Keogh lower bounds prune most templates before any
+DTW runs, and the DTW that does run is batched over the surviving templates
+and abandons each one as soon as it can no longer beat its threshold or the
+best straight (unwarped) match.
+
+Template library file:
+
+  header | directory (count entries) | features (count x length x dims float16)
+
+Every template is resampled to `length` frames of `dims` features, so the
+feature block is one fixed-shape array, memory-mapped on first use.
+"""
+
+LIBRARY_MAGIC = b'GFTP'
+LIBRARY_VERSION = 1
+
+# magic, version, reserved, reserved, length, dims, count
+LIBRARY_HEADER = struct.Struct('<4sBBHHHI')
+# name, label (utf-8, NUL padded), duration (s), match threshold
+TEMPLATE_ENTRY = struct.Struct('<16s16sff')
+
+# Feature points (x, y relative to the hip centre, in shoulder widths)
+FEATURE_POINTS = np.array([0, 13, 14, 15, 16, 25, 26, 27, 28], dtype=np.intp)
+
+def pose_features(points):
+    """
+    (..., 33, 2+) landmarks -> (..., 2 * len(FEATURE_POINTS)) features.
+    """
+    normalized = normalize_pose(np.asarray(points, dtype=np.float64)[..., :2])
+    features = normalized[..., FEATURE_POINTS, :]
+    return features.reshape(features.shape[:-2] + (-1,))
+
+def resample(times, values, sample_times):
+    """
+    Linear interpolation of values (n, F) at times (n,, ascending) for any
+    shape of sample_times -> sample_times.shape + (F,). Holds the end values
+    outside the range.
+    """
+    idx = np.clip(np.searchsorted(times, sample_times, side='right'), 1, len(times) - 1)
+    t0 = times[idx - 1]
+    span = times[idx] - t0
+    w = np.clip((sample_times - t0) / np.where(span > 0, span, 1.0), 0.0, 1.0).astype(values.dtype)
+    return values[idx - 1] + (values[idx] - values[idx - 1]) * w[..., None]
+
+class TemplateLibrary:
+    """
+    Named gesture templates on disk. Opening one only reads the header and
+    directory; the feature block is memory-mapped (and the LB_Keogh
+    envelopes built) the first time a recognizer needs them.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, version, _, _, self.length, self.dims, count = LIBRARY_HEADER.unpack(f.read(LIBRARY_HEADER.size))
+            if magic != LIBRARY_MAGIC or version != LIBRARY_VERSION:
+                raise ValueError(f"{path} is not a template library (version {LIBRARY_VERSION})")
+            directory = f.read(TEMPLATE_ENTRY.size * count)
+        entries = [TEMPLATE_ENTRY.unpack_from(directory, i * TEMPLATE_ENTRY.size) for i in range(count)]
+        self.names = [name.rstrip(b'\0').decode() for name, _, _, _ in entries]
+        self.labels = [label.rstrip(b'\0').decode() for _, label, _, _ in entries]
+        self.durations = np.array([duration for _, _, duration, _ in entries])
+        self.thresholds = np.array([threshold for _, _, _, threshold in entries])
+        self.offset = LIBRARY_HEADER.size + TEMPLATE_ENTRY.size * count
+        self._features = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def features(self):
+        """
+        (count, length, dims) float16, memory-mapped.
+        """
+        if self._features is None:
+            self._features = np.memmap(self.path, dtype='<f2', mode='r', offset=self.offset,
+                                       shape=(len(self), self.length, self.dims))
+        return self._features
+
+    @staticmethod
+    def save(path, templates, length=24):
+        """
+        Writes templates, each (name, label, points (n, 33, 2+) or PoseFrames,
+        times (n,), threshold), resampled to `length` frames.
+        """
+        header = LIBRARY_HEADER.pack(LIBRARY_MAGIC, LIBRARY_VERSION, 0, 0, length,
+                                     2 * len(FEATURE_POINTS), len(templates))
+        directory = []
+        blocks = []
+        for name, label, points, times, threshold in templates:
+            points = np.stack([as_pose_frame(p).xy if not isinstance(p, np.ndarray) else p for p in points])
+            times = np.asarray(times, dtype=np.float64)
+            duration = times[-1] - times[0]
+            samples = times[0] + duration * np.linspace(0.0, 1.0, length)
+            blocks.append(resample(times, pose_features(points), samples).astype('<f2'))
+            directory.append(TEMPLATE_ENTRY.pack(name.encode()[:16], label.encode()[:16], duration, threshold))
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(b''.join(directory))
+            for block in blocks:
+                f.write(block.tobytes())
+
+def clip_session(path, player_id, start, end):
+    """
+    One player's frames between two receive times of a session log
+    (src/network/recorder.py), as (points (n, 33, 4), capture times) for a
+    template.
+    """
+    from src.network.recorder import FLAG_PRESENT, SessionLog
+    records = [rec for rec in SessionLog(path).records(start)
+               if rec['recv_time'] <= end and rec['player'] == player_id and rec['flags'] & FLAG_PRESENT]
+    return np.stack([rec['landmarks'] for rec in records]), np.array([rec['timestamp'] for rec in records])
+
+class TemplateRecognizer:
+    """
+    Matches one player's recent frames against a TemplateLibrary.
+
+    update() adds a frame (capture time t) and checks, for every template,
+    the last `duration` seconds resampled to the template's length. Banded
+    DTW (Sakoe-Chiba radius `band` frames) of squared feature distances
+    decides; the best template under its threshold wins. A match is only
+    reported once it stops improving (one frame later), then the player is
+    on cooldown.
+    """
+    def __init__(self, library, band=3, history=256, cooldown=0.5):
+        self.library = library
+        self.band = band
+        self.cooldown = cooldown
+        self.history = history
+        self.times = np.full(2 * history, -np.inf)
+        self.values = np.zeros((2 * history, library.dims), dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.cooldown_until = -np.inf
+        self.pending = None  # (distance, template index, time) below threshold, maybe still improving
+        self.stats = dict.fromkeys(('windows', 'checked', 'lb_pruned', 'abandoned', 'completed'), 0)
+        self._prepared = False
+
+    def _prepare(self):
+        """
+        Loads the templates and builds what every match reuses: LB_Keogh
+        envelopes, duration groups and the DTW band.
+        """
+        lib = self.library
+        templates = np.asarray(lib.features, dtype=np.float64)
+        m, r = lib.length, self.band
+        padded = np.pad(templates, ((0, 0), (r, r), (0, 0)), mode='edge')
+        windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * r + 1, axis=1)
+        self.templates = templates
+        # float32 like the history: the bound is only compared against thresholds
+        self.upper = windows.max(axis=-1).astype(np.float32)
+        self.lower = windows.min(axis=-1).astype(np.float32)
+        self.norms = (templates ** 2).sum(axis=-1)
+
+        # Templates of (nearly) the same duration share one resampled query
+        self.durations, self.group = np.unique(np.round(lib.durations, 2), return_inverse=True)
+        self.phase = np.linspace(0.0, 1.0, m)
+
+        # Cells outside the Sakoe-Chiba band
+        rows, cols = np.indices((m, m))
+        self.outside = np.abs(rows - cols) > r
+        self._prepared = True
+
+    def reset(self):
+        self.times[:] = -np.inf
+        self.count = 0
+        self.pending = None
+        self.cooldown_until = -np.inf
+
+    def push(self, landmarks, t):
+        features = pose_features(as_pose_frame(landmarks).xy)
+        slot = self.head
+        self.values[slot] = self.values[slot + self.history] = features
+        self.times[slot] = self.times[slot + self.history] = t
+        self.head = (slot + 1) % self.history
+        self.count = min(self.count + 1, self.history)
+
+    def update(self, landmarks, t):
+        """
+        Adds a frame and returns (label, template name, distance) when a
+        gesture is recognized, else None.
+        """
+        self.push(landmarks, t)
+        return self.match()
+
+    def match(self):
+        if not self._prepared:
+            self._prepare()
+        now = self.times[self.head + self.history - 1]
+        if now < self.cooldown_until or self.count < 2:
+            return None
+        best = self.best_match(now)
+        pending = self.pending
+        if pending is not None and (best is None or best[0] >= pending[0]):
+            # The pending match was the minimum: report it
+            self.pending = None
+            self.cooldown_until = pending[2] + self.cooldown
+            distance, index, _ = pending
+            return self.library.labels[index], self.library.names[index], distance
+        self.pending = None if best is None else (best[0], best[1], now)
+        return None
+
+    def queries(self, now):
+        """
+        (templates, length, dims) windows ending at now, one per template, and
+        which of them the history covers.
+        """
+        times = self.times[self.head:self.head + self.history]
+        values = self.values[self.head:self.head + self.history]
+        first = self.history - self.count
+        times, values = times[first:], values[first:]
+        samples = now - self.durations[:, None] * (1.0 - self.phase)
+        windows = resample(times, values, samples)
+        covered = self.durations <= now - times[0] + 1e-6
+        return windows[self.group], covered[self.group]
+
+    def best_match(self, now):
+        """
+        (distance, template index) of the closest template under its
+        threshold, or None.
+        """
+        queries, covered = self.queries(now)
+        limits = np.where(covered, self.library.thresholds, -np.inf)
+        self.stats['windows'] += 1
+        self.stats['checked'] += len(limits)
+
+        # LB_Keogh: how far each query frame falls outside the template's envelope
+        excess = np.maximum(np.maximum(queries - self.upper, self.lower - queries), 0.0)
+        bound = np.einsum('kmf,kmf->k', excess, excess)
+        order = np.argsort(bound)
+        order = order[bound[order] <= limits[order]]
+        self.stats['lb_pruned'] += len(limits) - len(order)
+        if not len(order):
+            return None
+
+        # The straight diagonal is one warping path, so its cost bounds every
+        # DTW distance from above: anything whose lower bound is past the
+        # smallest of those can't win
+        cost = self.costs(queries[order], order)
+        straight = np.einsum('kii->k', cost)
+        limits = np.minimum(limits[order], straight.min())
+        keep = bound[order] <= limits
+        self.stats['lb_pruned'] += int((~keep).sum())
+        order, cost, limits = order[keep], cost[keep], limits[keep]
+
+        distances = self.dtw(cost, limits)
+        i = np.argmin(distances)
+        if not np.isfinite(distances[i]):
+            return None
+        return float(distances[i]), int(order[i])
+
+    def costs(self, queries, templates):
+        """
+        (K, length, length) squared feature distances between each query
+        frame and each frame of the template at that index.
+        """
+        cost = ((queries ** 2).sum(axis=-1)[:, :, None] + self.norms[templates][:, None, :]
+                - 2.0 * queries @ self.templates[templates].transpose(0, 2, 1))
+        return np.maximum(cost, 0.0)
+
+    def dtw(self, cost, limits):
+        """
+        Banded DTW distances for K cost matrices at once, one row at a time.
+        Within a row, D[j] = min(E[j], c[j] + D[j-1]) with E the steps from
+        the row above; with S the row's running cost sum that is
+        S[j] + min(E[k] - S[k] for k <= j), a cumulative minimum. Every
+        warping path crosses every row, so a pair is abandoned as soon as its
+        whole row is past its limit; inf for every pair that ends above it.
+        """
+        k, m, _ = cost.shape
+        alive = np.arange(k)
+        previous = np.full((k, m + 1), np.inf)  # D of the row above, column -1 first
+        previous[:, 0] = 0.0
+        for i in range(m):
+            row = cost[:, i]
+            steps = row + np.minimum(previous[:, :-1], previous[:, 1:])
+            steps[:, self.outside[i]] = np.inf
+            total = np.cumsum(row, axis=1)
+            current = total + np.minimum.accumulate(steps - total, axis=1)
+            current[:, self.outside[i]] = np.inf
+            keep = current.min(axis=1) <= limits
+            if not keep.all():
+                self.stats['abandoned'] += int((~keep).sum())
+                alive, cost, limits, current = alive[keep], cost[keep], limits[keep], current[keep]
+                if not len(alive):
+                    break
+            previous = np.concatenate([np.full((len(alive), 1), np.inf), current], axis=1)
+        distances = np.full(k, np.inf)
+        if len(alive):
+            final = previous[:, -1]
+            distances[alive] = np.where(final <= limits, final, np.inf)
+        self.stats['completed'] += len(alive)
+        return distances
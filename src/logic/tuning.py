@@ -0,0 +1,293 @@
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.logic.frame import PoseFrame
+from src.logic.rules import ActionDetector
+from src.logic.smoothing import LandmarkSmoother
+
+"""
+Offline tuning of LandmarkSmoother + ActionDetector parameters on labeled
+session logs (src/network/recorder.py).
+
+Labels sit next to a log as <log>.labels.csv with rows
+`player,label,start,end` (capture-time seconds, label e.g. PUNCH_LEFT;
+gestures the detector should stay quiet on can be labeled too). Sessions are
+decoded once into a cache file of fixed-size records; worker processes
+memory-map it, so every configuration replays the same pages instead of
+re-reading the logs.
+
+  python -m src.logic.tuning session.gfsl --search grid
+  python -m src.logic.tuning a.gfsl b.gfsl --search bayes --trials 60 --workers 4
+"""
+
+CACHE_DTYPE = np.dtype([
+    ('time', '<f8'),        # capture time
+    ('landmarks', '<f4', (33, 4)),
+])
+
+DETECTED = ('PUNCH_LEFT', 'PUNCH_RIGHT')
+
+# Search space: name -> (grid values, low, high, log scale)
+SPACE = {
+    'min_cutoff': ((0.005, 0.01, 0.05, 0.2), 0.002, 0.5, True),
+    'beta': ((0.1, 0.5, 2.0), 0.01, 5.0, True),
+    'ELBOW_EXTENSION_THRESHOLD': ((130, 150, 165), 110, 175, False),
+    'PUNCH_VELOCITY_THRESHOLD': ((0.3, 0.5, 1.0), 0.1, 2.0, True),
+}
+
+def read_labels(path):
+    """
+    {player_id: [(label, start, end)]} from a labels CSV.
+    """
+    events = {}
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            events.setdefault(int(row['player']), []).append((row['label'], float(row['start']), float(row['end'])))
+    return events
+
+def write_labels(path, events):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['player', 'label', 'start', 'end'])
+        for player_id, player_events in sorted(events.items()):
+            for label, start, end in player_events:
+                writer.writerow([player_id, label, f"{start:.4f}", f"{end:.4f}"])
+
+def build_cache(sessions, cache_path):
+    """
+    Decodes every player's frames of the given session logs into one
+    CACHE_DTYPE file. Returns streams: [(start row, stop row, events)].
+    """
+    from src.network.recorder import FLAG_PRESENT, SessionLog
+    blocks = []
+    streams = []
+    rows = 0
+    for path in sessions:
+        labels = read_labels(path + '.labels.csv')
+        log = SessionLog(path)
+        records = np.concatenate([log.chunk(i) for i in range(len(log.index))]) if log.index else None
+        for player_id in sorted(labels):
+            if records is None:
+                continue
+            mine = records[(records['player'] == player_id) & (records['flags'] & FLAG_PRESENT != 0)]
+            block = np.zeros(len(mine), dtype=CACHE_DTYPE)
+            block['time'] = np.where(mine['timestamp'] != 0, mine['timestamp'], mine['recv_time'])
+            block['landmarks'] = mine['landmarks']
+            block = block[np.argsort(block['time'], kind='stable')]
+            blocks.append(block)
+            streams.append((rows, rows + len(block), labels[player_id]))
+            rows += len(block)
+    data = np.concatenate(blocks) if blocks else np.zeros(0, dtype=CACHE_DTYPE)
+    np.save(cache_path, data)
+    return streams
+
+_cache = None
+
+def _open_cache(cache_path):
+    global _cache
+    _cache = np.load(cache_path, mmap_mode='r')
+
+def score_detections(detections, events, slack=0.15):
+    """
+    Matches (time, action) detections to (label, start, end) events: a
+    detection counts once for the first unmatched event with its label that
+    it falls in (up to `slack` s late). Returns (true positives, false
+    positives, labeled events, latencies of the true positives).
+    """
+    matched = set()
+    tp = fp = 0
+    latencies = []
+    for t, action in detections:
+        hit = next((i for i, (label, start, end) in enumerate(events)
+                    if label == action and start <= t <= end + slack and i not in matched), None)
+        if hit is None:
+            fp += 1
+        else:
+            matched.add(hit)
+            tp += 1
+            latencies.append(t - events[hit][1])
+    return tp, fp, sum(1 for label, _, _ in events if label in DETECTED), latencies
+
+def evaluate(config, streams, cache_path=None):
+    """
+    Replays every stream through a fresh smoother and detector with config
+    applied. Returns the config's metrics.
+    """
+    if _cache is None:
+        _open_cache(cache_path)
+    start_clock = time.perf_counter()
+    tp = fp = n = 0
+    latencies = []
+    for start, stop, events in streams:
+        smoother = LandmarkSmoother(min_cutoff=config['min_cutoff'], beta=config['beta'])
+        detector = ActionDetector()
+        for name, value in config.items():
+            if hasattr(detector, name):
+                setattr(detector, name, value)
+        detections = []
+        rows = _cache[start:stop]
+        for t, landmarks in zip(rows['time'].tolist(), rows['landmarks']):
+            smoothed = smoother.smooth(PoseFrame(landmarks, t), t)
+            action = detector.detect(smoothed, t)
+            if action != 'IDLE':
+                detections.append((t, action))
+        counts = score_detections(detections, events)
+        tp, fp, n = tp + counts[0], fp + counts[1], n + counts[2]
+        latencies += counts[3]
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / n if n else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        **config,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) * 1000 if latencies else float('nan'),
+        'latency_p95_ms': float(np.percentile(latencies, 95)) * 1000 if latencies else float('nan'),
+        'seconds': time.perf_counter() - start_clock,
+    }
+
+def objective(result, latency_weight):
+    """
+    Higher is better: F1 minus latency_weight per second of median latency.
+    """
+    latency = result['latency_p50_ms'] / 1000
+    return result['f1'] - latency_weight * (latency if np.isfinite(latency) else 1.0)
+
+def grid_configs(space=SPACE):
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name][0] for name in names))]
+
+def _to_unit(config, space=SPACE):
+    unit = []
+    for name, (_, low, high, log) in space.items():
+        value = config[name]
+        unit.append((np.log(value / low) / np.log(high / low)) if log else (value - low) / (high - low))
+    return np.array(unit)
+
+def _from_unit(unit, space=SPACE):
+    config = {}
+    for u, (name, (_, low, high, log)) in zip(unit, space.items()):
+        config[name] = float(low * (high / low) ** u) if log else float(low + (high - low) * u)
+    return config
+
+def random_configs(count, rng, space=SPACE):
+    return [_from_unit(rng.random(len(space)), space) for _ in range(count)]
+
+def propose(observed, scores, count, rng, space=SPACE, candidates=2000, length_scale=0.25, noise=1e-4):
+    """
+    Next `count` configs by expected improvement under a Gaussian process
+    (RBF kernel on the unit cube) fitted to the scores so far. Picks one at
+    a time, pretending each pick scored the GP's prediction (kriging
+    believer), so a batch spreads out instead of piling on one optimum.
+    """
+    x = np.array([_to_unit(config, space) for config in observed])
+    y = np.array(scores, dtype=np.float64)
+    pool = rng.random((candidates, len(space)))
+    picks = []
+    for _ in range(count):
+        mean, std = y.mean(), y.std() or 1.0
+        target = (y - mean) / std
+        kernel = np.exp(-((x[:, None] - x[None]) ** 2).sum(-1) / (2 * length_scale ** 2)) + noise * np.eye(len(x))
+        cross = np.exp(-((pool[:, None] - x[None]) ** 2).sum(-1) / (2 * length_scale ** 2))
+        chol = np.linalg.cholesky(kernel)
+        alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, target))
+        mu = cross @ alpha
+        v = np.linalg.solve(chol, cross.T)
+        sigma = np.sqrt(np.maximum(1.0 - (v ** 2).sum(0), 1e-12))
+        z = (mu - target.max()) / sigma
+        # Expected improvement with the normal pdf/cdf written out (no scipy)
+        cdf = 0.5 * (1.0 + np.vectorize(math.erf)(z / np.sqrt(2.0)))
+        pdf = np.exp(-0.5 * z ** 2) / np.sqrt(2 * np.pi)
+        improvement = (mu - target.max()) * cdf + sigma * pdf
+        best = int(np.argmax(improvement))
+        picks.append(_from_unit(pool[best], space))
+        x = np.vstack([x, pool[best]])
+        y = np.append(y, mu[best] * std + mean)
+        pool = np.delete(pool, best, axis=0)
+    return picks
+
+def run_sweep(configs, streams, cache_path, workers=None):
+    """
+    Evaluates configs on a process pool (or in this process with workers=0),
+    every worker memory-mapping the same cache. Results in config order.
+    """
+    if workers == 0:
+        _open_cache(cache_path)
+        return [evaluate(config, streams) for config in configs]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=mp.get_context('spawn'),
+                             initializer=_open_cache, initargs=(cache_path,)) as pool:
+        return list(pool.map(evaluate, configs, itertools.repeat(streams), chunksize=1))
+
+def search(sessions, method='grid', trials=40, workers=None, latency_weight=0.5, seed=0, cache_path=None):
+    """
+    Runs a grid, random or Bayesian ('bayes') search. Returns results sorted
+    best first, each with its 'score'.
+    """
+    cache_path = cache_path or os.path.splitext(sessions[0])[0] + '.tuning.npy'
+    streams = build_cache(sessions, cache_path)
+    rng = np.random.default_rng(seed)
+    if method == 'grid':
+        results = run_sweep(grid_configs(), streams, cache_path, workers)
+    elif method == 'random':
+        results = run_sweep(random_configs(trials, rng), streams, cache_path, workers)
+    elif method == 'bayes':
+        batch = max(1, workers or os.cpu_count())
+        initial = min(trials, max(8, batch))
+        results = run_sweep(random_configs(initial, rng), streams, cache_path, workers)
+        while len(results) < trials:
+            scores = [objective(r, latency_weight) for r in results]
+            configs = [{name: r[name] for name in SPACE} for r in results]
+            results += run_sweep(propose(configs, scores, min(batch, trials - len(results)), rng),
+                                 streams, cache_path, workers)
+    else:
+        raise ValueError(f"unknown search method {method!r}")
+    for result in results:
+        result['score'] = objective(result, latency_weight)
+    return sorted(results, key=lambda r: r['score'], reverse=True)
+
+def print_results(results, top=10):
+    names = list(SPACE)
+    print(f"{'min_cutoff':>11}{'beta':>7}{'elbow':>7}{'velocity':>9}{'precision':>11}{'recall':>8}"
+          f"{'f1':>6}{'p50 ms':>8}{'p95 ms':>8}{'score':>7}")
+    for r in results[:top]:
+        print(f"{r[names[0]]:>11.4f}{r[names[1]]:>7.2f}{r[names[2]]:>7.0f}{r[names[3]]:>9.2f}"
+              f"{r['precision']:>11.2f}{r['recall']:>8.2f}{r['f1']:>6.2f}{r['latency_p50_ms']:>8.0f}"
+              f"{r['latency_p95_ms']:>8.0f}{r['score']:>7.3f}")
+
+def write_results(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune smoothing and detection parameters on labeled sessions")
+    parser.add_argument('sessions', nargs='+', help="session logs, each with a <log>.labels.csv")
+    parser.add_argument('--search', choices=['grid', 'random', 'bayes'], default='grid')
+    parser.add_argument('--trials', type=int, default=40, help="configs for random/bayes")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: CPU count, 0: no pool)")
+    parser.add_argument('--latency-weight', type=float, default=0.5, help="F1 lost per second of median latency")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write every result to this CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = search(args.sessions, args.search, args.trials, args.workers, args.latency_weight, args.seed)
+    print(f"{len(results)} configs in {time.perf_counter() - start:.1f}s")
+    print_results(results)
+    if args.out:
+        write_results(args.out, results)
+    best = results[0]
+    print("best: LandmarkSmoother(min_cutoff={min_cutoff:.4g}, beta={beta:.4g}), "
+          "ELBOW_EXTENSION_THRESHOLD={ELBOW_EXTENSION_THRESHOLD:.4g}, "
+          "PUNCH_VELOCITY_THRESHOLD={PUNCH_VELOCITY_THRESHOLD:.4g}".format(**best))
+
+if __name__ == "__main__":
+    main()
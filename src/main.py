@@ -15,7 +15,39 @@ sys.path.append(project_root)
 from src.game.engine import GameEngine
 
 def main():
-    game = GameEngine()
+    server_mode = "threaded"
+    if "--async-server" in sys.argv:
+        server_mode = "async"
+    elif "--local-cameras" in sys.argv:
+        server_mode = "local"
+    landmark_source = None
+    if "--replay" in sys.argv:
+        # Play a recording (.npz, see src/game/sources.py) or a session log
+        # (see src/network/recorder.py) instead of serving clients
+        path = sys.argv[sys.argv.index("--replay") + 1]
+        if path.endswith(".npz"):
+            from src.game.sources import RecordedLandmarkSource
+            landmark_source = RecordedLandmarkSource(path, repeat=4)
+        else:
+            from src.network.recorder import SessionReplaySource
+            speed = float(sys.argv[sys.argv.index("--speed") + 1]) if "--speed" in sys.argv else 1.0
+            landmark_source = SessionReplaySource(path, speed=speed)
+    recorder = None
+    if "--record" in sys.argv:
+        # Log every frame the clients send to a session file
+        from src.network.recorder import SessionRecorder
+        recorder = SessionRecorder(sys.argv[sys.argv.index("--record") + 1])
+    # Per-stage latency summary (.csv or .json) written every few seconds; F3 shows it in game
+    latency_dump = sys.argv[sys.argv.index("--latency-dump") + 1] if "--latency-dump" in sys.argv else None
+    # UDP port for clients streaming with --udp (threaded server only); without it they fall back to TCP
+    udp_port = int(sys.argv[sys.argv.index("--udp-port") + 1]) if "--udp-port" in sys.argv else None
+    # --jitter-buffer: play every frame out evenly through a per-player buffer (adds up to 200 ms of delay)
+    # --gestures: batched detector with kicks, blocks and dodges (src/logic/gestures.py)
+    # --hitboxes: strikes must touch the opponent's body to do damage (src/logic/physics.py)
+    game = GameEngine(server_mode=server_mode, dirty_rects="--dirty-rects" in sys.argv,
+                      landmark_source=landmark_source, recorder=recorder, latency_dump=latency_dump,
+                      gestures="--gestures" in sys.argv, hitboxes="--hitboxes" in sys.argv,
+                      udp_port=udp_port, jitter_buffer="--jitter-buffer" in sys.argv)
     game.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+import asyncio
+import socket
+import struct
+import threading
+import time
+from src.network.utils import deserialize_landmarks, parse_hello, make_ack, parse_ping, make_pong, parse_sync
+from src.network.clock import ClockOffset
+
+class Room:
+    """
+    One match: a fixed number of player slots and their latest landmarks.
+    """
+    def __init__(self, room_id, size):
+        self.room_id = room_id
+        self.writers = [None] * size
+        self.latest = [None] * size
+
+    def free_slot(self):
+        for slot, writer in enumerate(self.writers):
+            if writer is None:
+                return slot
+        return None
+
+    def is_empty(self):
+        return all(writer is None for writer in self.writers)
+
+class AsyncMultiPlayerServer:
+    """
+    Host Server multiplexing many clients on one asyncio event loop.
+    Clients are packed into rooms of `players_per_room` in connection order:
+    - Room 0: connections 1..N (Player 1..N)
+    - Room 1: the next N, and so on
+    Speaks the same length-prefixed protocol as MultiPlayerServer.
+    With a latency tracker (LatencyTracker), room 0's frames are reported
+    to it and its clients' clock syncs land in the tracker's clock_offset,
+    keyed by player id like MultiPlayerServer; other rooms keep their own
+    ClockOffset in room_clocks.
+    """
+    def __init__(self, host='0.0.0.0', port=5000, players_per_room=2, max_rooms=64, on_frame=None,
+                 latency=None):
+        self.host = host
+        self.port = port
+        self.players_per_room = players_per_room
+        self.max_rooms = max_rooms
+        # Optional callback(room_id, player_id, landmarks, recv_time), runs on the loop thread
+        self.on_frame = on_frame
+        self.latency = latency
+        # Clock sync estimates per player id: room 0 in clock_offset, the rest in room_clocks
+        self.clock_offset = latency.clock_offset if latency is not None else ClockOffset()
+        self.room_clocks = {}
+        self.running = False
+
+        self.rooms = {}
+        self.lock = threading.Lock()
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None  # exception from binding the socket, re-raised by start()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        if not self.ready.wait(timeout=5.0):
+            self.running = False
+            raise RuntimeError(f"Async server on {self.host}:{self.port} did not start")
+        if self.error is not None:
+            self.running = False
+            raise self.error
+        print(f"Async Server Host: Listening on {self.host}:{self.port}")
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port, reuse_address=True)
+            )
+        except Exception as e:
+            self.error = e
+            self.loop.close()
+            return
+        finally:
+            self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    async def _shutdown(self):
+        self.server.close()
+        with self.lock:
+            writers = [w for room in self.rooms.values() for w in room.writers if w is not None]
+        for writer in writers:
+            writer.close()
+        self.loop.stop()
+
+    def _assign(self, writer):
+        """
+        Puts a new connection in the first room with a free slot.
+        Returns (room_id, slot) or None if every room is full.
+        """
+        with self.lock:
+            for room_id in sorted(self.rooms):
+                room = self.rooms[room_id]
+                slot = room.free_slot()
+                if slot is not None:
+                    room.writers[slot] = writer
+                    return room_id, slot
+
+            for room_id in range(self.max_rooms):
+                if room_id not in self.rooms:
+                    room = Room(room_id, self.players_per_room)
+                    room.writers[0] = writer
+                    self.rooms[room_id] = room
+                    return room_id, 0
+        return None
+
+    def _release(self, room_id, slot):
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                return
+            room.writers[slot] = None
+            room.latest[slot] = None
+            if room.is_empty():
+                del self.rooms[room_id]
+
+    def _clock(self, room_id):
+        if room_id == 0:
+            return self.clock_offset
+        if room_id not in self.room_clocks:
+            self.room_clocks[room_id] = ClockOffset()
+        return self.room_clocks[room_id]
+
+    async def _handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        assigned = self._assign(writer)
+        if assigned is None:
+            print(f"-> All rooms full. Rejecting {addr}.")
+            writer.close()
+            return
+        room_id, slot = assigned
+        player_id = slot + 1
+        print(f"Incoming connection from {addr} -> Room {room_id}, PLAYER {player_id}")
+
+        first_message = True
+        try:
+            while self.running:
+                # 1. Read Length (4 bytes), 2. Read Data
+                raw_msglen = await reader.readexactly(4)
+                msglen = struct.unpack('>I', raw_msglen)[0]
+                data = await reader.readexactly(msglen)
+
+                if first_message:
+                    first_message = False
+                    encoding = parse_hello(data)
+                    if encoding is not None:
+                        ack = make_ack(encoding)
+                        writer.write(struct.pack('>I', len(ack)) + ack)
+                        await writer.drain()
+                        continue
+
+                recv_time = time.time()
+                t0 = parse_ping(data)
+                if t0 is not None:
+                    pong = make_pong(t0, recv_time, time.time())
+                    writer.write(struct.pack('>I', len(pong)) + pong)
+                    await writer.drain()
+                    continue
+                exchange = parse_sync(data)
+                if exchange is not None:
+                    self._clock(room_id).add_exchange(player_id, *exchange)
+                    continue
+
+                # 3. Process
+                decode_start = time.perf_counter()
+                landmarks = deserialize_landmarks(data)
+                decode_time = time.perf_counter() - decode_start
+                with self.lock:
+                    self.rooms[room_id].latest[slot] = landmarks
+                if self.latency is not None and room_id == 0 and landmarks is not None:
+                    self.latency.frame_received(player_id, landmarks, recv_time, decode_time)
+                if self.on_frame is not None and landmarks is not None:
+                    self.on_frame(room_id, player_id, landmarks, recv_time)
+
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print(f"Room {room_id} Player {player_id} disconnected: {e}")
+        finally:
+            self._clock(room_id).reset(player_id)
+            self._release(room_id, slot)
+            writer.close()
+
+    def get_landmarks(self, room_id=0):
+        """
+        Snapshot of the latest landmarks for every slot in the room.
+        Returns a tuple of length players_per_room (None for empty slots).
+        """
+        with self.lock:
+            room = self.rooms.get(room_id)
+            if room is None:
+                return (None,) * self.players_per_room
+            return tuple(room.latest)
+
+    def room_ids(self):
+        with self.lock:
+            return sorted(self.rooms)
+
+    def stop(self):
+        self.running = False
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop)
+        if self.thread:
+            self.thread.join(timeout=2.0)
@@ -1,41 +1,193 @@
+import queue
 import socket
 import struct
+import threading
 import time
-from src.network.utils import serialize_landmarks
+from src.network.utils import (
+    serialize_landmarks, encode_landmarks, make_hello, parse_ack, parse_udp_ack, send_msg, recv_msg,
+    make_ping, parse_pong, make_sync, WIRE_JSON, WIRE_BINARY, ENCODING_INT16, TRANSPORT_TCP, TRANSPORT_UDP,
+    UDP_PREFIX
+)
+from src.network.clock import ClockOffset
 
 class GameClient:
-    def __init__(self, host_ip, port=5000):
+    def __init__(self, host_ip, port=5000, wire_format=WIRE_BINARY, quantize=False, player_id=0,
+                 transport=TRANSPORT_TCP, sync_interval=30.0):
         self.host_ip = host_ip
         self.port = port
         self.socket = None
         self.connected = False
 
+        # UDP: frames go out as datagrams, the TCP socket stays open as control channel
+        self.transport = transport
+        self.udp_socket = None
+        self.udp_addr = None
+        self.udp_token = None
+
+        # Requested format; downgraded to JSON if the host doesn't answer the handshake
+        self.wire_format = wire_format
+        self.quantize = quantize
+        self.player_id = player_id
+        self.seq = 0
+
+        # Clock sync with the host (binary hosts only), repeated every sync_interval seconds
+        # on a background thread. After the handshake only the reader thread reads the
+        # TCP socket (pongs land in `pongs`) and sends share send_lock, so a slow or lost
+        # pong can't leave a half-read message in the stream or hold up frames.
+        self.clock = ClockOffset()
+        self.sync_interval = sync_interval
+        self.last_sync = None
+        self.pongs = queue.Queue()
+        self.send_lock = threading.Lock()
+        self.closing = threading.Event()
+        self.threads = []
+
     def connect(self):
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.host_ip, self.port))
             self.connected = True
             print(f"Connected to Host at {self.host_ip}:{self.port}")
+            if self.wire_format == WIRE_BINARY:
+                self._negotiate()
+            if self.wire_format == WIRE_BINARY:
+                for target in (self._read_loop, self._sync_loop):
+                    thread = threading.Thread(target=target, daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+                self.sync_clock()
             return True
         except Exception as e:
             print(f"Could not connect to Host: {e}")
             return False
 
-    def send_landmarks(self, landmarks):
+    def _negotiate(self, timeout=1.0):
+        """
+        Offers the binary format. Old hosts never answer, so fall back to JSON.
+        Hosts without UDP answer with a plain ack, so fall back to TCP.
+        """
+        send_msg(self.socket, make_hello(self.quantize, self.transport))
+        self.socket.settimeout(timeout)
+        try:
+            reply = recv_msg(self.socket)
+        except socket.timeout:
+            reply = None
+        finally:
+            self.socket.settimeout(None)
+
+        encoding = parse_ack(reply)
+        udp_ack = parse_udp_ack(reply)
+        if udp_ack is not None:
+            encoding, udp_port, self.udp_token = udp_ack
+            self.udp_addr = (self.host_ip, udp_port)
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        elif self.transport == TRANSPORT_UDP:
+            print("Host does not accept UDP frames, using TCP.")
+            self.transport = TRANSPORT_TCP
+
+        if encoding is None:
+            print("Host does not support binary frames, using JSON.")
+            self.wire_format = WIRE_JSON
+        else:
+            self.quantize = encoding == ENCODING_INT16
+
+    def _read_loop(self):
+        """
+        Reads every host message after the handshake; pongs go to self.pongs.
+        """
+        while not self.closing.is_set():
+            try:
+                data = recv_msg(self.socket)
+            except OSError:
+                data = None
+            if data is None:
+                if not self.closing.is_set():
+                    print("Server disconnected.")
+                self.connected = False
+                self.pongs.put(None)
+                return
+            pong = parse_pong(data)
+            if pong is not None:
+                self.pongs.put((pong, time.time()))
+
+    def _sync_loop(self):
+        while not self.closing.wait(self.sync_interval):
+            if not self.connected:
+                return
+            if self.clock.synced(0):
+                self.sync_clock(rounds=2)
+
+    def _send(self, data):
+        with self.send_lock:
+            send_msg(self.socket, data)
+
+    def sync_clock(self, rounds=8, timeout=0.5):
+        """
+        NTP-style ping/pong exchanges with the host. Each finished exchange is
+        reported back so the host can map this client's capture timestamps
+        onto its clock. A round whose pong doesn't come back within timeout
+        is skipped (a late pong is recognized by its echo and dropped).
+        Returns (offset, rtt) of the best exchange, or None if the host
+        doesn't answer pings.
+        """
+        try:
+            for _ in range(rounds):
+                t0 = time.time()
+                self._send(make_ping(t0))
+                deadline = time.time() + timeout
+                while True:
+                    try:
+                        item = self.pongs.get(timeout=max(0.0, deadline - time.time()))
+                    except queue.Empty:
+                        item = None
+                        break
+                    if item is None or item[0][0] == t0:
+                        break  # disconnected, or our pong (older ones are stale)
+                if item is None:
+                    if not self.connected:
+                        break
+                    continue
+                (_, t1, t2), t3 = item
+                self.clock.add_exchange(0, t0, t1, t2, t3)
+                self._send(make_sync(t0, t1, t2, t3))
+        except OSError as e:
+            print(f"Clock sync failed: {e}")
+        self.last_sync = time.time()
+        if not self.clock.synced(0):
+            return None
+        return self.clock.offset(0), self.clock.rtt(0)
+
+    def send_landmarks(self, landmarks, timestamp=None):
+        """
+        Sends one pose. timestamp is its capture time (time.time() clock);
+        pass the camera frame's, the send time is only a fallback.
+        """
         if not self.connected:
             return
 
         try:
             # 1. Serialize
-            data = serialize_landmarks(landmarks)
-            
+            if self.wire_format == WIRE_BINARY:
+                if timestamp is None:
+                    timestamp = time.time()
+                data = encode_landmarks(landmarks, self.player_id, self.seq, timestamp, self.quantize)
+                self.seq += 1
+            else:
+                data = serialize_landmarks(landmarks)
+
+            # UDP: one datagram per frame, the host keeps only the newest
+            if self.udp_socket is not None:
+                self.udp_socket.sendto(UDP_PREFIX.pack(self.udp_token) + data, self.udp_addr)
+                return
+
             # 2. Prefix with length (4 bytes big-endian)
             # This ensures we define packet boundaries clearly
             msg = struct.pack('>I', len(data)) + data
-            
+
             # 3. Send
-            self.socket.sendall(msg)
-            
+            with self.send_lock:
+                self.socket.sendall(msg)
+
         except BrokenPipeError:
             print("Server disconnected.")
             self.connected = False
@@ -44,5 +196,13 @@ class GameClient:
             self.connected = False
 
     def close(self):
+        self.closing.set()
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.udp_socket:
+            self.udp_socket.close()
         if self.socket:
             self.socket.close()
@@ -0,0 +1,55 @@
+from collections import deque
+
+"""
+Client/host clock offset estimation (see the PING/PONG/SYNC messages in
+src/network/utils.py).
+"""
+
+class ClockOffset:
+    """
+    Estimates host_clock - client_clock per player.
+
+    add_exchange() takes NTP-style exchanges (t0 client send, t1 host
+    receive, t2 host reply, t3 client receive); the one with the smallest
+    round trip in the window gives the offset. Without exchanges, frames
+    only bound it: recv - capture >= offset + one-way delay, so add_frame()
+    keeps that minimum for display and offset() assumes shared clocks (0).
+    """
+    def __init__(self, window=64):
+        self.exchanges = {}  # player_id -> deque of (rtt, offset)
+        self.min_delay = {}  # player_id -> smallest recv - capture seen
+        self.window = window
+
+    def add_exchange(self, player_id, t0, t1, t2, t3):
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.exchanges.setdefault(player_id, deque(maxlen=self.window)).append((rtt, offset))
+        return rtt, offset
+
+    def add_frame(self, player_id, capture_time, recv_time):
+        delay = recv_time - capture_time
+        if delay < self.min_delay.get(player_id, float('inf')):
+            self.min_delay[player_id] = delay
+
+    def reset(self, player_id):
+        """
+        Forgets a player's samples (a new client brings a new clock).
+        """
+        self.exchanges.pop(player_id, None)
+        self.min_delay.pop(player_id, None)
+
+    def synced(self, player_id):
+        return bool(self.exchanges.get(player_id))
+
+    def offset(self, player_id):
+        samples = self.exchanges.get(player_id)
+        if not samples:
+            return 0.0
+        return min(samples)[1]
+
+    def rtt(self, player_id):
+        samples = self.exchanges.get(player_id)
+        return min(samples)[0] if samples else None
+
+    def to_host(self, player_id, client_time):
+        return client_time + self.offset(player_id)
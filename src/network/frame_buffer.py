@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+from collections import deque
+from src.logic.frame import lerp_pose
+
+"""
+Per-player jitter buffer: every frame a client sends, ordered by capture
+time, released to the game after an adaptive playout delay so bursts come
+out evenly spaced instead of overwriting each other.
+"""
+
+class FrameBuffer:
+    """
+    Bounded buffer of one player's frames, sorted by capture time.
+
+    Transit time (recv - capture, clock offset included) is tracked over the
+    last `window` frames: its minimum is the fixed part, and the playout
+    delay follows the `quantile` of what's left, jumping up at once and
+    decaying slowly, within [min_delay, max_delay]. A frame is released once
+    the host clock passes capture + min transit + delay.
+
+    Released frames stay (up to `capacity` frames in total) for sample().
+    When full, the oldest frame is dropped; unreleased ones count as
+    `overflowed`. Frames older than the last one released count as `late`.
+
+    The window is re-sorted every `adapt_every` frames, or at once when a
+    frame's transit falls outside the current base + delay.
+    """
+    def __init__(self, capacity=64, min_delay=0.0, max_delay=0.2, quantile=95, window=120,
+                 decay=0.02, adapt_every=8, clock=time.time):
+        self.capacity = capacity
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.quantile = quantile
+        self.decay = decay
+        self.adapt_every = adapt_every
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        self.times = []    # capture times, ascending
+        self.frames = []
+        self.released = 0  # frames[:released] went out through pop_ready()
+        self.transits = deque(maxlen=window)
+        self.base = 0.0    # smallest transit in the window
+        self.delay = min_delay
+        self.unadapted = 0  # frames pushed since the last _adapt()
+        self.overflowed = 0
+        self.late = 0
+        self.duplicates = 0
+
+    def reset(self):
+        with self.lock:
+            self.times = []
+            self.frames = []
+            self.released = 0
+            self.transits.clear()
+            self.base = 0.0
+            self.delay = self.min_delay
+            self.unadapted = 0
+
+    @staticmethod
+    def capture_time(frame, recv_time):
+        return frame.timestamp or recv_time
+
+    def push(self, frame, recv_time=None):
+        """
+        Adds a frame that arrived at recv_time (host clock). Returns False
+        if it was dropped as late or duplicate.
+        """
+        if recv_time is None:
+            recv_time = self.clock()
+        t = self.capture_time(frame, recv_time)
+        with self.lock:
+            transit = recv_time - t
+            self.transits.append(transit)
+            self.unadapted += 1
+            if (self.unadapted >= self.adapt_every or len(self.transits) == 1
+                    or not self.base <= transit <= self.base + self.delay):
+                self._adapt()
+
+            i = bisect.bisect_right(self.times, t)
+            if i and self.times[i - 1] == t:
+                self.duplicates += 1
+                return False
+            if i < self.released:
+                self.late += 1
+                return False
+            self.times.insert(i, t)
+            self.frames.insert(i, frame)
+
+            if len(self.frames) > self.capacity:
+                if self.released == 0:
+                    self.overflowed += 1
+                else:
+                    self.released -= 1
+                del self.times[0]
+                del self.frames[0]
+            return True
+
+    def _adapt(self):
+        transits = sorted(self.transits)
+        self.base = transits[0]
+        jitter = transits[min(len(transits) - 1, len(transits) * self.quantile // 100)] - self.base
+        target = min(self.max_delay, max(self.min_delay, jitter))
+        if target > self.delay:
+            self.delay = target
+        else:
+            # The same decay as adapting on every one of the frames since the last call
+            self.delay += (target - self.delay) * (1.0 - (1.0 - self.decay) ** self.unadapted)
+        self.unadapted = 0
+
+    def playout_time(self, now=None):
+        """
+        Capture time being played out at host time now.
+        """
+        if now is None:
+            now = self.clock()
+        return now - self.base - self.delay
+
+    def pop_ready(self, now=None):
+        """
+        Every frame whose playout time has come since the last call, oldest
+        first (all of a burst, not just the newest).
+        """
+        with self.lock:
+            cutoff = self.playout_time(now)
+            end = bisect.bisect_right(self.times, cutoff, lo=self.released)
+            ready = self.frames[self.released:end]
+            self.released = end
+            return ready
+
+    def sample(self, t):
+        """
+        Pose at capture time t, interpolated between the frames around it.
+        Before the first frame or after the last it holds the nearest one.
+        """
+        with self.lock:
+            if not self.frames:
+                return None
+            i = bisect.bisect_right(self.times, t)
+            if i == 0:
+                return self.frames[0]
+            if i == len(self.frames):
+                return self.frames[-1]
+            t0, t1 = self.times[i - 1], self.times[i]
+            return lerp_pose(self.frames[i - 1], self.frames[i], (t - t0) / (t1 - t0))
+
+    def sample_at(self, now=None):
+        """
+        Interpolated pose being played out at host time now.
+        """
+        return self.sample(self.playout_time(now))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'buffered': len(self.frames) - self.released,
+                'delay_ms': self.delay * 1000,
+                'overflowed': self.overflowed,
+                'late': self.late,
+                'duplicates': self.duplicates,
+            }
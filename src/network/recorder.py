@@ -0,0 +1,275 @@
+import bisect
+import mmap
+import queue
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+from src.logic.frame import NUM_LANDMARKS, PoseFrame
+
+"""
+Session log: append-only binary file of the landmark frames players sent.
+
+  file header | chunk | chunk | ... | index | footer
+
+Each chunk is a CHUNK header followed by `payload_len` bytes holding
+`count` fixed-size records (RECORD_DTYPE), zlib-compressed if the codec
+says so. Chunks are self-delimiting, so a log cut short by a crash is
+still readable up to its last complete chunk; the index (chunk offsets
+and time ranges) and footer are only written by close() and are rebuilt
+by scanning when missing.
+"""
+
+LOG_MAGIC = b'GFSL'
+LOG_VERSION = 1
+CHUNK_MAGIC = b'GFCK'
+INDEX_MAGIC = b'GFIX'
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+# magic, version, reserved, reserved, created (wall clock)
+LOG_HEADER = struct.Struct('<4sBBHd')
+# magic, codec, reserved, reserved, count, payload_len, first recv_time, last recv_time
+CHUNK = struct.Struct('<4sBBHIIdd')
+# offset, count, first recv_time, last recv_time
+INDEX_ENTRY = struct.Struct('<QIdd')
+# magic, number of chunks, index offset
+FOOTER = struct.Struct('<4sIQ')
+
+FLAG_PRESENT = 1  # record carries a pose; without it the player left
+
+RECORD_DTYPE = np.dtype([
+    ('recv_time', '<f8'),   # server clock when the frame arrived
+    ('timestamp', '<f8'),   # capture timestamp sent by the client
+    ('player', 'u1'),
+    ('flags', 'u1'),
+    ('reserved', '<u2'),
+    ('seq', '<u4'),
+    ('landmarks', '<f4', (NUM_LANDMARKS, 4)),
+])
+
+class SessionRecorder:
+    """
+    Buffered session log writer. record() only enqueues (never blocks the
+    receive thread; frames are dropped and counted if the writer falls
+    `max_pending` behind); a writer thread packs records into chunks of
+    `chunk_records`, flushing at least every `flush_interval` seconds.
+    """
+    def __init__(self, path, compress=True, chunk_records=256, flush_interval=1.0, max_pending=10000):
+        self.path = path
+        self.codec = CODEC_ZLIB if compress else CODEC_RAW
+        self.chunk_records = chunk_records
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(max_pending)
+        self.index = []
+        self.recorded = 0
+        self.dropped = 0
+        self.bytes_written = 0
+        self.thread = None
+        self.file = None
+
+    def start(self):
+        self.file = open(self.path, 'wb')
+        self.file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, 0, 0, time.time()))
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def record(self, player_id, landmarks, recv_time=None):
+        """
+        Queues one frame (PoseFrame, or None when the player left).
+        """
+        if recv_time is None:
+            recv_time = time.time()
+        try:
+            self.pending.put_nowait((player_id, landmarks, recv_time))
+        except queue.Full:
+            self.dropped += 1
+
+    def _writer_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.pending.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                batch.append(item)
+            if len(batch) >= self.chunk_records or (batch and time.monotonic() >= deadline):
+                self._write_chunk(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+        if batch:
+            self._write_chunk(batch)
+
+    def _write_chunk(self, batch):
+        records = np.zeros(len(batch), dtype=RECORD_DTYPE)
+        for i, (player_id, landmarks, recv_time) in enumerate(batch):
+            rec = records[i]
+            rec['recv_time'] = recv_time
+            rec['player'] = player_id
+            if landmarks is not None:
+                rec['timestamp'] = landmarks.timestamp
+                rec['seq'] = landmarks.seq
+                rec['flags'] = FLAG_PRESENT
+                rec['landmarks'] = landmarks.data
+        payload = records.tobytes()
+        if self.codec == CODEC_ZLIB:
+            payload = zlib.compress(payload, 6)
+
+        offset = self.file.tell()
+        first, last = float(records['recv_time'][0]), float(records['recv_time'][-1])
+        self.file.write(CHUNK.pack(CHUNK_MAGIC, self.codec, 0, 0, len(records), len(payload), first, last))
+        self.file.write(payload)
+        self.file.flush()
+        self.index.append((offset, len(records), first, last))
+        self.recorded += len(records)
+        self.bytes_written = self.file.tell()
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.pending.put(None)
+        self.thread.join()
+        self.thread = None
+
+        index_offset = self.file.tell()
+        for entry in self.index:
+            self.file.write(INDEX_ENTRY.pack(*entry))
+        self.file.write(FOOTER.pack(INDEX_MAGIC, len(self.index), index_offset))
+        self.bytes_written = self.file.tell()
+        self.file.close()
+        print(f"Session log {self.path}: {self.recorded} frames in {len(self.index)} chunks, "
+              f"{self.bytes_written} bytes ({self.dropped} dropped)")
+
+class SessionLog:
+    """
+    Random-access reader: chunk index (from the footer, or rebuilt by
+    scanning), per-chunk decoding to RECORD_DTYPE arrays and time seeks.
+    The file is memory-mapped, so only the chunks that are decoded get read.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.seek(0, 2) < LOG_HEADER.size:
+                raise ValueError(f"{path} is not a session log (version {LOG_VERSION})")
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _, self.created = LOG_HEADER.unpack_from(self.data)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a session log (version {LOG_VERSION})")
+        self.index = self._read_index() or self._scan()
+        self.first_times = [entry[2] for entry in self.index]
+
+    def _read_index(self):
+        if len(self.data) < LOG_HEADER.size + FOOTER.size:
+            return None
+        magic, count, offset = FOOTER.unpack_from(self.data, len(self.data) - FOOTER.size)
+        if magic != INDEX_MAGIC:
+            return None
+        return [INDEX_ENTRY.unpack_from(self.data, offset + i * INDEX_ENTRY.size) for i in range(count)]
+
+    def _scan(self):
+        index = []
+        offset = LOG_HEADER.size
+        while offset + CHUNK.size <= len(self.data):
+            magic, _, _, _, count, payload_len, first, last = CHUNK.unpack_from(self.data, offset)
+            if magic != CHUNK_MAGIC or offset + CHUNK.size + payload_len > len(self.data):
+                break  # index block, or a chunk cut short
+            index.append((offset, count, first, last))
+            offset += CHUNK.size + payload_len
+        return index
+
+    def close(self):
+        self.data.close()
+
+    def __len__(self):
+        return sum(entry[1] for entry in self.index)
+
+    @property
+    def start_time(self):
+        return self.index[0][2] if self.index else 0.0
+
+    @property
+    def end_time(self):
+        return self.index[-1][3] if self.index else 0.0
+
+    def chunk(self, i):
+        offset = self.index[i][0]
+        _, codec, _, _, count, payload_len, _, _ = CHUNK.unpack_from(self.data, offset)
+        payload = self.data[offset + CHUNK.size:offset + CHUNK.size + payload_len]
+        if codec == CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        return np.frombuffer(payload, dtype=RECORD_DTYPE, count=count)
+
+    def seek(self, recv_time):
+        """
+        Index of the first chunk that may hold records at or after recv_time.
+        """
+        return max(0, bisect.bisect_right(self.first_times, recv_time) - 1)
+
+    def records(self, start_time=None):
+        """
+        Yields RECORD_DTYPE records in arrival order, from start_time on.
+        """
+        first = 0 if start_time is None else self.seek(start_time)
+        for i in range(first, len(self.index)):
+            for rec in self.chunk(i):
+                if start_time is None or rec['recv_time'] >= start_time:
+                    yield rec
+
+class SessionReplaySource:
+    """
+    Feeds a session log to GameEngine in place of the server.
+
+    With tick_dt set, session time advances tick_dt * speed per
+    get_landmarks() call (one per simulation tick): replays are then
+    deterministic and run as fast as the engine ticks (run_headless).
+    Without it, session time follows `clock`: speed 1.0 is real time,
+    2.0 double speed and so on.
+    """
+    def __init__(self, path, speed=1.0, tick_dt=None, start_offset=0.0, clock=time.perf_counter):
+        self.log = SessionLog(path)
+        self.speed = speed
+        self.tick_dt = tick_dt
+        self.clock = clock
+        self.start_time = self.log.start_time + start_offset
+        self.records = self.log.records(self.start_time)
+        self.next_record = next(self.records, None)
+        self.current = {1: None, 2: None}
+        self.ticks = 0
+        self.clock_start = None
+        self.finished = self.next_record is None
+
+    def start(self):
+        self.clock_start = self.clock()
+
+    def stop(self):
+        pass
+
+    def session_time(self):
+        if self.tick_dt is not None:
+            return self.start_time + self.ticks * self.tick_dt * self.speed
+        if self.clock_start is None:
+            self.clock_start = self.clock()
+        return self.start_time + (self.clock() - self.clock_start) * self.speed
+
+    def get_landmarks(self):
+        self.ticks += 1
+        now = self.session_time()
+        while self.next_record is not None and self.next_record['recv_time'] <= now:
+            rec = self.next_record
+            player_id = int(rec['player'])
+            if rec['flags'] & FLAG_PRESENT:
+                self.current[player_id] = PoseFrame(rec['landmarks'], float(rec['timestamp']), int(rec['seq']))
+            else:
+                self.current[player_id] = None
+            self.next_record = next(self.records, None)
+        self.finished = self.next_record is None
+        return self.current[1], self.current[2]
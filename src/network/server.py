@@ -1,7 +1,14 @@
 import socket
 import threading
 import struct
-from src.network.utils import deserialize_landmarks, recvall
+import secrets
+import time
+from src.network.utils import (
+    deserialize_landmarks, recvall, parse_hello, make_ack, send_msg,
+    wants_udp, make_udp_ack, seq_newer, UDP_PREFIX, parse_ping, make_pong, parse_sync
+)
+from src.network.clock import ClockOffset
+from src.network.frame_buffer import FrameBuffer
 
 class MultiPlayerServer:
     """
@@ -9,11 +16,31 @@ class MultiPlayerServer:
     Accepts up to 2 clients:
     - First connection = Player 1
     - Second connection = Player 2
+    With udp_port set, clients may stream frames over UDP instead;
+    the TCP connection then only signals join/leave.
+    With a recorder (SessionRecorder), every frame applied and every
+    disconnect is also appended to its session log.
+    With a latency tracker (LatencyTracker), frames are stamped with their
+    receive time and their network and decode times recorded.
+    Clients may ping to sync clocks; the estimates end up in clock_offset
+    (the tracker's, if there is one).
+    With buffer_frames, every frame also goes into a per-player jitter
+    buffer (FrameBuffer): get_frames() hands over all frames due since the
+    last call, sample_pose() an interpolated pose. That trades up to
+    max_delay of input lag for evenly spaced frames, so it is opt-in.
     """
-    def __init__(self, host='0.0.0.0', port=5000):
+    def __init__(self, host='0.0.0.0', port=5000, udp_port=None, recorder=None, latency=None,
+                 buffer_frames=False):
         self.host = host
         self.port = port
+        self.udp_port = udp_port
+        self.recorder = recorder
+        self.latency = latency
+        self.clock_offset = latency.clock_offset if latency is not None else ClockOffset()
+        self.buffer_frames = buffer_frames
+        self.buffers = {1: FrameBuffer(), 2: FrameBuffer()}
         self.server_socket = None
+        self.udp_socket = None
         self.running = False
         
         # State
@@ -22,6 +49,11 @@ class MultiPlayerServer:
         
         self.latest_p1_landmarks = None
         self.latest_p2_landmarks = None
+
+        # UDP sessions: token -> player_id, plus newest sequence seen per player
+        self.udp_tokens = {}
+        self.latest_seq = {1: None, 2: None}
+        self.udp_dropped = 0
         
         self.lock = threading.Lock()
 
@@ -31,12 +63,21 @@ class MultiPlayerServer:
         self.server_socket.bind((self.host, self.port))
         self.server_socket.listen(2)
         self.running = True
+        if self.recorder is not None:
+            self.recorder.start()
         
         print(f"Server Host: Listening on {self.host}:{self.port}")
         
         # Start connection acceptor thread
         threading.Thread(target=self._accept_loop, daemon=True).start()
 
+        if self.udp_port is not None:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.bind((self.host, self.udp_port))
+            self.udp_socket.settimeout(0.5)
+            print(f"Server Host: UDP frames on {self.host}:{self.udp_port}")
+            threading.Thread(target=self._udp_loop, daemon=True).start()
+
     def _accept_loop(self):
         print("Waiting for players to connect...")
         while self.running:
@@ -61,7 +102,49 @@ class MultiPlayerServer:
             except Exception as e:
                 print(f"Accept error: {e}")
 
+    def _udp_loop(self):
+        """
+        Latest-wins intake: datagrams older than the newest frame already
+        applied for that player are dropped instead of overwriting it.
+        """
+        while self.running:
+            try:
+                datagram, addr = self.udp_socket.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if len(datagram) <= UDP_PREFIX.size:
+                continue
+            recv_time = time.time()
+            decode_start = time.perf_counter()
+            token = UDP_PREFIX.unpack_from(datagram)[0]
+            landmarks = deserialize_landmarks(datagram[UDP_PREFIX.size:])
+            decode_time = time.perf_counter() - decode_start
+
+            with self.lock:
+                player_id = self.udp_tokens.get(token)
+                if player_id is None or landmarks is None:
+                    continue
+                if self.buffer_frames:
+                    # Reordered datagrams still fit in the buffer by capture time
+                    self.buffers[player_id].push(landmarks, recv_time)
+                if not seq_newer(landmarks.seq, self.latest_seq[player_id]):
+                    self.udp_dropped += 1
+                    continue
+                self.latest_seq[player_id] = landmarks.seq
+                if player_id == 1:
+                    self.latest_p1_landmarks = landmarks
+                else:
+                    self.latest_p2_landmarks = landmarks
+            if self.latency is not None:
+                self.latency.frame_received(player_id, landmarks, recv_time, decode_time)
+            if self.recorder is not None:
+                self.recorder.record(player_id, landmarks, recv_time)
+
     def _handle_client(self, sock, player_id):
+        first_message = True
+        udp_token = None
         while self.running:
             try:
                 # 1. Read Length (4 bytes)
@@ -72,28 +155,70 @@ class MultiPlayerServer:
                 # 2. Read Data
                 data = recvall(sock, msglen)
                 if not data: break
+                recv_time = time.time()
+
+                # New clients open with a handshake; old ones send JSON frames right away
+                if first_message:
+                    first_message = False
+                    encoding = parse_hello(data)
+                    if encoding is not None and wants_udp(data) and self.udp_socket is not None:
+                        udp_token = secrets.randbits(32)
+                        with self.lock:
+                            self.udp_tokens[udp_token] = player_id
+                            self.latest_seq[player_id] = None
+                        send_msg(sock, make_udp_ack(encoding, self.udp_port, udp_token))
+                        print(f"Player {player_id} using binary frames over UDP")
+                        continue
+                    if encoding is not None:
+                        send_msg(sock, make_ack(encoding))
+                        print(f"Player {player_id} using binary frames")
+                        continue
+                
+                # Clock sync: answer pings, keep the exchanges the client reports
+                t0 = parse_ping(data)
+                if t0 is not None:
+                    send_msg(sock, make_pong(t0, recv_time, time.time()))
+                    continue
+                exchange = parse_sync(data)
+                if exchange is not None:
+                    self.clock_offset.add_exchange(player_id, *exchange)
+                    continue
                 
                 # 3. Process
+                decode_start = time.perf_counter()
                 landmarks = deserialize_landmarks(data)
+                if self.latency is not None and landmarks is not None:
+                    self.latency.frame_received(player_id, landmarks, recv_time, time.perf_counter() - decode_start)
                 
                 with self.lock:
                     if player_id == 1:
                         self.latest_p1_landmarks = landmarks
                     else:
                         self.latest_p2_landmarks = landmarks
+                if self.buffer_frames and landmarks is not None:
+                    self.buffers[player_id].push(landmarks, recv_time)
+                if self.recorder is not None and landmarks is not None:
+                    # A frame that failed to decode is not a leave record
+                    self.recorder.record(player_id, landmarks, recv_time)
                         
             except Exception as e:
                 print(f"Player {player_id} disconnected: {e}")
                 break
         
         # Cleanup
+        self.clock_offset.reset(player_id)
+        self.buffers[player_id].reset()
         with self.lock:
+            self.udp_tokens.pop(udp_token, None)
+            self.latest_seq[player_id] = None
             if player_id == 1: 
                 self.p1_socket = None
                 self.latest_p1_landmarks = None
             else: 
                 self.p2_socket = None
                 self.latest_p2_landmarks = None
+        if self.recorder is not None:
+            self.recorder.record(player_id, None, time.time())
         
         sock.close()
         print(f"Player {player_id} socket closed.")
@@ -102,8 +227,24 @@ class MultiPlayerServer:
         with self.lock:
             return self.latest_p1_landmarks, self.latest_p2_landmarks
 
+    def get_frames(self, player_id, now=None):
+        """
+        Every frame of the player released by the jitter buffer since the
+        last call, oldest first.
+        """
+        return self.buffers[player_id].pop_ready(now)
+
+    def sample_pose(self, player_id, now=None):
+        """
+        The player's pose interpolated at the buffer's playout time for host time now.
+        """
+        return self.buffers[player_id].sample_at(now)
+
     def stop(self):
         self.running = False
         if self.p1_socket: self.p1_socket.close()
         if self.p2_socket: self.p2_socket.close()
         if self.server_socket: self.server_socket.close()
+        if self.udp_socket: self.udp_socket.close()
+        if self.recorder is not None:
+            self.recorder.close()
@@ -1,5 +1,47 @@
 import json
 import struct
+import numpy as np
+from src.logic.frame import PoseFrame, as_pose_frame, NUM_LANDMARKS
+
+# --- Wire formats ---
+# JSON: list of 33 {'x','y','z','v'} dicts (original format, ~3 KB/frame)
+# BINARY: fixed header followed by 33x4 float32 or int16 values
+WIRE_JSON = "json"
+WIRE_BINARY = "binary"
+
+BINARY_VERSION = 1
+
+# version, encoding, player_id, reserved, sequence, capture timestamp
+FRAME_HEADER = struct.Struct('<BBBBId')
+ENCODING_FLOAT32 = 0
+ENCODING_INT16 = 1
+# int16 quantization: covers +/-4.0 at ~1.2e-4 resolution
+QUANT_SCALE = 8192.0
+
+# Handshake sent by new clients as their first length-prefixed message.
+# Old clients send JSON straight away, which starts with b'['.
+HELLO_MAGIC = b'GFHI'
+ACK_MAGIC = b'GFOK'
+HELLO = struct.Struct('<4sBB')  # magic, version, requested encoding
+
+# UDP transport: the TCP connection stays open as the join/leave control channel,
+# frames go out as datagrams prefixed with the session token from the ack.
+TRANSPORT_TCP = "tcp"
+TRANSPORT_UDP = "udp"
+UDP_HELLO_MAGIC = b'GFHU'
+UDP_ACK_MAGIC = b'GFUD'
+UDP_ACK = struct.Struct('<4sBBHI')  # magic, version, encoding, udp port, token
+UDP_PREFIX = struct.Struct('<I')  # token
+
+# Clock sync over the TCP connection: the client pings with its send time,
+# the host answers with its receive and reply times, and the client reports
+# each finished exchange so the host can convert capture timestamps too.
+PING_MAGIC = b'GFPI'
+PONG_MAGIC = b'GFPO'
+SYNC_MAGIC = b'GFSY'
+PING = struct.Struct('<4sd')     # magic, t0 (client send)
+PONG = struct.Struct('<4sddd')   # magic, t0, t1 (host receive), t2 (host reply)
+SYNC = struct.Struct('<4sdddd')  # magic, t0, t1, t2, t3 (client receive)
 
 def serialize_landmarks(landmarks):
     """
@@ -8,15 +50,15 @@ def serialize_landmarks(landmarks):
     """
     if not landmarks:
         return json.dumps([]).encode('utf-8')
-        
+
     data = []
     # If it's a MediaPipe object, it has a 'landmark' field which is a list
     if hasattr(landmarks, 'landmark'):
         source = landmarks.landmark
     # If it's the raw list itself (wrapper)
     else:
-        source = landmarks 
-        
+        source = landmarks
+
     for lm in source:
         # Handle both object (lm.x) and dict access ({'x':...})
         if isinstance(lm, dict):
@@ -30,6 +72,55 @@ def serialize_landmarks(landmarks):
             })
     return json.dumps(data).encode('utf-8')
 
+def landmarks_to_array(landmarks):
+    """
+    Packs landmarks (PoseFrame, MediaPipe object, dict list or array) into a (33, 4) float32 array.
+    """
+    return as_pose_frame(landmarks).data
+
+def encode_landmarks(landmarks, player_id=0, seq=0, timestamp=0.0, quantize=False):
+    """
+    Encodes landmarks into the versioned binary frame format.
+    """
+    arr = landmarks_to_array(landmarks)
+    if quantize:
+        encoding = ENCODING_INT16
+        body = np.clip(np.rint(arr * QUANT_SCALE), -32768, 32767).astype('<i2')
+    else:
+        encoding = ENCODING_FLOAT32
+        body = arr.astype('<f4', copy=False)
+    header = FRAME_HEADER.pack(BINARY_VERSION, encoding, player_id, 0, seq & 0xFFFFFFFF, timestamp)
+    return header + body.tobytes()
+
+def decode_frame(payload):
+    """
+    Decodes a binary frame.
+    Returns (header_dict, (33, 4) float32 array) or None if the frame is invalid.
+    """
+    if len(payload) < FRAME_HEADER.size:
+        return None
+    version, encoding, player_id, _, seq, timestamp = FRAME_HEADER.unpack_from(payload)
+    if version != BINARY_VERSION:
+        return None
+
+    if encoding == ENCODING_INT16:
+        body = np.frombuffer(payload, dtype='<i2', offset=FRAME_HEADER.size)
+        arr = body.astype(np.float32) / QUANT_SCALE
+    elif encoding == ENCODING_FLOAT32:
+        body = np.frombuffer(payload, dtype='<f4', offset=FRAME_HEADER.size)
+        arr = body.astype(np.float32)
+    else:
+        return None
+
+    if arr.size != NUM_LANDMARKS * 4:
+        return None
+
+    header = {'player_id': player_id, 'seq': seq, 'timestamp': timestamp, 'encoding': encoding}
+    return header, arr.reshape(NUM_LANDMARKS, 4)
+
+def is_json_payload(payload):
+    return payload[:1] == b'['
+
 class MockLandmark:
     def __init__(self, x, y, z, v):
         self.x = x
@@ -43,16 +134,118 @@ class MockLandmarksResult:
         for d in data_list:
             self.landmark.append(MockLandmark(d['x'], d['y'], d['z'], d['v']))
 
-def deserialize_landmarks(json_bytes):
+def deserialize_landmarks(payload):
+    """
+    Decodes a frame in either wire format (detected from the first byte) into a PoseFrame.
+    """
     try:
-        data_list = json.loads(json_bytes.decode('utf-8'))
+        if not is_json_payload(payload):
+            decoded = decode_frame(payload)
+            if decoded is None:
+                return None
+            header, arr = decoded
+            return PoseFrame(arr, header['timestamp'], header['seq'])
+
+        data_list = json.loads(payload.decode('utf-8'))
         if not data_list:
             return None
-        return MockLandmarksResult(data_list)
+        return as_pose_frame(data_list)
     except Exception as e:
         print(f"Deserialization error: {e}")
         return None
 
+def seq_newer(seq, last):
+    """
+    True if seq comes after last, allowing for 32-bit wraparound.
+    """
+    if last is None:
+        return True
+    diff = (seq - last) & 0xFFFFFFFF
+    return 0 < diff < 0x80000000
+
+# --- Connect-time negotiation ---
+def make_hello(quantize=False, transport=TRANSPORT_TCP):
+    magic = UDP_HELLO_MAGIC if transport == TRANSPORT_UDP else HELLO_MAGIC
+    return HELLO.pack(magic, BINARY_VERSION, ENCODING_INT16 if quantize else ENCODING_FLOAT32)
+
+def parse_hello(payload):
+    """
+    Returns the requested encoding if payload is a handshake this host can
+    serve, else None (no ACK, so the client falls back to JSON).
+    """
+    if len(payload) != HELLO.size or payload[:4] not in (HELLO_MAGIC, UDP_HELLO_MAGIC):
+        return None
+    _, version, encoding = HELLO.unpack(payload)
+    if version != BINARY_VERSION or encoding not in (ENCODING_FLOAT32, ENCODING_INT16):
+        return None
+    return encoding
+
+def wants_udp(payload):
+    return payload.startswith(UDP_HELLO_MAGIC)
+
+def make_ack(encoding):
+    return HELLO.pack(ACK_MAGIC, BINARY_VERSION, encoding)
+
+def make_udp_ack(encoding, udp_port, token):
+    return UDP_ACK.pack(UDP_ACK_MAGIC, BINARY_VERSION, encoding, udp_port, token)
+
+def parse_udp_ack(payload):
+    """
+    Returns (encoding, udp_port, token) if the host accepted UDP, else None.
+    """
+    if not payload or len(payload) != UDP_ACK.size or not payload.startswith(UDP_ACK_MAGIC):
+        return None
+    _, version, encoding, udp_port, token = UDP_ACK.unpack(payload)
+    return (encoding, udp_port, token) if version == BINARY_VERSION else None
+
+def parse_ack(payload):
+    if not payload or len(payload) != HELLO.size or not payload.startswith(ACK_MAGIC):
+        return None
+    _, version, encoding = HELLO.unpack(payload)
+    return encoding if version == BINARY_VERSION else None
+
+# --- Clock sync ---
+def make_ping(t0):
+    return PING.pack(PING_MAGIC, t0)
+
+def parse_ping(payload):
+    """
+    Returns the client send time if payload is a ping, else None.
+    """
+    if len(payload) != PING.size or not payload.startswith(PING_MAGIC):
+        return None
+    return PING.unpack(payload)[1]
+
+def make_pong(t0, t1, t2):
+    return PONG.pack(PONG_MAGIC, t0, t1, t2)
+
+def parse_pong(payload):
+    if not payload or len(payload) != PONG.size or not payload.startswith(PONG_MAGIC):
+        return None
+    return PONG.unpack(payload)[1:]
+
+def make_sync(t0, t1, t2, t3):
+    return SYNC.pack(SYNC_MAGIC, t0, t1, t2, t3)
+
+def parse_sync(payload):
+    """
+    Returns (t0, t1, t2, t3) if payload reports a finished exchange, else None.
+    """
+    if len(payload) != SYNC.size or not payload.startswith(SYNC_MAGIC):
+        return None
+    return SYNC.unpack(payload)[1:]
+
+def send_msg(sock, data):
+    # Prefix with length (4 bytes big-endian)
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+def recv_msg(sock):
+    raw_msglen = recvall(sock, 4)
+    if not raw_msglen:
+        return None
+    msglen = struct.unpack('>I', raw_msglen)[0]
+    return recvall(sock, msglen)
+
 def recvall(sock, n):
     data = b''
     while len(data) < n:
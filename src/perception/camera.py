@@ -1,31 +1,100 @@
 import cv2
+import os
 import threading
 import time
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+class FrameFolderCapture:
+    """
+    cv2.VideoCapture look-alike that plays a directory of images in name order.
+    """
+    def __init__(self, path):
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self, image=None):
+        if self.index >= len(self.files):
+            return False, None
+        frame = cv2.imread(self.files[self.index])
+        self.index += 1
+        if frame is None:
+            return False, None
+        # Honour VideoCapture's read(image=...) contract when shapes line up
+        if image is not None and image.shape == frame.shape:
+            image[...] = frame
+            return True, image
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.files = []
+
 class CameraThread:
     """
     Dedicated thread for grabbing frames from a camera.
     This prevents the main game loop from blocking on cv2.read().
+    camera_id may also be a video file or a directory of frames (for headless runs);
+    those sources stop at the end instead of retrying.
+    If sink is given, every frame is also put() there as (frame, capture_time).
+
+    Frames are read straight into a ring of `ring_size` preallocated buffers and
+    handed out as read-only views, so nothing is copied per frame. A view from
+    get_frame/get_latest stays valid until the writer laps the ring
+    (ring_size - 1 newer frames); consumers that keep frames longer should
+    copy them. Frames put to the sink are held: the writer never reuses a held
+    buffer (it reads into a fresh one instead) until release(frame) is called.
+    `generation` counts frames read.
     """
-    def __init__(self, camera_id=0, width=640, height=480):
+    def __init__(self, camera_id=0, width=640, height=480, sink=None, ring_size=3, capture=None):
         self.camera_id = camera_id
         self.width = width
         self.height = height
         self.frame = None
+        self.capture_time = 0.0
+        self.generation = 0
         self.running = False
+        self.finished = False
+        self.sink = sink
         self.lock = threading.Lock()
-        self.cap = None
+        self.new_frame = threading.Condition(self.lock)
+        # Optional pre-opened capture object (anything with isOpened/read/set/release)
+        self.cap = capture
+        self.thread = None
+
+        self.ring_size = max(2, ring_size)
+        self.ring = [None] * self.ring_size
+        self.write_idx = 0
+        self.held = {}  # id(buffer) -> outstanding sink hand-offs
+        self.reallocated = 0  # reads that skipped a held buffer
+
+    @property
+    def is_file_source(self):
+        return isinstance(self.camera_id, str)
 
     def start(self):
-        self.cap = cv2.VideoCapture(self.camera_id)
+        if self.cap is None:
+            if self.is_file_source and os.path.isdir(self.camera_id):
+                self.cap = FrameFolderCapture(self.camera_id)
+            else:
+                self.cap = cv2.VideoCapture(self.camera_id)
         if not self.cap.isOpened():
             print(f"Error: Could not open camera {self.camera_id}")
             return False
         
         # Optimize camera settings for speed
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        if not self.is_file_source:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            self.cap.set(cv2.CAP_PROP_FPS, 30)
         
         self.running = True
         self.thread = threading.Thread(target=self._update, daemon=True)
@@ -35,20 +104,88 @@ class CameraThread:
 
     def _update(self):
         while self.running:
-            ret, frame = self.cap.read()
+            buf = self.ring[self.write_idx]
+            if buf is not None and id(buf if buf.base is None else buf.base) in self.held:
+                # Still in use downstream: leave it to its holder, read into a new buffer
+                buf = self.ring[self.write_idx] = None
+                self.reallocated += 1
+            ret, frame = self.cap.read(buf) if buf is not None else self.cap.read()
             if ret:
-                with self.lock:
-                    self.frame = frame
+                capture_time = time.time()
+                # First frame (or a resolution change) allocates the slot; after that read() fills it in place
+                if frame is not buf:
+                    self.ring[self.write_idx] = frame
+                self.write_idx = (self.write_idx + 1) % self.ring_size
+
+                view = frame.view()
+                view.flags.writeable = False
+                with self.new_frame:
+                    self.frame = view
+                    self.capture_time = capture_time
+                    self.generation += 1
+                    self.new_frame.notify_all()
+                if self.sink is not None:
+                    self.hold(view)
+                    if not self.sink.put((view, capture_time)):
+                        self.release(view)
+            elif self.is_file_source:
+                # End of recording
+                self.finished = True
+                if self.sink is not None:
+                    self.sink.close()
+                with self.new_frame:
+                    self.running = False
+                    self.new_frame.notify_all()
+                break
             else:
                 print(f"Warning: Camera {self.camera_id} failed to read frame.")
                 time.sleep(0.1)
 
-    def get_frame(self):
+    def hold(self, frame):
+        with self.lock:
+            key = id(frame.base)  # the buffer the view was taken from
+            self.held[key] = self.held.get(key, 0) + 1
+
+    def release(self, frame):
+        """
+        Hands a sink frame's buffer back to the ring.
+        """
         with self.lock:
-            return self.frame.copy() if self.frame is not None else None
+            key = id(frame.base)
+            count = self.held.get(key, 0) - 1
+            if count > 0:
+                self.held[key] = count
+            else:
+                self.held.pop(key, None)
+
+    def get_frame(self, copy=False):
+        """
+        Latest frame as a read-only view (copy=True for a private writable copy).
+        """
+        with self.lock:
+            if self.frame is None:
+                return None
+            return self.frame.copy() if copy else self.frame
+
+    def get_latest(self, last_generation=0, timeout=None):
+        """
+        Returns (frame_view, generation, capture_time) once a frame newer than
+        last_generation exists, waiting up to timeout. (None, last_generation, None)
+        if nothing new arrived.
+        """
+        with self.new_frame:
+            if self.generation <= last_generation and self.running and timeout != 0:
+                self.new_frame.wait_for(lambda: self.generation > last_generation or not self.running, timeout)
+            if self.generation <= last_generation:
+                return None, last_generation, None
+            return self.frame, self.generation, self.capture_time
 
     def stop(self):
-        self.running = False
+        with self.new_frame:
+            self.running = False
+            self.new_frame.notify_all()
+        if self.sink is not None:
+            self.sink.close()
         if self.thread:
             self.thread.join()
         if self.cap:
@@ -66,8 +203,8 @@ class CameraManager:
         for cam in self.cameras:
             cam.start()
 
-    def get_frames(self):
-        return [cam.get_frame() for cam in self.cameras]
+    def get_frames(self, copy=False):
+        return [cam.get_frame(copy) for cam in self.cameras]
 
     def stop_all(self):
         for cam in self.cameras:
@@ -0,0 +1,153 @@
+import time
+from collections import deque
+import cv2
+import numpy as np
+from src.logic.frame import PoseFrame, as_pose_frame
+
+# Quality ladder, best first: (model_complexity, inference scale, frames skipped between inferences)
+LEVELS = [
+    (2, 1.0, 0),
+    (1, 1.0, 0),
+    (1, 0.75, 0),
+    (0, 0.75, 0),
+    (0, 0.5, 0),
+    (0, 0.5, 1),
+    (0, 0.5, 2),
+]
+
+def default_engine_factory(complexity):
+    from src.perception.pose import PoseEngine
+    return PoseEngine(model_complexity=complexity)
+
+class LatencyGovernor:
+    """
+    Picks a quality level from per-frame inference cost over a sliding window:
+    steps down the ladder when the mean exceeds the budget, back up when
+    it has stayed under `headroom` x budget. The window is cleared after
+    every switch so each level is judged on its own samples.
+    """
+    def __init__(self, budget_ms=33.0, window=15, headroom=0.6, start_level=1, levels=LEVELS):
+        self.budget_ms = budget_ms
+        self.window = window
+        self.headroom = headroom
+        self.levels = levels
+        self.level = start_level
+        self.samples = deque(maxlen=window)
+        self.switches = []
+
+    @property
+    def setting(self):
+        return self.levels[self.level]
+
+    def record(self, ms, now=0.0):
+        """
+        Adds one per-frame cost sample (ms). Returns True if the level changed.
+        """
+        self.samples.append(ms)
+        if len(self.samples) < self.window:
+            return False
+
+        mean = sum(self.samples) / len(self.samples)
+        if mean > self.budget_ms and self.level < len(self.levels) - 1:
+            return self._switch(self.level + 1, now, f"mean {mean:.1f} ms > budget")
+        if mean < self.budget_ms * self.headroom and self.level > 0:
+            return self._switch(self.level - 1, now, f"mean {mean:.1f} ms < {self.headroom:.0%} of budget")
+        return False
+
+    def _switch(self, level, now, reason):
+        self.switches.append((now, self.level, level, reason))
+        self.level = level
+        self.samples.clear()
+        return True
+
+class AdaptivePoseEngine:
+    """
+    PoseEngine front-end that holds a latency budget by trading model
+    complexity, inference resolution and frame skipping (skipped frames get
+    landmarks extrapolated from the last two inferred poses).
+    Returns PoseFrames normalized to the full frame.
+    """
+    def __init__(self, budget_ms=33.0, engine_factory=default_engine_factory, clock=time.perf_counter, **governor_kwargs):
+        self.governor = LatencyGovernor(budget_ms, **governor_kwargs)
+        self.engine_factory = engine_factory
+        self.engines = {}  # complexity -> engine, created on first use
+        self.clock = clock
+
+        self.skip_count = 0
+        self.last = None       # (time, (33, 4) array)
+        self.velocity = None   # per-second change of the last inferred pose
+        self.inferred = 0
+        self.extrapolated = 0
+        self.timings = deque(maxlen=300)
+
+    def _engine(self, complexity):
+        if complexity not in self.engines:
+            self.engines[complexity] = self.engine_factory(complexity)
+        return self.engines[complexity]
+
+    def process_frame(self, frame, timestamp=None):
+        if frame is None:
+            return None
+        now = self.clock() if timestamp is None else timestamp
+        complexity, scale, skip = self.governor.setting
+
+        if self.skip_count < skip and self.last is not None:
+            self.skip_count += 1
+            self.extrapolated += 1
+            last_time, last_pose = self.last
+            pose = last_pose.copy()
+            if self.velocity is not None:
+                pose[:, :3] += self.velocity[:, :3] * (now - last_time)
+            return PoseFrame(pose, now)
+        self.skip_count = 0
+
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # Load the model before the clock starts: the first frame at a new
+        # complexity would otherwise time the load, and MediaPipe's first
+        # inference (graph warm-up) is left out of the governor's window too
+        warm = complexity in self.engines
+        engine = self._engine(complexity)
+        start = self.clock()
+        landmarks = engine.process_frame(frame)
+        ms = (self.clock() - start) * 1000
+        self.inferred += 1
+        if warm:
+            self.timings.append(ms)
+            # Judge the level on cost per camera frame: skipping spreads one inference over skip + 1 frames
+            self.governor.record(ms / (skip + 1), now)
+
+        if landmarks is None:
+            self.last = None
+            self.velocity = None
+            return None
+        pose = as_pose_frame(landmarks).data
+        if self.last is not None and now > self.last[0]:
+            self.velocity = (pose - self.last[1]) / (now - self.last[0])
+        self.last = (now, pose)
+        return PoseFrame(pose, now)
+
+    def draw_landmarks(self, frame, landmarks):
+        """
+        Debug helper: joints as dots (works for extrapolated poses too).
+        """
+        if landmarks is not None:
+            h, w = frame.shape[:2]
+            for x, y in landmarks.xy.tolist():
+                cv2.circle(frame, (int(x * w), int(y * h)), 3, (0, 255, 0), -1)
+        return frame
+
+    def stats(self):
+        complexity, scale, skip = self.governor.setting
+        timings = np.array(self.timings) if self.timings else np.zeros(1)
+        return {
+            'level': self.governor.level,
+            'model_complexity': complexity,
+            'scale': scale,
+            'skip': skip,
+            'mean_ms': float(timings.mean()),
+            'p95_ms': float(np.percentile(timings, 95)),
+            'inferred': self.inferred,
+            'extrapolated': self.extrapolated,
+            'switches': list(self.governor.switches),
+        }
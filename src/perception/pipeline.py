@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from src.perception.camera import CameraThread
+
+DROP_OLDEST = "drop_oldest"   # keep the newest items (latest-only)
+DROP_NEWEST = "drop_newest"   # keep what's queued, discard incoming
+BLOCK = "block"               # back-pressure the producer (process every frame)
+
+class LatestQueue:
+    """
+    Small bounded queue between pipeline stages with a configurable drop policy.
+    """
+    def __init__(self, maxsize=1, policy=DROP_OLDEST, on_drop=None):
+        self.maxsize = maxsize
+        self.policy = policy
+        # Optional callback(item) for every item the queue discards
+        self.on_drop = on_drop
+        self.items = deque()
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, item):
+        with self.cond:
+            if self.policy == BLOCK:
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.cond.wait()
+            if self.closed:
+                return False
+            dropped = None
+            if len(self.items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                dropped = self.items.popleft()
+            self.items.append(item)
+            self.cond.notify_all()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+        return True
+
+    def get(self, timeout=None):
+        """
+        Returns the next item, or None once closed and drained (or on timeout).
+        """
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class StageStats:
+    """
+    Per-stage busy time (ms) and item count.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.times = deque(maxlen=1000)
+        self.count = 0
+
+    def add(self, seconds):
+        self.times.append(seconds * 1000)
+        self.count += 1
+
+    def summary(self):
+        if not self.times:
+            return {'stage': self.name, 'count': 0, 'mean_ms': 0.0, 'p95_ms': 0.0}
+        times = np.array(self.times)
+        return {'stage': self.name, 'count': self.count,
+                'mean_ms': float(times.mean()), 'p95_ms': float(np.percentile(times, 95))}
+
+class CapturePipeline:
+    """
+    Client-side capture -> inference -> send (-> preview) pipeline.
+    Stages run on their own threads and hand off through bounded LatestQueues,
+    so camera I/O, pose inference and networking overlap instead of adding up.
+    Preview (cv2.imshow) stays on the calling thread via poll_preview().
+    """
+    def __init__(self, source=0, pose_engine=None, client=None, preview=False,
+                 queue_size=1, drop_policy=DROP_OLDEST):
+        if pose_engine is None:
+            from src.perception.pose import PoseEngine
+            pose_engine = PoseEngine()
+        self.pose_engine = pose_engine
+        self.client = client
+
+        release = lambda item: self.camera.release(item[0])
+        self.capture_q = LatestQueue(queue_size, drop_policy, on_drop=release)
+        self.send_q = LatestQueue(queue_size, drop_policy)
+        self.preview_q = LatestQueue(1, DROP_OLDEST, on_drop=release) if preview else None
+
+        # Frames are ring-buffer views the camera holds until they are released:
+        # after inference, or once poll_preview() has copied them. The ring covers
+        # everything queued, the frame being inferred, the preview and the one being
+        # written; a slower consumer makes the camera read into fresh buffers instead
+        # of overwriting frames still in use.
+        self.camera = CameraThread(source, sink=self.capture_q, ring_size=queue_size + 3)
+        self.stats = {name: StageStats(name) for name in ('queue_wait', 'inference', 'send', 'end_to_end')}
+        self.sent = 0
+        self.start_time = None
+        self.end_time = None
+        self.threads = []
+
+    def start(self):
+        if not self.camera.start():
+            return False
+        self.start_time = time.perf_counter()
+        for target in (self._inference_loop, self._send_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return True
+
+    def _inference_loop(self):
+        while True:
+            item = self.capture_q.get()
+            if item is None:
+                break
+            frame, capture_time = item
+            self.stats['queue_wait'].add(time.time() - capture_time)
+            start = time.perf_counter()
+            landmarks = self.pose_engine.process_frame(frame)
+            self.stats['inference'].add(time.perf_counter() - start)
+
+            if landmarks:
+                self.send_q.put((landmarks, capture_time))
+            if self.preview_q is None or not self.preview_q.put((frame, landmarks)):
+                self.camera.release(frame)
+        self.send_q.close()
+        if self.preview_q is not None:
+            self.preview_q.close()
+
+    def _send_loop(self):
+        while True:
+            item = self.send_q.get()
+            if item is None:
+                break
+            landmarks, capture_time = item
+            start = time.perf_counter()
+            if self.client is not None:
+                self.client.send_landmarks(landmarks, timestamp=capture_time)
+            self.stats['send'].add(time.perf_counter() - start)
+            self.stats['end_to_end'].add(time.time() - capture_time)
+            self.sent += 1
+        self.end_time = time.perf_counter()
+
+    def poll_preview(self, timeout=0.05):
+        """
+        Returns (frame, landmarks) with the skeleton drawn, or None. Call from the UI thread.
+        """
+        if self.preview_q is None:
+            return None
+        item = self.preview_q.get(timeout)
+        if item is None:
+            return None
+        frame, landmarks = item
+        image = frame.copy()
+        self.camera.release(frame)
+        return self.pose_engine.draw_landmarks(image, landmarks), landmarks
+
+    @property
+    def finished(self):
+        return not any(thread.is_alive() for thread in self.threads)
+
+    def wait(self):
+        for thread in self.threads:
+            thread.join()
+
+    def stop(self):
+        self.camera.stop()
+        self.capture_q.close()
+        self.wait()
+
+    def report(self):
+        end = self.end_time or time.perf_counter()
+        elapsed = end - self.start_time if self.start_time else 0.0
+        return {
+            'fps': self.sent / elapsed if elapsed > 0 else 0.0,
+            'sent': self.sent,
+            'dropped': {'capture': self.capture_q.dropped, 'send': self.send_q.dropped},
+            'stages': [stat.summary() for stat in self.stats.values()],
+        }
+
+def print_report(report):
+    print(f"Achieved {report['fps']:.1f} FPS ({report['sent']} frames sent, dropped {report['dropped']})")
+    for stage in report['stages']:
+        print(f"  {stage['stage']:<12} n={stage['count']:<6} mean {stage['mean_ms']:6.2f} ms  p95 {stage['p95_ms']:6.2f} ms")
@@ -0,0 +1,254 @@
+import functools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+import numpy as np
+from src.logic.frame import PoseFrame, as_pose_frame
+from src.perception.camera import CameraManager
+
+# landmarks: (33, 4) float32 array, or None if no pose was found
+PoseResult = namedtuple('PoseResult', 'camera_id generation capture_time landmarks infer_ms')
+
+def _pose_worker(worker_id, task_q, result_q, engine_factory):
+    """
+    Worker process: owns one PoseEngine (MediaPipe graphs aren't thread-safe)
+    and reads frames out of the shared-memory block named in each task.
+    """
+    engine = engine_factory()
+    result_q.put((worker_id, None))  # ready
+    shm = None
+    while True:
+        task = task_q.get()
+        if task is None:
+            break
+        camera_id, generation, capture_time, shm_name, shape, dtype = task
+        if shm is None or shm.name != shm_name:
+            if shm is not None:
+                shm.close()
+            shm = shared_memory.SharedMemory(name=shm_name)
+
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        start = time.perf_counter()
+        landmarks = engine.process_frame(frame)
+        infer_ms = (time.perf_counter() - start) * 1000
+        del frame  # release the shm buffer export
+
+        data = as_pose_frame(landmarks).data if landmarks is not None else None
+        result_q.put((worker_id, PoseResult(camera_id, generation, capture_time, data, infer_ms)))
+    if shm is not None:
+        shm.close()
+
+class PoseWorkerPool:
+    """
+    Runs one PoseEngine per worker process to get around the GIL.
+    Each camera gets its own group of workers so a tracker only ever sees one
+    video stream; with more workers than cameras a camera's frames round-robin
+    across its group. Frames travel through per-worker shared memory, results
+    come back as PoseResults keyed by camera id.
+    """
+    def __init__(self, num_workers=2, camera_ids=(0,), engine_factory=None, **engine_kwargs):
+        self.num_workers = num_workers
+        self.camera_ids = list(camera_ids)
+        if engine_factory is None:
+            from src.perception.pose import PoseEngine
+            engine_factory = functools.partial(PoseEngine, **engine_kwargs)
+        self.engine_factory = engine_factory
+
+        # camera_id -> worker ids
+        if num_workers >= len(self.camera_ids):
+            self.groups = {cid: [w for w in range(num_workers) if w % len(self.camera_ids) == i]
+                           for i, cid in enumerate(self.camera_ids)}
+        else:
+            self.groups = {cid: [i % num_workers] for i, cid in enumerate(self.camera_ids)}
+        self.next_in_group = {cid: 0 for cid in self.camera_ids}
+
+        self.ctx = mp.get_context('spawn')
+        self.processes = []
+        self.task_queues = []
+        self.result_q = None
+        self.shm = [None] * num_workers
+        self.busy = [False] * num_workers
+
+        self.latest = {cid: None for cid in self.camera_ids}
+        self.completed = 0
+
+    def _spawn(self, worker_id):
+        task_q = self.ctx.Queue()
+        proc = self.ctx.Process(target=_pose_worker, args=(worker_id, task_q, self.result_q, self.engine_factory),
+                                daemon=True)
+        proc.start()
+        if worker_id < len(self.processes):
+            self.task_queues[worker_id] = task_q
+            self.processes[worker_id] = proc
+        else:
+            self.task_queues.append(task_q)
+            self.processes.append(proc)
+
+    def start(self):
+        self.result_q = self.ctx.Queue()
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+        # Wait for every worker to load its model so the first frames aren't queued behind start-up
+        for _ in range(self.num_workers):
+            self.result_q.get(timeout=60.0)
+        print(f"Pose worker pool started ({self.num_workers} workers, cameras {self.camera_ids}).")
+
+    def _free_worker(self, camera_id):
+        group = self.groups[camera_id]
+        for i in range(len(group)):
+            idx = (self.next_in_group[camera_id] + i) % len(group)
+            if not self.busy[group[idx]]:
+                self.next_in_group[camera_id] = (idx + 1) % len(group)
+                return group[idx]
+        return None
+
+    def submit(self, camera_id, frame, capture_time, generation):
+        """
+        Hands a frame to an idle worker of this camera's group.
+        Returns False (frame skipped) if they are all busy.
+        """
+        worker_id = self._free_worker(camera_id)
+        if worker_id is None:
+            return False
+
+        shm = self.shm[worker_id]
+        if shm is None or shm.size < frame.nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+            self.shm[worker_id] = shm
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[...] = frame
+
+        self.busy[worker_id] = True
+        self.task_queues[worker_id].put((camera_id, generation, capture_time, shm.name, frame.shape, frame.dtype.str))
+        return True
+
+    def poll(self, timeout=0.0):
+        """
+        Collects finished results. Returns {camera_id: PoseResult} for cameras
+        with a result newer than the last one delivered.
+        """
+        fresh = {}
+        block = timeout > 0
+        while True:
+            try:
+                worker_id, result = self.result_q.get(block, timeout) if block else self.result_q.get_nowait()
+            except queue.Empty:
+                if block and not all(proc.is_alive() for proc in self.processes):
+                    raise RuntimeError("A pose worker process exited unexpectedly")
+                break
+            block = False
+            self.busy[worker_id] = False
+            if result is None:
+                continue  # a restarted worker is ready
+            self.completed += 1
+
+            previous = self.latest[result.camera_id]
+            if previous is None or result.generation > previous.generation:
+                self.latest[result.camera_id] = result
+                fresh[result.camera_id] = result
+        return fresh
+
+    def restart_dead(self):
+        """
+        Replaces worker processes that died. Their frames are lost; each
+        new worker stays busy until its model has loaded. Returns the ids
+        of the restarted workers.
+        """
+        restarted = []
+        for worker_id, proc in enumerate(self.processes):
+            if proc.is_alive():
+                continue
+            self.task_queues[worker_id].close()
+            self._spawn(worker_id)
+            self.busy[worker_id] = True
+            restarted.append(worker_id)
+        return restarted
+
+    def idle(self):
+        return not any(self.busy)
+
+    def stop(self):
+        for task_q in self.task_queues:
+            task_q.put(None)
+        for proc in self.processes:
+            proc.join(timeout=2.0)
+            if proc.is_alive():
+                proc.terminate()
+        for shm in self.shm:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.shm = [None] * self.num_workers
+        print("Pose worker pool stopped.")
+
+class LocalPoseTracker:
+    """
+    Tracks players from cameras attached to the host (no client laptops).
+    Drop-in for MultiPlayerServer in GameEngine: start()/stop()/get_landmarks(),
+    where camera i is player i + 1.
+
+    Dead worker processes are restarted up to MAX_RESTARTS times; after that
+    the tracker is marked failed and get_landmarks() returns no players.
+    """
+    def __init__(self, camera_ids=(0, 1), num_workers=None, engine_factory=None, **engine_kwargs):
+        self.camera_ids = list(camera_ids)
+        self.cameras = CameraManager(camera_ids=self.camera_ids)
+        self.pool = PoseWorkerPool(num_workers or len(self.camera_ids), self.camera_ids, engine_factory,
+                                   **engine_kwargs)
+        self.MAX_RESTARTS = 3
+        self.restarts = 0
+        self.failed = False
+        self.generations = {cid: 0 for cid in self.camera_ids}
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self.frames = {cid: None for cid in self.camera_ids}
+
+    def start(self):
+        self.cameras.start_all()
+        self.pool.start()
+        self.running = True
+        self.thread = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.thread.start()
+
+    def _dispatch_loop(self):
+        while self.running:
+            for cam in self.cameras.cameras:
+                frame, generation, capture_time = cam.get_latest(self.generations[cam.camera_id], timeout=0)
+                if frame is not None and self.pool.submit(cam.camera_id, frame, capture_time, generation):
+                    self.generations[cam.camera_id] = generation
+
+            try:
+                fresh = self.pool.poll(timeout=0.002)
+            except RuntimeError as e:
+                if self.restarts >= self.MAX_RESTARTS:
+                    print(f"LocalPoseTracker: {e}; giving up after {self.restarts} restarts")
+                    with self.lock:
+                        self.failed = True
+                        self.frames = {cid: None for cid in self.camera_ids}
+                    break
+                self.restarts += 1
+                print(f"LocalPoseTracker: {e}; restarting workers {self.pool.restart_dead()}")
+                continue
+            for cid, result in fresh.items():
+                frame = PoseFrame(result.landmarks, result.capture_time, result.generation) \
+                    if result.landmarks is not None else None
+                with self.lock:
+                    self.frames[cid] = frame
+
+    def get_landmarks(self):
+        with self.lock:
+            return tuple(self.frames[cid] for cid in self.camera_ids)
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+        self.pool.stop()
+        self.cameras.stop_all()
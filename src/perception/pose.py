@@ -1,12 +1,14 @@
 import mediapipe as mp
 import cv2
 import numpy as np
+from src.perception.roi import RoiTracker
 
 class PoseEngine:
     """
     Wrapper for MediaPipe Pose to extract body landmarks.
     """
-    def __init__(self, static_image_mode=False, model_complexity=1, smooth_landmarks=True):
+    def __init__(self, static_image_mode=False, model_complexity=1, smooth_landmarks=True,
+                 roi=False, roi_margin=0.25, roi_scale=1.0, roi_min_visibility=0.5):
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
             static_image_mode=static_image_mode,
@@ -16,16 +18,66 @@ class PoseEngine:
             min_tracking_confidence=0.5
         )
         self.mp_drawing = mp.solutions.drawing_utils
+        # Reused RGB conversion target (reallocated only if the frame size changes)
+        self.rgb_buffer = None
+
+        # ROI mode: infer on a crop around the previous pose (optionally downscaled)
+        self.roi = RoiTracker(roi_margin, roi_min_visibility) if roi else None
+        self.roi_scale = roi_scale
+        self.last_region = None
 
     def process_frame(self, frame):
         """
         Processes a BGR frame and returns landmarks.
+        In ROI mode landmarks are still normalized to the full frame.
         """
         if frame is None:
             return None
+        if self.roi is None:
+            return self._infer(frame)
+
+        region = self.roi.region(frame.shape)
+        self.last_region = region
+        landmarks = None
+        if region is not None:
+            x0, y0, x1, y1 = region
+            crop = frame[y0:y1, x0:x1]
+            if self.roi_scale != 1.0:
+                crop = cv2.resize(crop, None, fx=self.roi_scale, fy=self.roi_scale, interpolation=cv2.INTER_AREA)
+            landmarks = self._infer(crop)
+            if landmarks:
+                self._to_full_frame(landmarks, region, frame.shape)
+
+        if not landmarks:
+            # No ROI yet, or tracking lost inside it: full-frame detection on this same frame
+            self.last_region = None
+            landmarks = self._infer(frame)
+
+        self.roi.update(self._to_array(landmarks) if landmarks else None)
+        return landmarks
+
+    @staticmethod
+    def _to_full_frame(landmarks, region, frame_shape):
+        # Crop-normalized -> full-frame-normalized, in place on the MediaPipe result
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = region
+        sx, sy = (x1 - x0) / w, (y1 - y0) / h
+        ox, oy = x0 / w, y0 / h
+        for lm in landmarks.landmark:
+            lm.x = lm.x * sx + ox
+            lm.y = lm.y * sy + oy
+            lm.z = lm.z * sx  # z shares x's scale
+
+    @staticmethod
+    def _to_array(landmarks):
+        return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks.landmark], dtype=np.float32)
 
+    def _infer(self, frame):
         # MediaPipe needs RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if self.rgb_buffer is None or self.rgb_buffer.shape != frame.shape:
+            self.rgb_buffer = np.empty(frame.shape, dtype=frame.dtype)
+        self.rgb_buffer.flags.writeable = True
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
         rgb_frame.flags.writeable = False # Performance trick
         
         results = self.pose.process(rgb_frame)
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Torso landmarks used as the tracking-confidence signal
+TORSO = [11, 12, 23, 24]
+
+class RoiTracker:
+    """
+    Picks the crop to run pose inference on, from the previous frame's landmarks.
+    The crop is the pose bounding box grown by `margin` and is kept fixed while
+    the pose stays inside it (refit only when a joint gets within `refit_border`
+    of the edge), so MediaPipe sees a stable image from frame to frame.
+    """
+    def __init__(self, margin=0.25, min_visibility=0.5, refit_border=0.1):
+        self.margin = margin
+        self.min_visibility = min_visibility
+        self.refit_border = refit_border
+        self.box = None  # normalized (x0, y0, x1, y1) in full-frame coordinates
+
+    def reset(self):
+        self.box = None
+
+    def region(self, frame_shape):
+        """
+        Pixel crop (x0, y0, x1, y1) for the next frame, or None for full-frame detection.
+        """
+        if self.box is None:
+            return None
+        h, w = frame_shape[:2]
+        x0, y0, x1, y1 = self.box
+        return int(x0 * w), int(y0 * h), int(np.ceil(x1 * w)), int(np.ceil(y1 * h))
+
+    def update(self, landmarks):
+        """
+        landmarks: (33, 4) full-frame normalized array, or None if no pose was found.
+        """
+        if landmarks is None or landmarks[TORSO, 3].mean() < self.min_visibility:
+            # Lost or unsure: next frame goes back to full-frame detection
+            self.box = None
+            return
+
+        visible = landmarks[landmarks[:, 3] > 0.3, :2]
+        if len(visible) == 0:
+            self.box = None
+            return
+        lo = visible.min(axis=0)
+        hi = visible.max(axis=0)
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            border_x = (x1 - x0) * self.refit_border
+            border_y = (y1 - y0) * self.refit_border
+            if lo[0] > x0 + border_x and lo[1] > y0 + border_y and hi[0] < x1 - border_x and hi[1] < y1 - border_y:
+                return
+
+        pad = (hi - lo) * self.margin
+        lo = np.clip(lo - pad, 0.0, 1.0)
+        hi = np.clip(hi + pad, 0.0, 1.0)
+        if np.any(hi - lo < 0.05):
+            self.box = None
+            return
+        self.box = (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]))
@@ -14,7 +14,8 @@ def main():
     
     try:
         while True:
-            frames = cam_manager.get_frames()
+            # Copy: drawing the skeleton writes into the frame
+            frames = cam_manager.get_frames(copy=True)
             frame = frames[0]
             
             if frame is not None: